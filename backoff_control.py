@@ -1,6 +1,8 @@
 import numpy as np
 from scipy.optimize import minimize
 
+import kernels
+
 
 class SatelliteEnv:
     def __init__(self, N_tilde, current_rho):
@@ -8,25 +10,12 @@ class SatelliteEnv:
         self.rho = current_rho
 
     def compute_C(self, p_b, p_c, D, p_s):
-        C = np.zeros((D + 1, D + 1))
-        for k in range(1, D + 1):
-            for n in range(1, k + 1):
-                prod = 1.0
-                for j in range(n + 1, k + 1):
-                    prod *= (1 - (1 - p_b[j - 1]) * p_s * (1 - p_c))
-                C[k, n] = prod
-        return C
+        # C[k, n] = prod_{j=n+1}^{k} (1 - (1 - p_b[j-1]) * p_s * (1 - p_c))
+        return kernels.compute_C(p_b, p_c, D, p_s)
 
     def compute_pi(self, C, D, p_d):
-        numerator = np.zeros(D)
-        inner_sum = 0.0
-        for n in range(1, D + 1):
-            val = sum(p_d[k - 1] * C[k, n] for k in range(n, D + 1))
-            numerator[n - 1] = self.rho * val
-            inner_sum += val
-
         # Pi is observed after packet arrivals and before the ACB decision.
-        return numerator / ((1 - self.rho) + self.rho * inner_sum)
+        return kernels.compute_pi(C, D, p_d, self.rho)
 
     def solve_p_c(self, p_b, D, p_d, p_s, K, Z):
         p_c = 0.5
@@ -171,10 +160,5 @@ def priority_acb_control(N_tilde, last_p_b, rho, D, p_d, p_s, K, Z, Lambda, stat
 
 
 def get_loss(p_b, p_c, p_s, p_d_arr, D):
-    L = 0.0
-    for i in range(1, D + 1):
-        prod = 1.0
-        for j in range(1, i + 1):
-            prod *= (1 - (1 - p_b[j - 1]) * p_s * (1 - p_c))
-        L += p_d_arr[i - 1] * prod
-    return L
+    # L = sum_i p_d[i-1] * prod_{j<=i} (1 - (1 - p_b[j-1]) * p_s * (1 - p_c))
+    return kernels.get_loss(p_b, p_c, p_s, p_d_arr, D)
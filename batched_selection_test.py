@@ -0,0 +1,110 @@
+import copy
+from types import SimpleNamespace
+
+import numpy as np
+
+import visibility_bits
+from main import UE, batched_backoff, batched_select, satellite
+
+
+ETA = 4.0
+LOAD = np.array([10.0, 60.0, 0.0, 30.0, 5.0])
+
+
+def make_ues(count, mode, rng):
+    """Active UEs with random geometry; satellite 4 is below the horizon for everyone."""
+    sats = [satellite(id=idx, skyfield_sat=None) for idx in range(len(LOAD))]
+    ues = []
+    for idx in range(count):
+        ue = UE(location=[25.03, 121.56], id=idx, rho=1.0)
+        ue.all_satellites = sats
+        ue.angle = rng.uniform(0.0, 90.0, len(sats))
+        ue.distance = rng.uniform(550.0, 1500.0, len(sats))
+        ue.channel_success_prob = rng.uniform(0.1, 0.9, len(sats))
+        visible = rng.rand(len(sats)) < 0.7
+        visible[4] = False
+        ue.visible_bits = visibility_bits.pack_rows(visible)
+        ue.selection_mode = mode
+        ue.active = True
+        ue.budget, ue.delay = 10, 0
+        ue.p_b = np.zeros(20)
+        ue.load_indicator = LOAD
+        ue.load_aware_eta = ETA
+        ues.append(ue)
+    # A UE without a usable link falls back to its highest visible satellite.
+    ues[0].channel_success_prob = np.zeros(len(sats))
+    ues[0].visible_bits = visibility_bits.pack_rows(np.array([True, True, False, True, False]))
+    return ues
+
+
+def make_controller():
+    return SimpleNamespace(last_load_indicator=LOAD, load_aware_eta=ETA)
+
+
+def load_aware_weights(ue):
+    visible = visibility_bits.unpack_rows(ue.visible_bits, len(LOAD))
+    weights = ue.channel_success_prob * np.exp(-ETA * LOAD / ue.all_satellites[0].Z)
+    return np.where(visible, weights, 0.0)
+
+
+def selections(ues):
+    return [ue.selected_satellite_id_this_rao for ue in ues]
+
+
+def test_mode7_batched_argmax_matches_per_ue_acb_test():
+    np.random.seed(0)
+    per_ue = make_ues(300, 7, np.random.RandomState(4))
+    batched = make_ues(300, 7, np.random.RandomState(4))
+    for ue in per_ue:
+        ue.ACB_test()
+    batched_select(batched, make_controller(), 7)
+
+    assert selections(batched) == selections(per_ue)
+    assert [ue.acb_policy_fallback_count for ue in batched] == [ue.acb_policy_fallback_count for ue in per_ue]
+    assert batched[0].acb_policy_fallback_count == 1
+    assert batched[0].selected_satellite_id_this_rao == int(np.argmax(np.where(
+        [True, True, False, True, False], batched[0].angle, -np.inf,
+    )))
+
+
+def test_mode5_gumbel_max_matches_per_ue_acb_test_distribution():
+    draws = 20000
+    template = make_ues(2, 5, np.random.RandomState(8))[1]
+    expected = load_aware_weights(template)
+    expected /= np.sum(expected)
+
+    def frequencies(select):
+        ues = [copy.copy(template) for _ in range(draws)]
+        select(ues)
+        counts = np.bincount(selections(ues), minlength=len(LOAD))
+        return counts / draws
+
+    np.random.seed(1)
+    per_ue = frequencies(lambda ues: [ue.ACB_test() for ue in ues])
+    batched = frequencies(lambda ues: batched_select(ues, make_controller(), 5))
+
+    assert batched[4] == 0 and per_ue[4] == 0
+    # Four binomial standard errors at 20000 draws are below 0.015.
+    assert np.allclose(batched, expected, atol=0.015)
+    assert np.allclose(per_ue, expected, atol=0.015)
+
+
+def test_acb_drops_are_returned_by_acb_test_and_batched_backoff():
+    np.random.seed(2)
+    per_ue = make_ues(40, 7, np.random.RandomState(5))
+    batched = make_ues(40, 7, np.random.RandomState(5))
+    for ue in per_ue[::3] + batched[::3]:
+        ue.delay = ue.budget
+
+    dropped = sum(bool(ue.ACB_test()) for ue in per_ue)
+    transmitting, batched_dropped = batched_backoff(batched, SimpleNamespace(p_b=np.zeros(20)))
+    assert dropped == batched_dropped == len(per_ue[::3])
+    assert sum(ue.loss for ue in per_ue) == sum(ue.loss for ue in batched) == dropped
+    assert not any(ue.active for ue in batched[::3]) and all(ue in batched for ue in transmitting)
+
+
+if __name__ == "__main__":
+    test_mode7_batched_argmax_matches_per_ue_acb_test()
+    test_mode5_gumbel_max_matches_per_ue_acb_test_distribution()
+    test_acb_drops_are_returned_by_acb_test_and_batched_backoff()
+    print("batched_selection_test passed")
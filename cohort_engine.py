@@ -0,0 +1,174 @@
+import numpy as np
+
+
+# Outputs the cohort engine cannot produce because it never materializes
+# individual UEs: UE locations and visibility (avg visible satellites is None
+# and the feasibility check is skipped), per-UE group changes
+# (group_change_history is empty), the Mode 0 heterogeneity test, and the
+# visibility-driven modes 3, 5 and 7.
+COHORT_SELECTION_MODES = (1, 2, 4, 6)
+
+
+def outcome_probabilities(selection_mode, group_row, policy_matrix, sat_num):
+    """
+    Per-attempt outcome distribution as a (4, K) matrix.
+
+    Rows are [policy success, policy channel fail, fallback success,
+    fallback channel fail] on satellite k. A UE falls in group g with weight
+    w_g, picks k from A_g (or the group's top satellite when A_g is
+    degenerate) and passes the channel with p_s^g,k.
+    """
+    probabilities = np.zeros((4, sat_num))
+    if selection_mode == 2:
+        # Ideal mode: uniform over every satellite, channel always succeeds.
+        probabilities[0] = 1.0 / sat_num
+        return probabilities
+    if group_row is None or len(group_row) == 0:
+        raise ValueError("The cohort engine needs a non-empty group table row.")
+
+    weights = group_row.weights / np.sum(group_row.weights)
+    ps_matrix = group_row.ps_matrix
+    totals = np.sum(policy_matrix, axis=1)
+    valid = (totals > 0) & np.isfinite(totals)
+    policy = policy_matrix[valid] / totals[valid, None]
+    probabilities[0] = weights[valid] @ (policy * ps_matrix[valid])
+    probabilities[1] = weights[valid] @ (policy * (1.0 - ps_matrix[valid]))
+    for group_idx in np.flatnonzero(~valid):
+        top_satellite = group_row.keys[group_idx][0]
+        ps = ps_matrix[group_idx, top_satellite]
+        probabilities[2, top_satellite] += weights[group_idx] * ps
+        probabilities[3, top_satellite] += weights[group_idx] * (1.0 - ps)
+    return probabilities
+
+
+class CohortPopulation:
+    """
+    Count-level stand-in for ue_list in main.main (ENGINE="cohort").
+
+    Active UEs are counted per (delay budget, remaining budget) state. Each
+    transmitting UE falls in group g with the table weight w_g, independently
+    of its earlier groups. calculate_ps assumes the same thing. Its satellite
+    and channel outcome is then one multinomial per state. Preamble occupancy is
+    an exact multinomial over the Z preambles. Cost scales with states x
+    satellites, not with NUM_UE.
+    """
+
+    def __init__(self, ue_count, qos_distribution):
+        self.ue_count = int(ue_count)
+        self.qos_distribution = np.asarray(qos_distribution, dtype=float)
+        self.max_budget = len(self.qos_distribution)
+        # counts[budget - 1, remaining - 1]
+        self.counts = np.zeros((self.max_budget, self.max_budget), dtype=np.int64)
+        self.loss = 0
+        self.success = 0
+        self.transmission_success = 0
+        self.transmission_fail = 0
+        self.acb_selection_count = 0
+        self.acb_policy_fallback_count = 0
+        # success_delay_counts[budget - 1, delay_raos - 1]
+        self.success_delay_counts = np.zeros_like(self.counts)
+        self._attempt_states = np.zeros((0, 2), dtype=int)
+        self._received = np.zeros((0, 0), dtype=np.int64)
+
+    @property
+    def active_count(self):
+        return int(np.sum(self.counts))
+
+    def new_time(self, rho_rao):
+        """UE.new_time for everyone; returns the offered arrivals over all UEs."""
+        active = self.active_count
+        idle = self.ue_count - active
+        # delay += 1; packets whose remaining budget hits zero are dropped.
+        self.loss += int(np.sum(self.counts[:, 0]))
+        self.counts[:, :-1] = self.counts[:, 1:]
+        self.counts[:, -1] = 0
+        arrivals = np.random.binomial(idle, rho_rao)
+        new_budgets = np.random.multinomial(arrivals, self.qos_distribution)
+        diagonal = np.arange(self.max_budget)
+        self.counts[diagonal, diagonal] += new_budgets
+        return int(arrivals + np.random.binomial(active, rho_rao))
+
+    def remaining_budget_counts(self):
+        return np.sum(self.counts, axis=0)
+
+    def attempt(self, p_b, probabilities):
+        """
+        ACB_test plus channel outcome for every active cohort.
+
+        Returns the per-satellite selection counts for this RAO.
+        """
+        sat_num = probabilities.shape[1]
+        p_b = np.asarray(p_b, dtype=float)[:self.max_budget]
+        transmit = np.random.binomial(self.counts, 1.0 - p_b[None, :])
+        self._attempt_states = np.argwhere(transmit > 0)
+        if sat_num == 0 or len(self._attempt_states) == 0:
+            self._received = np.zeros((0, sat_num), dtype=np.int64)
+            return np.zeros(sat_num, dtype=int)
+
+        flat_probabilities = probabilities.ravel() / np.sum(probabilities)
+        outcomes = np.stack([
+            np.random.multinomial(transmit[budget_idx, remaining_idx], flat_probabilities)
+            for budget_idx, remaining_idx in self._attempt_states
+        ]).reshape(len(self._attempt_states), 4, sat_num)
+        self._received = outcomes[:, 0] + outcomes[:, 2]
+        channel_fail = outcomes[:, 1] + outcomes[:, 3]
+
+        self.acb_selection_count += int(np.sum(transmit))
+        self.acb_policy_fallback_count += int(np.sum(outcomes[:, 2:]))
+        self.transmission_success += int(np.sum(self._received))
+        self.transmission_fail += int(np.sum(channel_fail))
+        return np.sum(self._received + channel_fail, axis=0).astype(int)
+
+    def resolve(self, sat_pool):
+        """
+        satellite.check_RA_success for the cohorts received this RAO.
+
+        Sets N_i/N_s/N_c/actual_lambda on each satellite and returns the
+        remaining budgets of the successful UEs.
+        """
+        success_states = []
+        for sat_idx, sat in enumerate(sat_pool):
+            received = self._received[:, sat_idx] if len(self._received) else np.zeros(0, dtype=np.int64)
+            total_received = int(np.sum(received))
+            occupancy = np.random.multinomial(total_received, np.full(sat.Z, 1.0 / sat.Z))
+            sat.ue_pre.clear()
+            sat.actual_lambda = total_received
+            sat.N_s = int(np.count_nonzero(occupancy == 1))
+            sat.N_c = int(np.count_nonzero(occupancy >= 2))
+            sat.N_i = sat.Z - sat.N_s - sat.N_c
+
+            # The N_s singleton UEs are a uniform subset of everyone received.
+            still_to_pick = sat.N_s
+            still_received = total_received
+            for state_idx, state_received in enumerate(received):
+                if still_to_pick == 0:
+                    break
+                if state_received == 0:
+                    continue
+                won = int(np.random.hypergeometric(
+                    state_received,
+                    still_received - state_received,
+                    still_to_pick,
+                ))
+                still_to_pick -= won
+                still_received -= state_received
+                if won == 0:
+                    continue
+                budget_idx, remaining_idx = self._attempt_states[state_idx]
+                self.counts[budget_idx, remaining_idx] -= won
+                self.success_delay_counts[budget_idx, budget_idx - remaining_idx] += won
+                self.success += won
+                success_states.extend([remaining_idx + 1] * won)
+        self._received = np.zeros((0, 0), dtype=np.int64)
+        return success_states
+
+    def success_delay_stats(self):
+        """(mean delay in RAOs, mean deadline budget utilization) over successes."""
+        total = int(np.sum(self.success_delay_counts))
+        if total == 0:
+            return np.nan, np.nan
+        budgets = np.arange(1, self.max_budget + 1)[:, None]
+        delays = np.arange(1, self.max_budget + 1)[None, :]
+        mean_delay = float(np.sum(self.success_delay_counts * delays) / total)
+        mean_utilization = float(np.sum(self.success_delay_counts * delays / budgets) / total)
+        return mean_delay, mean_utilization
@@ -0,0 +1,62 @@
+import numpy as np
+
+from cohort_engine import CohortPopulation, outcome_probabilities
+from group_policy import GroupTableRow
+
+
+class CountingSatellite:
+    def __init__(self, Z=54):
+        self.Z = Z
+        self.ue_pre = {}
+        self.N_i = self.N_s = self.N_c = 0
+        self.actual_lambda = 0
+
+
+def test_population_conserves_ues_and_preambles():
+    np.random.seed(4)
+    qos = np.zeros(20)
+    qos[[4, 9]] = 0.5
+    population = CohortPopulation(5000, qos)
+    satellites = [CountingSatellite(), CountingSatellite()]
+    probabilities = np.array([
+        [0.45, 0.35],
+        [0.05, 0.05],
+        [0.10, 0.0],
+        [0.0, 0.0],
+    ])
+
+    for _ in range(30):
+        population.new_time(0.02)
+        population.attempt(np.full(20, 0.3), probabilities)
+        success_states = population.resolve(satellites)
+        for sat in satellites:
+            assert sat.N_i + sat.N_s + sat.N_c == sat.Z
+        assert len(success_states) == sum(sat.N_s for sat in satellites)
+        assert np.all(population.counts >= 0)
+
+    assert population.success == int(np.sum(population.success_delay_counts))
+    assert population.transmission_success + population.transmission_fail == population.acb_selection_count
+    assert population.acb_policy_fallback_count > 0
+    # Remaining budget never exceeds the delay budget.
+    assert np.all(np.triu(population.counts, k=1) == 0)
+
+
+def test_outcome_probabilities_mix_groups_and_fallback():
+    row = GroupTableRow(
+        keys=[(0, 1), (1, 0)],
+        codes=np.array([1, 2]),
+        weights=np.array([0.75, 0.25]),
+        ps_matrix=np.array([[0.8, 0.6], [0.5, 0.9]]),
+    )
+    policy = np.array([[0.5, 0.5], [0.0, 0.0]])
+    probabilities = outcome_probabilities(1, row, policy, 2)
+
+    assert np.allclose(probabilities[0], [0.75 * 0.5 * 0.8, 0.75 * 0.5 * 0.6])
+    assert np.allclose(probabilities[2], [0.0, 0.25 * 0.9])
+    assert np.isclose(np.sum(probabilities), 1.0)
+
+
+if __name__ == "__main__":
+    test_population_conserves_ues_and_preambles()
+    test_outcome_probabilities_mix_groups_and_fallback()
+    print("cohort_engine_test passed")
@@ -0,0 +1,55 @@
+"""
+Common random numbers for paired scheme comparisons.
+
+Packet arrivals, delay budgets and channel fading are exogenous: they
+should not depend on which satellite-selection or backoff scheme runs.
+With the global np.random stream they do, because every scheme decision
+shifts the stream. Here each (stream, RAO) pair has its own generator
+seeded from (seed, stream, RAO), drawing one value per UE, so UE i sees the
+same arrival, budget and fading draws at RAO n under every scheme. Decision
+randomness (ACB draws, satellite and preamble choice) stays on np.random.
+"""
+import numpy as np
+
+
+STREAMS = ("arrival", "delay_budget", "los", "shadow_fading")
+
+
+class CommonRandomNumbers:
+    def __init__(self, seed, ue_count):
+        self.seed = int(seed)
+        self.ue_count = int(ue_count)
+        self.rao = None
+        self._draws = {}
+
+    def begin_rao(self, n):
+        self.rao = int(n)
+        self._draws = {}
+
+    def _stream(self, name):
+        draws = self._draws.get(name)
+        if draws is None:
+            if self.rao is None:
+                raise RuntimeError("Call begin_rao() before drawing common random numbers.")
+            generator = np.random.Generator(np.random.PCG64(
+                np.random.SeedSequence([self.seed, STREAMS.index(name), self.rao])
+            ))
+            if name == "shadow_fading":
+                draws = generator.standard_normal(self.ue_count)
+            else:
+                draws = generator.random(self.ue_count)
+            self._draws[name] = draws
+        return draws
+
+    def arrival_mask(self, probability):
+        return self._stream("arrival") < probability
+
+    def delay_budget(self, ue_id, distribution):
+        """Budget in 1..len(distribution) by inverse CDF of UE ue_id's draw."""
+        cdf = np.cumsum(distribution)
+        index = int(np.searchsorted(cdf, self._stream("delay_budget")[ue_id] * cdf[-1], side="right"))
+        return min(index, len(cdf) - 1) + 1
+
+    def channel_draws(self, ue_id):
+        """(LOS uniform, standard-normal shadow fading) of UE ue_id this RAO."""
+        return float(self._stream("los")[ue_id]), float(self._stream("shadow_fading")[ue_id])
@@ -0,0 +1,49 @@
+import numpy as np
+
+from crn import CommonRandomNumbers
+from main import channel_calculator
+
+
+def test_draws_depend_only_on_seed_ue_and_rao():
+    first = CommonRandomNumbers(42, 500)
+    second = CommonRandomNumbers(42, 500)
+    first.begin_rao(7)
+    second.begin_rao(7)
+    # Decision randomness and the order of stream use do not shift the draws.
+    np.random.rand(1000)
+    fading = first.channel_draws(12)
+    mask = first.arrival_mask(0.3)
+    assert np.array_equal(second.arrival_mask(0.3), mask)
+    assert second.channel_draws(12) == fading
+    second.begin_rao(8)
+    assert not np.array_equal(second.arrival_mask(0.3), mask)
+    other_seed = CommonRandomNumbers(43, 500)
+    other_seed.begin_rao(7)
+    assert not np.array_equal(other_seed.arrival_mask(0.3), mask)
+
+
+def test_delay_budget_follows_the_distribution():
+    distribution = np.zeros(20)
+    distribution[[4, 9, 14, 19]] = 0.25
+    streams = CommonRandomNumbers(1, 4000)
+    budgets = []
+    for n in range(5):
+        streams.begin_rao(n)
+        budgets.extend(streams.delay_budget(ue, distribution) for ue in range(4000))
+    values, counts = np.unique(budgets, return_counts=True)
+    assert values.tolist() == [5, 10, 15, 20]
+    assert np.allclose(counts / len(budgets), 0.25, atol=0.01)
+
+
+def test_channel_calculator_uses_supplied_draws():
+    # LOS at zenith and LEO range without shadowing closes the link.
+    assert channel_calculator(90.0, 550.0, los_uniform=0.0, shadow_normal=0.0)
+    # A huge shadow-fading loss does not.
+    assert not channel_calculator(90.0, 550.0, los_uniform=0.0, shadow_normal=1e3)
+
+
+if __name__ == "__main__":
+    test_draws_depend_only_on_seed_ue_and_rao()
+    test_delay_budget_follows_the_distribution()
+    test_channel_calculator_uses_supplied_draws()
+    print("crn_test passed")
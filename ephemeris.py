@@ -0,0 +1,323 @@
+from datetime import timedelta
+
+import numpy as np
+from sgp4.api import SatrecArray, jday
+from skyfield.api import load
+from skyfield.constants import ANGVEL, DAY_S
+from skyfield.framelib import itrs
+from skyfield.sgp4lib import TEME, theta_GMST1982
+
+
+DEFAULT_GRID_SECONDS = 10.0
+BACKENDS = ("skyfield", "sgp4")
+FRAMES = ("exact", "gmst")
+# ITRS angular velocity (per day) that Skyfield adds to ITRS velocities.
+ITRS_ANGULAR_VELOCITY = np.array([
+    [0.0, DAY_S * ANGVEL, 0.0],
+    [-DAY_S * ANGVEL, 0.0, 0.0],
+    [0.0, 0.0, 0.0],
+])
+
+
+def propagate_itrs(skyfield_sats, times):
+    """Return ITRS positions (km) and velocities (km/s) as (T, K, 3) arrays."""
+    time_count = len(times)
+    positions_km = np.empty((time_count, len(skyfield_sats), 3), dtype=float)
+    velocities_km_s = np.empty((time_count, len(skyfield_sats), 3), dtype=float)
+    for k, sat in enumerate(skyfield_sats):
+        # One vectorized Skyfield call per satellite covers every grid time.
+        position, velocity = sat.at(times).frame_xyz_and_velocity(itrs)
+        positions_km[:, k, :] = np.asarray(position.km).reshape(3, time_count).T
+        velocities_km_s[:, k, :] = np.asarray(velocity.km_per_s).reshape(3, time_count).T
+    return positions_km, velocities_km_s
+
+
+def teme_to_itrs_matrices(times):
+    """(T, 3, 3) rotations taking TEME vectors to ITRS, as Skyfield composes them."""
+    itrs_rotation = np.asarray(itrs.rotation_at(times)).reshape(3, 3, -1)
+    teme_rotation = np.asarray(TEME.rotation_at(times)).reshape(3, 3, -1)
+    # ITRS <- GCRS <- TEME, with GCRS <- TEME the transpose of TEME.rotation_at.
+    return np.einsum("ijt,kjt->tik", itrs_rotation, teme_rotation)
+
+
+def sgp4_julian_dates(times):
+    # Same UTC Julian date split that EarthSatellite passes to sgp4:
+    # (whole, tai_fraction - TAI-UTC). TAI-UTC is a whole number of seconds,
+    # recovered from the public UTC calendar fields.
+    utc_jd, utc_fraction = jday(*times.utc)
+    leap_seconds = np.round((times.whole - utc_jd + times.tai_fraction - utc_fraction) * DAY_S)
+    jd = np.atleast_1d(times.whole).astype(float)
+    fraction = np.atleast_1d(times.tai_fraction - leap_seconds / DAY_S).astype(float)
+    return jd, fraction
+
+
+def propagate_teme(skyfield_sats, times):
+    """TEME positions (km) and velocities (km/s) as (T, K, 3) arrays from one SatrecArray call."""
+    satrecs = SatrecArray([sat.model for sat in skyfield_sats])
+    _, positions_km, velocities_km_s = satrecs.sgp4(*sgp4_julian_dates(times))
+    return positions_km.transpose(1, 0, 2), velocities_km_s.transpose(1, 0, 2)
+
+
+def propagate_itrs_sgp4(skyfield_sats, times, rotations=None):
+    """
+    propagate_itrs with array SGP4 and one TEME->ITRS rotation per time.
+
+    `rotations` defaults to teme_to_itrs_matrices(times); the velocity gets
+    the same Earth-rotation term Skyfield adds for the ITRS frame.
+    """
+    positions_teme, velocities_teme = propagate_teme(skyfield_sats, times)
+    if rotations is None:
+        rotations = teme_to_itrs_matrices(times)
+    positions_km = np.einsum("tij,tkj->tki", rotations, positions_teme)
+    velocities_km_s = np.einsum("tij,tkj->tki", rotations, velocities_teme)
+    angular_velocity = ITRS_ANGULAR_VELOCITY / DAY_S
+    velocities_km_s += np.einsum("ij,tkj->tki", angular_velocity, positions_km)
+    return positions_km, velocities_km_s
+
+
+PROPAGATORS = {
+    "skyfield": propagate_itrs,
+    "sgp4": propagate_itrs_sgp4,
+}
+
+
+def check_backend(backend):
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown ephemeris backend {backend!r}; expected one of {BACKENDS}.")
+    return backend
+
+
+def max_backend_difference_km(skyfield_sats, times, backend="sgp4"):
+    """Largest position difference between `backend` and per-satellite Skyfield."""
+    reference_km, _ = propagate_itrs(skyfield_sats, times)
+    positions_km, _ = PROPAGATORS[check_backend(backend)](skyfield_sats, times)
+    return float(np.max(np.linalg.norm(positions_km - reference_km, axis=2)))
+
+
+def check_frame(frame):
+    if frame not in FRAMES:
+        raise ValueError(f"Unknown TEME->ITRS frame path {frame!r}; expected one of {FRAMES}.")
+    return frame
+
+
+def earth_rotation_matrix(angle_rad):
+    """Rotation of vectors into a frame turned by angle_rad about +z."""
+    c, s = np.cos(angle_rad), np.sin(angle_rad)
+    return np.array([[c, s, 0.0], [-s, c, 0.0], [0.0, 0.0, 1.0]])
+
+
+class EarthRotationFrame:
+    """
+    Fast TEME->ITRS rotations for a short window after a reference time.
+
+    The exact rotation (GMST, nutation and polar motion, as Skyfield composes
+    it) is taken once at the reference time; every later rotation only adds
+    the GMST advance since then. Over minutes the dropped terms (change in
+    polar motion, UT1-UTC drift) are far below a millimetre at LEO radius.
+    """
+
+    def __init__(self, timescale, reference_dt):
+        reference_time = timescale.from_datetime(reference_dt)
+        self.timescale = timescale
+        self.reference_dt = reference_dt
+        self.reference_rotation = teme_to_itrs_matrices(reference_time)[0]
+        _, theta_dot = theta_GMST1982(reference_time.whole, reference_time.ut1_fraction)
+        # theta_GMST1982 returns radians per UT1 day.
+        self.rotation_rate_rad_s = float(theta_dot) / DAY_S
+        jd, fraction = sgp4_julian_dates(reference_time)
+        self.jd = float(jd[0])
+        self.fraction = float(fraction[0])
+
+    def julian_date(self, offset_s):
+        """The sgp4 (jd, fraction) split at offset_s seconds after the reference."""
+        return self.jd, self.fraction + float(offset_s) / DAY_S
+
+    def rotation(self, offset_s):
+        """(3, 3) TEME->ITRS rotation at offset_s seconds after the reference."""
+        return earth_rotation_matrix(self.rotation_rate_rad_s * float(offset_s)) @ self.reference_rotation
+
+    def max_rotation_error_rad(self, offsets_s):
+        """Largest matrix deviation from teme_to_itrs_matrices at offsets_s (a small angle in rad)."""
+        offsets_s = np.atleast_1d(np.asarray(offsets_s, dtype=float))
+        exact = teme_to_itrs_matrices(offsets_to_times(self.timescale, self.reference_dt, offsets_s))
+        fast = np.stack([self.rotation(offset) for offset in offsets_s])
+        return float(np.max(np.abs(fast - exact)))
+
+
+def offsets_to_times(timescale, start_dt, offsets_s):
+    """Convert second offsets from start_dt to a Skyfield time array."""
+    return timescale.from_datetimes([
+        start_dt + timedelta(seconds=float(offset))
+        for offset in np.atleast_1d(offsets_s)
+    ])
+
+
+def hermite_positions_km(grid_offsets_s, grid_step_s, grid_positions_km, grid_velocities_km_s, offset_s, columns=None):
+    """Cubic Hermite position at offset_s from (T, K, 3) grid positions and velocities."""
+    interval = min(
+        int(offset_s // grid_step_s),
+        len(grid_offsets_s) - 2,
+    )
+    columns = slice(None) if columns is None else columns
+    h = grid_step_s
+    s = (offset_s - grid_offsets_s[interval]) / h
+    s2 = s * s
+    s3 = s2 * s
+    h00 = 2.0 * s3 - 3.0 * s2 + 1.0
+    h10 = s3 - 2.0 * s2 + s
+    h01 = -2.0 * s3 + 3.0 * s2
+    h11 = s3 - s2
+    return (
+        h00 * grid_positions_km[interval][columns]
+        + (h10 * h) * grid_velocities_km_s[interval][columns]
+        + h01 * grid_positions_km[interval + 1][columns]
+        + (h11 * h) * grid_velocities_km_s[interval + 1][columns]
+    )
+
+
+class InterpolatedEphemeris:
+    """
+    Satellite ITRS positions propagated on a coarse time grid and served by
+    cubic Hermite interpolation of position and velocity.
+    """
+
+    def __init__(
+        self,
+        skyfield_sats,
+        start_dt,
+        seconds,
+        grid_step_s=DEFAULT_GRID_SECONDS,
+        timescale=None,
+        backend="skyfield",
+    ):
+        grid_step_s = float(grid_step_s)
+        if not np.isfinite(grid_step_s) or grid_step_s <= 0:
+            raise ValueError("grid_step_s must be a finite positive value.")
+        seconds = float(seconds)
+        if not np.isfinite(seconds) or seconds < 0:
+            raise ValueError("seconds must be a finite non-negative value.")
+        if len(skyfield_sats) == 0:
+            raise ValueError("InterpolatedEphemeris needs at least one satellite.")
+
+        self.skyfield_sats = list(skyfield_sats)
+        self.start_dt = start_dt
+        self.seconds = seconds
+        self.grid_step_s = grid_step_s
+        self.timescale = load.timescale() if timescale is None else timescale
+        self.backend = check_backend(backend)
+        self.propagate = PROPAGATORS[self.backend]
+
+        # Always cover [0, seconds] with at least one full interval.
+        interval_count = max(1, int(np.ceil(seconds / grid_step_s)))
+        self.grid_offsets_s = np.arange(interval_count + 1, dtype=float) * grid_step_s
+        grid_times = offsets_to_times(self.timescale, start_dt, self.grid_offsets_s)
+        self.grid_positions_km, self.grid_velocities_km_s = self.propagate(
+            self.skyfield_sats,
+            grid_times,
+        )
+
+    @property
+    def sat_count(self):
+        return len(self.skyfield_sats)
+
+    def positions_km(self, offset_s):
+        """Return interpolated (K, 3) ITRS positions at offset_s seconds."""
+        offset_s = float(offset_s)
+        if offset_s < 0 or offset_s > self.grid_offsets_s[-1] + 1e-9:
+            raise ValueError(
+                f"Offset {offset_s:g} s is outside the ephemeris window "
+                f"[0, {self.grid_offsets_s[-1]:g}] s."
+            )
+        return hermite_positions_km(
+            self.grid_offsets_s,
+            self.grid_step_s,
+            self.grid_positions_km,
+            self.grid_velocities_km_s,
+            offset_s,
+        )
+
+    def max_position_error_km(self, offsets_s=None):
+        """
+        Compare interpolated positions against direct propagation.
+
+        By default the check uses every grid-interval midpoint, where the
+        Hermite error is largest.
+        """
+        if offsets_s is None:
+            offsets_s = 0.5 * (self.grid_offsets_s[:-1] + self.grid_offsets_s[1:])
+        offsets_s = np.atleast_1d(np.asarray(offsets_s, dtype=float))
+        if len(offsets_s) == 0:
+            return 0.0
+        exact_km, _ = self.propagate(
+            self.skyfield_sats,
+            offsets_to_times(self.timescale, self.start_dt, offsets_s),
+        )
+        interpolated_km = np.stack([self.positions_km(offset) for offset in offsets_s])
+        return float(np.max(np.linalg.norm(interpolated_km - exact_km, axis=2)))
+
+
+class SGP4Ephemeris:
+    """
+    Direct per-call propagation with array SGP4; the positions_km interface
+    of InterpolatedEphemeris without the grid.
+
+    frame="exact" builds a Skyfield time and the full TEME->ITRS rotation
+    per call; frame="gmst" uses an EarthRotationFrame anchored at start_dt,
+    so a call is one SatrecArray propagation and one 3 x 3 rotation.
+    """
+
+    def __init__(self, skyfield_sats, start_dt, timescale=None, frame="exact"):
+        if len(skyfield_sats) == 0:
+            raise ValueError("SGP4Ephemeris needs at least one satellite.")
+        self.skyfield_sats = list(skyfield_sats)
+        self.start_dt = start_dt
+        self.timescale = load.timescale() if timescale is None else timescale
+        self.satrecs = SatrecArray([sat.model for sat in self.skyfield_sats])
+        self.frame = check_frame(frame)
+        self.earth_rotation = (
+            EarthRotationFrame(self.timescale, start_dt) if self.frame == "gmst" else None
+        )
+
+    @property
+    def sat_count(self):
+        return len(self.skyfield_sats)
+
+    def positions_km(self, offset_s):
+        """Return (K, 3) ITRS positions at offset_s seconds."""
+        if self.earth_rotation is not None:
+            jd, fraction = self.earth_rotation.julian_date(offset_s)
+            _, positions_teme, _ = self.satrecs.sgp4(np.array([jd]), np.array([fraction]))
+            return positions_teme[:, 0, :] @ self.earth_rotation.rotation(offset_s).T
+        times = offsets_to_times(self.timescale, self.start_dt, [offset_s])
+        _, positions_teme, _ = self.satrecs.sgp4(*sgp4_julian_dates(times))
+        return positions_teme[:, 0, :] @ teme_to_itrs_matrices(times)[0].T
+
+    def max_position_error_km(self, offsets_s=(0.0,)):
+        """Largest difference from per-satellite Skyfield propagation at offsets_s."""
+        offsets_s = np.atleast_1d(np.asarray(offsets_s, dtype=float))
+        reference_km, _ = propagate_itrs(
+            self.skyfield_sats,
+            offsets_to_times(self.timescale, self.start_dt, offsets_s),
+        )
+        positions_km = np.stack([self.positions_km(offset) for offset in offsets_s])
+        return float(np.max(np.linalg.norm(positions_km - reference_km, axis=2)))
+
+    def frame_error_report(self, offsets_s):
+        """
+        Deviation of this ephemeris' frame path from the exact one at
+        offsets_s: rotation-matrix error and satellite position error.
+        """
+        offsets_s = np.atleast_1d(np.asarray(offsets_s, dtype=float))
+        exact = SGP4Ephemeris(self.skyfield_sats, self.start_dt, timescale=self.timescale)
+        position_error_km = max(
+            float(np.max(np.linalg.norm(self.positions_km(offset) - exact.positions_km(offset), axis=1)))
+            for offset in offsets_s
+        )
+        rotation_error = 0.0
+        if self.earth_rotation is not None:
+            rotation_error = self.earth_rotation.max_rotation_error_rad(offsets_s)
+        return {
+            "frame": self.frame,
+            "max_rotation_error_rad": rotation_error,
+            "max_position_error_m": position_error_km * 1000,
+        }
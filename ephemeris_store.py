@@ -0,0 +1,157 @@
+import json
+import os
+import shutil
+import tempfile
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+from skyfield.api import load
+
+from ephemeris import DEFAULT_GRID_SECONDS, hermite_positions_km, offsets_to_times, propagate_itrs_sgp4
+
+
+DEFAULT_CACHE_DIR = "ephemeris_cache"
+
+
+def satellite_key(satellite):
+    # NORAD id alone is not unique in a TLE file; the epoch makes it so.
+    model = satellite.model
+    return int(model.satnum), float(model.jdsatepoch) + float(model.jdsatepochF)
+
+
+def store_directory_name(tle_sha256, start_dt, seconds, grid_step_s):
+    return f"{tle_sha256[:16]}_{start_dt.strftime('%Y%m%dT%H%M%S')}_{float(seconds):g}s_grid{float(grid_step_s):g}s"
+
+
+class ConstellationEphemerisStore:
+    """
+    ITRS positions and velocities of every satellite of a TLE file on a
+    time grid over the scenario window, saved as .npy files and opened
+    memory-mapped. The directory name carries the TLE SHA-256, the start
+    time, the window and the grid step, so pool-generation tools share one
+    propagation per TLE file. Positions between grid nodes use the same
+    cubic Hermite interpolation as ephemeris.InterpolatedEphemeris.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        with (self.path / "metadata.json").open(encoding="utf-8") as f:
+            self.metadata = json.load(f)
+        self.tle_sha256 = self.metadata["tle_sha256"]
+        self.start_dt = datetime.fromisoformat(self.metadata["start_dt_iso"])
+        self.seconds = float(self.metadata["seconds"])
+        self.grid_step_s = float(self.metadata["grid_step_s"])
+        self.grid_offsets_s = np.asarray(self.metadata["grid_offsets_s"], dtype=float)
+        self.grid_positions_km = np.load(self.path / "positions_km.npy", mmap_mode="r")
+        self.grid_velocities_km_s = np.load(self.path / "velocities_km_s.npy", mmap_mode="r")
+        self.columns = {
+            (int(satnum), float(epoch_jd)): column
+            for column, (satnum, epoch_jd) in enumerate(self.metadata["satellite_keys"])
+        }
+
+    @classmethod
+    def build(cls, satellites, tle_sha256, start_dt, seconds, path, grid_step_s=DEFAULT_GRID_SECONDS, timescale=None):
+        """Propagate `satellites` with array SGP4 and write the store to `path`."""
+        path = Path(path)
+        if len(satellites) == 0:
+            raise ValueError("The ephemeris store needs at least one satellite.")
+        timescale = load.timescale() if timescale is None else timescale
+        interval_count = max(1, int(np.ceil(float(seconds) / float(grid_step_s))))
+        grid_offsets_s = np.arange(interval_count + 1, dtype=float) * float(grid_step_s)
+        positions_km, velocities_km_s = propagate_itrs_sgp4(
+            satellites,
+            offsets_to_times(timescale, start_dt, grid_offsets_s),
+        )
+
+        # Write into a sibling temporary directory, then rename, so readers
+        # never see a half-written store.
+        path.parent.mkdir(parents=True, exist_ok=True)
+        staging = Path(tempfile.mkdtemp(prefix=path.name + ".", dir=path.parent))
+        try:
+            np.save(staging / "positions_km.npy", positions_km)
+            np.save(staging / "velocities_km_s.npy", velocities_km_s)
+            with (staging / "metadata.json").open("w", encoding="utf-8") as f:
+                json.dump({
+                    "tle_sha256": tle_sha256,
+                    "start_dt_iso": start_dt.isoformat(),
+                    "seconds": float(seconds),
+                    "grid_step_s": float(grid_step_s),
+                    "grid_offsets_s": grid_offsets_s.tolist(),
+                    "satellite_keys": [list(satellite_key(satellite)) for satellite in satellites],
+                    "names": [satellite.name for satellite in satellites],
+                }, f)
+            os.replace(staging, path)
+        except OSError:
+            shutil.rmtree(staging, ignore_errors=True)
+            if not (path / "metadata.json").exists():
+                raise
+        return cls(path)
+
+    @classmethod
+    def open_or_build(
+        cls,
+        satellites,
+        tle_sha256,
+        start_dt,
+        seconds,
+        grid_step_s=DEFAULT_GRID_SECONDS,
+        cache_dir=DEFAULT_CACHE_DIR,
+        timescale=None,
+    ):
+        path = Path(cache_dir) / store_directory_name(tle_sha256, start_dt, seconds, grid_step_s)
+        if (path / "metadata.json").exists():
+            store = cls(path)
+            if store.tle_sha256 == tle_sha256 and all(
+                satellite_key(satellite) in store.columns for satellite in satellites
+            ):
+                return store
+            raise ValueError(f"Ephemeris store {path} does not match the given TLE satellites.")
+        return cls.build(
+            satellites,
+            tle_sha256,
+            start_dt,
+            seconds,
+            path,
+            grid_step_s=grid_step_s,
+            timescale=timescale,
+        )
+
+    def columns_of(self, satellites):
+        return np.array([self.columns[satellite_key(satellite)] for satellite in satellites], dtype=int)
+
+    def offset_s(self, t):
+        """Seconds from the store start for a Skyfield Time, datetime or number."""
+        if hasattr(t, "utc_datetime"):
+            t = t.utc_datetime()
+        if isinstance(t, datetime):
+            t = (t - self.start_dt) / timedelta(seconds=1)
+        offset_s = float(t)
+        # Skyfield round trips through datetimes are exact only to 1 us.
+        if -1e-3 < offset_s < 0:
+            offset_s = 0.0
+        if offset_s < 0 or offset_s > self.grid_offsets_s[-1] + 1e-3:
+            raise ValueError(
+                f"Offset {offset_s:g} s is outside the store window [0, {self.grid_offsets_s[-1]:g}] s."
+            )
+        return min(offset_s, self.grid_offsets_s[-1])
+
+    def positions_km(self, t, satellites=None):
+        """(K, 3) ITRS positions at t for `satellites` (default: every stored satellite)."""
+        return hermite_positions_km(
+            self.grid_offsets_s,
+            self.grid_step_s,
+            self.grid_positions_km,
+            self.grid_velocities_km_s,
+            self.offset_s(t),
+            columns=None if satellites is None else self.columns_of(satellites),
+        )
+
+    def elevation_deg(self, ground, t, satellites=None):
+        """Elevation of each satellite seen from a wgs84 ground position at t."""
+        ground_km = np.asarray(ground.itrs_xyz.km, dtype=float)
+        lat = np.radians(ground.latitude.degrees)
+        lon = np.radians(ground.longitude.degrees)
+        up = np.array([np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)])
+        delta = self.positions_km(t, satellites) - ground_km
+        return np.degrees(np.arcsin(np.clip(delta @ up / np.linalg.norm(delta, axis=1), -1.0, 1.0)))
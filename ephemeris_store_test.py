@@ -0,0 +1,53 @@
+import tempfile
+from datetime import timedelta
+
+import numpy as np
+from skyfield.api import EarthSatellite, load, wgs84
+
+from ephemeris_store import ConstellationEphemerisStore
+from ephemeris_test import START_DT, TLE_LINES, build_satellites
+
+
+def test_store_elevations_match_skyfield_and_reopen_memory_mapped():
+    timescale = load.timescale()
+    satellites = build_satellites(timescale)
+    ground = wgs84.latlon(25.03, 121.56)
+    with tempfile.TemporaryDirectory() as cache_dir:
+        store = ConstellationEphemerisStore.open_or_build(
+            satellites, "ab" * 32, START_DT, 200, cache_dir=cache_dir, timescale=timescale
+        )
+        for offset_s in (0.0, 37.5, 100.0, 200.0):
+            t = timescale.from_datetime(START_DT + timedelta(seconds=offset_s))
+            expected = [(satellite - ground).at(t).altaz()[0].degrees for satellite in satellites]
+            assert np.allclose(store.elevation_deg(ground, t), expected, atol=1e-5)
+
+        reopened = ConstellationEphemerisStore.open_or_build(
+            satellites[::-1], "ab" * 32, START_DT, 200, cache_dir=cache_dir
+        )
+        assert isinstance(reopened.grid_positions_km, np.memmap)
+        assert reopened.path == store.path
+        assert np.allclose(
+            reopened.positions_km(50.0, satellites[::-1]),
+            store.positions_km(50.0)[::-1],
+        )
+
+
+def test_unknown_satellites_are_rejected():
+    timescale = load.timescale()
+    satellites = build_satellites(timescale)
+    name, line1, line2 = TLE_LINES[0]
+    # Same NORAD id, different epoch.
+    other = EarthSatellite(line1.replace("26001.00000000", "26001.50000000"), line2, name, timescale)
+    with tempfile.TemporaryDirectory() as cache_dir:
+        ConstellationEphemerisStore.open_or_build(satellites, "cd" * 32, START_DT, 60, cache_dir=cache_dir)
+        try:
+            ConstellationEphemerisStore.open_or_build([other], "cd" * 32, START_DT, 60, cache_dir=cache_dir)
+        except ValueError:
+            return
+    raise AssertionError("Expected a satellite missing from the store to be rejected.")
+
+
+if __name__ == "__main__":
+    test_store_elevations_match_skyfield_and_reopen_memory_mapped()
+    test_unknown_satellites_are_rejected()
+    print("ephemeris_store_test passed")
@@ -0,0 +1,127 @@
+from datetime import datetime, timezone
+
+import numpy as np
+from skyfield.api import EarthSatellite, load
+from skyfield.framelib import itrs
+
+from ephemeris import (
+    EarthRotationFrame,
+    InterpolatedEphemeris,
+    SGP4Ephemeris,
+    max_backend_difference_km,
+    offsets_to_times,
+    propagate_itrs,
+    propagate_itrs_sgp4,
+)
+
+
+TLE_LINES = (
+    (
+        "STARLINK-TEST-1",
+        "1 44713U          26001.00000000  .00000000  00000-0  32000-3 0    09",
+        "2 44713  53.0500 120.0000 0001400  85.0000  10.0000 15.06000000    08",
+    ),
+    (
+        "STARLINK-TEST-2",
+        "1 44714U          26001.00000000  .00000000  00000-0  32000-3 0    00",
+        "2 44714  53.0500 125.0000 0001400  85.0000  40.0000 15.06000000    07",
+    ),
+)
+START_DT = datetime(2026, 1, 1, 0, 30, tzinfo=timezone.utc)
+
+
+def build_satellites(timescale):
+    return [
+        EarthSatellite(line1, line2, name, timescale)
+        for name, line1, line2 in TLE_LINES
+    ]
+
+
+def test_grid_nodes_match_direct_propagation():
+    timescale = load.timescale()
+    satellites = build_satellites(timescale)
+    ephemeris = InterpolatedEphemeris(
+        satellites,
+        START_DT,
+        seconds=30,
+        grid_step_s=10.0,
+        timescale=timescale,
+    )
+    direct = np.stack([
+        sat.at(timescale.from_datetime(START_DT)).frame_xyz(itrs).km
+        for sat in satellites
+    ])
+    assert np.allclose(ephemeris.positions_km(0.0), direct, atol=1e-9)
+
+
+def test_interpolation_error_is_sub_metre_on_ten_second_grid():
+    timescale = load.timescale()
+    ephemeris = InterpolatedEphemeris(
+        build_satellites(timescale),
+        START_DT,
+        seconds=60,
+        grid_step_s=10.0,
+        timescale=timescale,
+    )
+    assert ephemeris.max_position_error_km() < 1e-3
+    assert ephemeris.max_position_error_km([0.1, 12.3, 59.9]) < 1e-3
+
+
+def test_offsets_outside_window_are_rejected():
+    timescale = load.timescale()
+    ephemeris = InterpolatedEphemeris(
+        build_satellites(timescale),
+        START_DT,
+        seconds=5,
+        grid_step_s=10.0,
+        timescale=timescale,
+    )
+    try:
+        ephemeris.positions_km(11.0)
+    except ValueError:
+        return
+    raise AssertionError("Expected an out-of-window offset to be rejected.")
+
+
+def test_array_sgp4_backend_matches_skyfield():
+    timescale = load.timescale()
+    satellites = build_satellites(timescale)
+    times = offsets_to_times(timescale, START_DT, np.arange(0.0, 200.0, 7.5))
+    positions_km, velocities_km_s = propagate_itrs(satellites, times)
+    sgp4_positions_km, sgp4_velocities_km_s = propagate_itrs_sgp4(satellites, times)
+    assert np.max(np.linalg.norm(sgp4_positions_km - positions_km, axis=2)) < 1e-3
+    assert np.max(np.linalg.norm(sgp4_velocities_km_s - velocities_km_s, axis=2)) < 1e-6
+    assert max_backend_difference_km(satellites, times) < 1e-3
+
+    direct = SGP4Ephemeris(satellites, START_DT, timescale=timescale)
+    assert np.allclose(direct.positions_km(30.0), propagate_itrs(satellites, offsets_to_times(timescale, START_DT, [30.0]))[0][0], atol=1e-6)
+    gridded = InterpolatedEphemeris(satellites, START_DT, seconds=60, timescale=timescale, backend="sgp4")
+    assert gridded.max_position_error_km() < 1e-3
+
+
+def test_gmst_frame_stays_within_a_millimetre_of_the_exact_frame():
+    timescale = load.timescale()
+    satellites = build_satellites(timescale)
+    offsets_s = [0.0, 45.5, 300.0, 600.0]
+    fast = SGP4Ephemeris(satellites, START_DT, timescale=timescale, frame="gmst")
+    report = fast.frame_error_report(offsets_s)
+    assert report["frame"] == "gmst"
+    assert report["max_rotation_error_rad"] < 1e-9
+    assert report["max_position_error_m"] < 1e-3
+    assert fast.max_position_error_km(offsets_s) < 1e-3
+    # At the reference time the fast path is the exact rotation.
+    assert EarthRotationFrame(timescale, START_DT).max_rotation_error_rad([0.0]) < 1e-15
+    try:
+        SGP4Ephemeris(satellites, START_DT, timescale=timescale, frame="iau2000")
+    except ValueError:
+        return
+    raise AssertionError("Expected an unknown frame path to be rejected.")
+
+
+if __name__ == "__main__":
+    test_grid_nodes_match_direct_propagation()
+    test_interpolation_error_is_sub_metre_on_ten_second_grid()
+    test_offsets_outside_window_are_rejected()
+    test_array_sgp4_backend_matches_skyfield()
+    test_gmst_frame_stays_within_a_millimetre_of_the_exact_frame()
+    print("ephemeris_test passed")
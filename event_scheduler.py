@@ -0,0 +1,69 @@
+import numpy as np
+
+
+class ArrivalScheduler:
+    """
+    Event-driven bookkeeping for main.main(EVENT_DRIVEN_ARRIVALS=True).
+
+    An idle UE gets a packet in each RAO with probability arrival_prob, so
+    its next arrival RAO is geometric. Arrivals sit in a calendar queue with
+    one bucket per RAO. Active UEs sit in a timing wheel keyed by the RAO in
+    which UE.new_time would drop them. Per-RAO work is then proportional to
+    the active UEs plus the events of that RAO, not to NUM_UE.
+    """
+
+    def __init__(self, ue_count, rao_count, arrival_prob, max_budget):
+        self.rao_count = int(rao_count)
+        self.arrival_prob = float(arrival_prob)
+        self.calendar = [[] for _ in range(self.rao_count)]
+        self.wheel = [[] for _ in range(int(max_budget) + 1)]
+        self.expiry_rao = np.full(int(ue_count), -1, dtype=np.int64)
+        self.active = set()
+        self.schedule_arrivals(np.arange(int(ue_count)), 0)
+
+    def schedule_arrivals(self, ue_ids, earliest_rao):
+        """Draw the next arrival RAO of UEs that are idle from earliest_rao on."""
+        ue_ids = np.asarray(ue_ids, dtype=np.int64)
+        if len(ue_ids) == 0 or self.arrival_prob <= 0:
+            return
+        arrival_rao = earliest_rao - 1 + np.random.geometric(
+            min(self.arrival_prob, 1.0),
+            size=len(ue_ids),
+        )
+        for ue_id, rao in zip(ue_ids.tolist(), arrival_rao.tolist()):
+            if rao < self.rao_count:
+                self.calendar[rao].append(ue_id)
+
+    def pop_arrivals(self, n):
+        arrivals = self.calendar[n]
+        self.calendar[n] = []
+        return arrivals
+
+    def activate(self, ue_id, expiry_rao):
+        # expiry_rao is at most max_budget RAOs ahead, so its wheel slot is
+        # not popped again before the deadline.
+        self.active.add(ue_id)
+        self.expiry_rao[ue_id] = expiry_rao
+        self.wheel[expiry_rao % len(self.wheel)].append(ue_id)
+
+    def deactivate(self, ue_id, n):
+        """UE went idle during RAO n; its next packet can arrive from RAO n + 1."""
+        self.active.discard(ue_id)
+        self.expiry_rao[ue_id] = -1
+        self.schedule_arrivals([ue_id], n + 1)
+
+    def pop_deadlines(self, n):
+        """Active UEs whose delay budget runs out at RAO n."""
+        slot = n % len(self.wheel)
+        bucket = self.wheel[slot]
+        self.wheel[slot] = []
+        # Entries of UEs that already succeeded (or were re-armed) are stale.
+        return [
+            ue_id
+            for ue_id in bucket
+            if ue_id in self.active and self.expiry_rao[ue_id] == n
+        ]
+
+    def active_ids(self):
+        """Active UE ids in ascending order, matching the ue_list loop order."""
+        return sorted(self.active)
@@ -0,0 +1,65 @@
+import contextlib
+import io
+
+import numpy as np
+
+import main
+from event_scheduler import ArrivalScheduler
+from scenario_test import scenario_directory
+
+
+def test_first_arrivals_are_geometric():
+    np.random.seed(2)
+    ue_count, rao_count, arrival_prob = 20000, 50, 0.05
+    scheduler = ArrivalScheduler(ue_count, rao_count, arrival_prob, max_budget=20)
+    per_rao = np.array([len(scheduler.pop_arrivals(n)) for n in range(rao_count)])
+    expected = ue_count * arrival_prob * (1 - arrival_prob) ** np.arange(rao_count)
+    assert np.all(np.abs(per_rao - expected) < 5 * np.sqrt(expected) + 1)
+
+
+def test_deadlines_fire_once_and_skip_stale_entries():
+    np.random.seed(0)
+    scheduler = ArrivalScheduler(3, 100, 0.0, max_budget=20)
+    scheduler.activate(0, 5)
+    scheduler.activate(1, 5)
+    scheduler.activate(2, 20)
+    scheduler.deactivate(1, 3)
+
+    fired = {n: scheduler.pop_deadlines(n) for n in range(25)}
+    assert fired[5] == [0]
+    # UE 1 went idle before its deadline, so its wheel entry is stale.
+    assert fired[20] == [2]
+    assert sum(len(ids) for ids in fired.values()) == 2
+    assert scheduler.active_ids() == [0, 2]
+
+
+def test_event_driven_runs_compute_geometry_only_for_active_ues():
+    ue_count = 400
+    computed = []
+    ue_sat_geometry = main.ue_sat_geometry
+
+    def recording_geometry(geometry, rows, *args, **kwargs):
+        rows = np.arange(geometry.ue_count)[rows]
+        computed.append((len(rows), all(geometry.ue_list[row].active for row in rows)))
+        return ue_sat_geometry(geometry, rows, *args, **kwargs)
+
+    with scenario_directory():
+        main.ue_sat_geometry = recording_geometry
+        try:
+            for mode in ([6, 3], [5, 3]):
+                computed.clear()
+                with contextlib.redirect_stdout(io.StringIO()):
+                    result = main.main(0.2, 1, ue_count, mode, 3, 0.001, EVENT_DRIVEN_ARRIVALS=True)
+                assert result[0] > 0
+                assert computed and all(active for _, active in computed)
+                # Ten RAOs; at rho=0.2 most UEs stay idle and are never recomputed.
+                assert sum(count for count, _ in computed) < ue_count * 10 // 2
+        finally:
+            main.ue_sat_geometry = ue_sat_geometry
+
+
+if __name__ == "__main__":
+    test_first_arrivals_are_geometric()
+    test_deadlines_fire_once_and_skip_stale_entries()
+    test_event_driven_runs_compute_geometry_only_for_active_ues()
+    print("event_scheduler_test passed")
@@ -0,0 +1,190 @@
+"""
+Declarative experiment graphs over main.main.
+
+An Experiment holds named nodes: simulation runs (main.main arguments),
+offline evaluations and figure renderings, the latter two being functions
+of the results of the nodes they depend on. A Scheduler takes several
+experiments at once and
+
+- deduplicates runs across them by their result_cache key, so a
+  configuration shared by two experiments is simulated once;
+- executes missing runs in parallel worker processes (forked after the
+  shared scenarios are loaded, so workers inherit them copy-on-write);
+- resumes: every finished run is stored in the result cache, so an
+  interrupted experiment set restarts from the runs still missing.
+
+Evaluations and renderings run in the calling process as soon as their
+dependencies are available.
+"""
+import multiprocessing
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import main
+import result_cache
+
+
+NODE_KINDS = ("run", "evaluate", "render")
+
+
+class Node:
+    def __init__(self, name, kind, deps=(), function=None, args=(), kwargs=None):
+        if kind not in NODE_KINDS:
+            raise ValueError(f"Unknown node kind {kind!r}; expected one of {NODE_KINDS}.")
+        self.name = name
+        self.kind = kind
+        self.deps = tuple(deps)
+        self.function = function
+        self.args = tuple(args)
+        self.kwargs = dict(kwargs or {})
+
+
+class Experiment:
+    """Named nodes of one experiment; dependencies refer to node names in the same experiment."""
+
+    def __init__(self, name):
+        self.name = str(name)
+        self.nodes = {}
+
+    def _add(self, node):
+        if node.name in self.nodes:
+            raise ValueError(f"Experiment {self.name} already has a node named {node.name!r}.")
+        missing = [dep for dep in node.deps if dep not in self.nodes]
+        if missing:
+            raise ValueError(f"Node {node.name!r} depends on undefined nodes {missing}.")
+        self.nodes[node.name] = node
+        return node.name
+
+    def run(self, name, *args, **kwargs):
+        """A main.main(*args, **kwargs) run; its result is the returned 7-tuple."""
+        return self._add(Node(name, "run", args=args, kwargs=kwargs))
+
+    def evaluate(self, name, function, deps):
+        """function(*results of deps), computed offline from finished nodes."""
+        return self._add(Node(name, "evaluate", deps=deps, function=function))
+
+    def render(self, name, function, deps):
+        """Like evaluate, for nodes that draw or save figures."""
+        return self._add(Node(name, "render", deps=deps, function=function))
+
+
+def _execute_run(cache_dir, runner, args, kwargs):
+    return result_cache.ResultCache(cache_dir).run(*args, runner=runner, **kwargs)
+
+
+def _process_context():
+    # Fork shares the parent's loaded scenarios; elsewhere workers load their own.
+    if "fork" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("fork")
+    return None
+
+
+class Scheduler:
+    def __init__(
+        self,
+        experiments,
+        cache_dir=result_cache.DEFAULT_CACHE_DIR,
+        workers=None,
+        runner=main.run_with_shared_scenario,
+    ):
+        self.experiments = list(experiments)
+        self.cache = result_cache.ResultCache(cache_dir)
+        self.workers = max(1, int(os.cpu_count() or 1) if workers is None else int(workers))
+        self.runner = runner
+        self.results = {}
+        # Qualified node name -> result_cache key, and one representative run per key.
+        self.run_keys = {}
+        self.unique_runs = {}
+        for experiment in self.experiments:
+            for node in experiment.nodes.values():
+                if node.kind == "run":
+                    key = result_cache.result_key(node.args, node.kwargs)
+                    self.run_keys[self.qualified(experiment, node.name)] = key
+                    self.unique_runs.setdefault(key, node)
+
+    @staticmethod
+    def qualified(experiment, name):
+        return f"{experiment.name}/{name}"
+
+    def summary(self):
+        cached = sum(1 for key in self.unique_runs if self.cache.path(key).exists())
+        return {
+            "run_nodes": len(self.run_keys),
+            "unique_runs": len(self.unique_runs),
+            "cached_runs": cached,
+        }
+
+    def _run_results(self):
+        """Result of every unique run, from the cache or freshly simulated."""
+        results = {}
+        missing = []
+        for key, node in self.unique_runs.items():
+            result = self.cache.get(key)
+            if result is None:
+                missing.append((key, node))
+            else:
+                results[key] = result
+        yield from results.items()
+        if not missing:
+            return
+        if self.workers == 1 or len(missing) == 1:
+            for key, node in missing:
+                yield key, self.cache.run(*node.args, runner=self.runner, **node.kwargs)
+            return
+        if self.runner is main.run_with_shared_scenario:
+            # Load each distinct scenario once, before the workers fork.
+            for _, node in missing:
+                main.shared_scenario(
+                    node.kwargs.get("SATELLITE_POOL_FILENAME", "fixed_satellite_pool.json"),
+                    node.kwargs.get("GROUP_TABLE_FILENAME", "group_ps_table.npz"),
+                    node.kwargs.get("SERVICE_RADIUS_KM", 200.0),
+                )
+        with ProcessPoolExecutor(max_workers=min(self.workers, len(missing)), mp_context=_process_context()) as pool:
+            futures = {
+                pool.submit(_execute_run, str(self.cache.cache_dir), self.runner, node.args, node.kwargs): key
+                for key, node in missing
+            }
+            pending = set(futures)
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield futures[future], future.result()
+
+    def _ready_tasks(self, finished):
+        for experiment in self.experiments:
+            for node in experiment.nodes.values():
+                name = self.qualified(experiment, node.name)
+                if node.kind == "run" or name in finished:
+                    continue
+                deps = [self.qualified(experiment, dep) for dep in node.deps]
+                if all(dep in self.results for dep in deps):
+                    yield name, node, deps
+
+    def _run_ready_tasks(self, finished):
+        # Evaluations unlock renderings, so repeat until nothing new is ready.
+        progressed = True
+        while progressed:
+            progressed = False
+            for name, node, deps in list(self._ready_tasks(finished)):
+                self.results[name] = node.function(*[self.results[dep] for dep in deps])
+                finished.add(name)
+                progressed = True
+
+    def execute(self):
+        """Run every node; returns {"experiment/node": result}."""
+        summary = self.summary()
+        print(
+            f"Experiment DAG: {summary['run_nodes']} run nodes, {summary['unique_runs']} unique, "
+            f"{summary['cached_runs']} cached, workers={self.workers}"
+        )
+        keys_to_names = {}
+        for name, key in self.run_keys.items():
+            keys_to_names.setdefault(key, []).append(name)
+        finished = set()
+        self._run_ready_tasks(finished)
+        for key, result in self._run_results():
+            for name in keys_to_names[key]:
+                self.results[name] = result
+                finished.add(name)
+            self._run_ready_tasks(finished)
+        return self.results
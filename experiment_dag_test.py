@@ -0,0 +1,83 @@
+import os
+import tempfile
+
+from experiment_dag import Experiment, Scheduler
+from result_cache_test import write_inputs
+
+
+def fake_main(rho, seconds, num_ue, mode, seed, imbalance_epsilon, **kwargs):
+    with open("runner_calls.txt", "a", encoding="utf-8") as f:
+        f.write(f"{rho} {mode}\n")
+    return rho * 100, rho / 10, [], None, None, [], {"mode": list(mode)}
+
+
+def sweep(name, modes, rhos=(1.0, 1.5)):
+    experiment = Experiment(name)
+    for mode in modes:
+        runs = [experiment.run(f"{mode} @ {rho}", rho, 3, 100, mode, 42, 0.001) for rho in rhos]
+        experiment.evaluate(f"{mode} plr", lambda *results: [result[1] for result in results], runs)
+    experiment.render("table", lambda *plrs: sum(len(plr) for plr in plrs), [f"{mode} plr" for mode in modes])
+    return experiment
+
+
+def runner_calls():
+    if not os.path.exists("runner_calls.txt"):
+        return []
+    with open("runner_calls.txt", encoding="utf-8") as f:
+        return f.read().splitlines()
+
+
+def in_temporary_inputs(test):
+    def wrapper():
+        previous_dir = os.getcwd()
+        with tempfile.TemporaryDirectory() as work_dir:
+            os.chdir(work_dir)
+            try:
+                write_inputs(work_dir)
+                test()
+            finally:
+                os.chdir(previous_dir)
+    wrapper.__name__ = test.__name__
+    return wrapper
+
+
+@in_temporary_inputs
+def test_shared_runs_execute_once_and_resume_from_cache():
+    experiments = [sweep("a", [[6, 1], [5, 3]]), sweep("b", [[6, 1], [6, 2]])]
+    scheduler = Scheduler(experiments, cache_dir="cache", workers=1, runner=fake_main)
+    assert scheduler.summary() == {"run_nodes": 8, "unique_runs": 6, "cached_runs": 0}
+    results = scheduler.execute()
+    assert len(runner_calls()) == 6
+    assert results["a/[6, 1] plr"] == [0.1, 0.15]
+    assert results["b/[6, 1] @ 1.5"] is results["a/[6, 1] @ 1.5"]
+    assert results["a/table"] == 4 and results["b/table"] == 4
+
+    resumed = Scheduler(experiments + [sweep("c", [[7, 3]], rhos=(2.0,))], cache_dir="cache", workers=1, runner=fake_main)
+    assert resumed.summary()["cached_runs"] == 6
+    assert resumed.execute()["c/table"] == 1
+    assert len(runner_calls()) == 7
+
+
+@in_temporary_inputs
+def test_parallel_workers_match_sequential_results():
+    experiments = [sweep("a", [[6, 1], [5, 3]], rhos=(1.0, 2.0, 3.0))]
+    parallel = Scheduler(experiments, cache_dir="parallel", workers=2, runner=fake_main).execute()
+    sequential = Scheduler(experiments, cache_dir="sequential", workers=1, runner=fake_main).execute()
+    assert parallel.keys() == sequential.keys()
+    assert all(parallel[name] == sequential[name] for name in parallel)
+
+
+def test_undefined_dependencies_are_rejected():
+    experiment = Experiment("a")
+    try:
+        experiment.evaluate("plr", len, ["missing run"])
+    except ValueError:
+        return
+    raise AssertionError("Expected a dependency on an undefined node to be rejected.")
+
+
+if __name__ == "__main__":
+    test_shared_runs_execute_once_and_resume_from_cache()
+    test_parallel_workers_match_sequential_results()
+    test_undefined_dependencies_are_rejected()
+    print("experiment_dag_test passed")
@@ -6,6 +6,7 @@ from time import perf_counter
 import numpy as np
 from skyfield.api import load, wgs84
 
+from ephemeris_store import ConstellationEphemerisStore
 from satellite_preselection import compute_group_ps_table, generate_uniform_locations
 from scenario_time import get_tle_scenario_metadata, load_starlink_tles
 
@@ -28,14 +29,25 @@ TOLERANCE_RAAN = np.deg2rad(5.0)
 TOLERANCE_INC = np.deg2rad(1.0)
 
 
-def build_ranked_planes(starlinks, start_time, location):
+def build_ranked_planes(starlinks, start_time, location, ephemeris_store=None):
     visible_plane_fingerprints = set()
     visibility_errors = 0
+    store_elevations = (
+        ephemeris_store.elevation_deg(location, start_time, starlinks)
+        if ephemeris_store is not None
+        else None
+    )
 
-    for satellite in starlinks:
+    for index, satellite in enumerate(starlinks):
         try:
-            altitude, _, _ = (satellite - location).at(start_time).altaz()
-            if altitude.degrees > MIN_ELEVATION_DEG:
+            if store_elevations is not None:
+                if not np.isfinite(store_elevations[index]):
+                    raise ValueError("SGP4 propagation failed.")
+                altitude_deg = store_elevations[index]
+            else:
+                altitude, _, _ = (satellite - location).at(start_time).altaz()
+                altitude_deg = altitude.degrees
+            if altitude_deg > MIN_ELEVATION_DEG:
                 visible_plane_fingerprints.add((
                     satellite.model.inclo,
                     satellite.model.nodeo,
@@ -80,7 +92,14 @@ def satellites_in_planes(starlinks, selected_planes):
     return selected_satellites
 
 
-def filter_midpoint_visible(satellites, location, midpoint_time):
+def filter_midpoint_visible(satellites, location, midpoint_time, ephemeris_store=None):
+    if ephemeris_store is not None:
+        elevations = ephemeris_store.elevation_deg(location, midpoint_time, satellites)
+        return [
+            satellite
+            for satellite, elevation in zip(satellites, elevations)
+            if elevation > MIN_ELEVATION_DEG
+        ]
     active_satellites = []
     for satellite in satellites:
         altitude, _, _ = (satellite - location).at(midpoint_time).altaz()
@@ -167,11 +186,20 @@ def main():
     )
     midpoint_time = timescale.from_datetime(midpoint_datetime)
     location = wgs84.latlon(*LOCATION_LAT_LON)
+    # Whole-constellation positions, propagated once per TLE file and reused.
+    ephemeris_store = ConstellationEphemerisStore.open_or_build(
+        starlinks,
+        scenario_metadata["tle_file_sha256"],
+        scenario_metadata["start_dt"],
+        SIMULATION_SECONDS,
+        timescale=timescale,
+    )
 
     ranked_planes, visible_count, visibility_errors = build_ranked_planes(
         starlinks,
         start_time,
         location,
+        ephemeris_store=ephemeris_store,
     )
     highest_required_rank = max(
         rank
@@ -196,6 +224,7 @@ def main():
             plane_satellites,
             location,
             midpoint_time,
+            ephemeris_store=ephemeris_store,
         )
         pending_outputs.append({
             "name": name,
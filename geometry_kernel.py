@@ -0,0 +1,116 @@
+"""
+Shared UE x satellite elevation/distance kernel.
+
+"delta" is the original formulation: it materializes the N x K x 3 vector
+from every UE to every satellite and projects it onto the UE's ENU axes.
+"gemm" gets each ENU component from one (N x 3)·(3 x K) matrix product
+minus a per-UE offset (axis · UE position), and the slant range from the
+ENU components (the axes are orthonormal). The two agree to rounding; the
+default stays "delta" so existing tables and runs reproduce bit for bit.
+"""
+import numpy as np
+
+
+KERNELS = ("delta", "gemm")
+
+
+def check_kernel(kernel):
+    if kernel not in KERNELS:
+        raise ValueError(f"Unknown geometry kernel {kernel!r}; expected one of {KERNELS}.")
+    return kernel
+
+
+def elevation_distance(ue_ecef_km, east, north, up, sat_ecef_km, kernel="delta", elevation_out=None, distance_out=None):
+    """(elevation_deg, distance_km), both N x K, for N UEs and K satellites."""
+    check_kernel(kernel)
+    sat_ecef_km = np.asarray(sat_ecef_km)
+    shape = (len(ue_ecef_km), len(sat_ecef_km))
+    if elevation_out is None:
+        elevation_out = np.empty(shape, dtype=sat_ecef_km.dtype)
+    if distance_out is None:
+        distance_out = np.empty(shape, dtype=sat_ecef_km.dtype)
+
+    if kernel == "delta":
+        delta = sat_ecef_km[None, :, :] - ue_ecef_km[:, None, :]
+        up_component = np.einsum("nkd,nd->nk", delta, up)
+        east_component = np.einsum("nkd,nd->nk", delta, east)
+        north_component = np.einsum("nkd,nd->nk", delta, north)
+        horizontal_distance = np.hypot(east_component, north_component)
+        np.degrees(np.arctan2(up_component, horizontal_distance), out=elevation_out)
+        distance_out[...] = np.linalg.norm(delta, axis=2)
+        return elevation_out, distance_out
+
+    sat_t = sat_ecef_km.T
+    up_component = up @ sat_t
+    up_component -= np.einsum("nd,nd->n", up, ue_ecef_km)[:, None]
+    east_component = east @ sat_t
+    east_component -= np.einsum("nd,nd->n", east, ue_ecef_km)[:, None]
+    north_component = north @ sat_t
+    north_component -= np.einsum("nd,nd->n", north, ue_ecef_km)[:, None]
+    horizontal_distance = np.hypot(east_component, north_component, out=east_component)
+    np.hypot(horizontal_distance, up_component, out=distance_out)
+    np.degrees(np.arctan2(up_component, horizontal_distance), out=elevation_out)
+    return elevation_out, distance_out
+
+
+def top_k_by_elevation(elevation_deg, k):
+    """
+    Column indices of the k highest elevations per row, highest first.
+
+    Same result as np.argsort(elevation_deg, axis=1)[:, ::-1][:, :k] for
+    distinct elevations, at O(K) instead of O(K log K) per row.
+    """
+    elevation_deg = np.asarray(elevation_deg)
+    sat_count = elevation_deg.shape[1]
+    k = min(int(k), sat_count)
+    if k <= 0:
+        return np.zeros((elevation_deg.shape[0], 0), dtype=np.intp)
+    if k < sat_count:
+        candidates = np.argpartition(elevation_deg, sat_count - k, axis=1)[:, sat_count - k:]
+    else:
+        candidates = np.broadcast_to(np.arange(sat_count), elevation_deg.shape)
+    values = np.take_along_axis(elevation_deg, candidates, axis=1)
+    order = np.argsort(values, axis=1)[:, ::-1]
+    return np.take_along_axis(candidates, order, axis=1)
+
+
+DTYPES = ("float64", "float32")
+
+
+def check_dtype(dtype):
+    name = np.dtype(dtype).name
+    if name not in DTYPES:
+        raise ValueError(f"Unsupported geometry dtype {name!r}; expected one of {DTYPES}.")
+    return np.dtype(name)
+
+
+def precision_report(ue_ecef_km, east, north, up, sat_ecef_km, channel_probability, dtype="float32", kernel="delta", group_size=2):
+    """
+    Deviation of a reduced-precision geometry pass from float64.
+
+    Inputs are float64; channel_probability(elevation_deg, distance_km) is the
+    channel model applied to both passes. UEs whose Top-`group_size` order
+    differs are listed by row index.
+    """
+    dtype = check_dtype(dtype)
+    frames = [np.asarray(array, dtype=float) for array in (ue_ecef_km, east, north, up)]
+    sat_ecef_km = np.asarray(sat_ecef_km, dtype=float)
+    elevation, distance = elevation_distance(*frames, sat_ecef_km, kernel=kernel)
+    low_elevation, low_distance = elevation_distance(
+        *[array.astype(dtype) for array in frames],
+        sat_ecef_km.astype(dtype),
+        kernel=kernel,
+    )
+    probability = np.asarray(channel_probability(elevation, distance), dtype=float)
+    low_probability = np.asarray(channel_probability(low_elevation, low_distance), dtype=dtype)
+    changed = np.any(
+        top_k_by_elevation(elevation, group_size) != top_k_by_elevation(low_elevation, group_size),
+        axis=1,
+    )
+    return {
+        "dtype": dtype.name,
+        "max_elevation_error_deg": float(np.max(np.abs(low_elevation - elevation), initial=0.0)),
+        "max_distance_error_km": float(np.max(np.abs(low_distance - distance), initial=0.0)),
+        "max_channel_probability_error": float(np.max(np.abs(low_probability - probability), initial=0.0)),
+        "group_order_changed_ues": np.flatnonzero(changed).tolist(),
+    }
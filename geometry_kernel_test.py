@@ -0,0 +1,65 @@
+import numpy as np
+
+from geometry_kernel import elevation_distance, precision_report, top_k_by_elevation
+from satellite_preselection_top3 import prepare_ue_geometry
+from skyfield.api import wgs84
+
+
+def sample_geometry(rng, ue_count=300, sat_count=400):
+    locations = [
+        wgs84.latlon(lat, lon)
+        for lat, lon in zip(
+            25.03 + rng.uniform(-2.0, 2.0, ue_count),
+            121.56 + rng.uniform(-2.0, 2.0, ue_count),
+        )
+    ]
+    directions = rng.normal(size=(sat_count, 3))
+    directions /= np.linalg.norm(directions, axis=1)[:, None]
+    sat_ecef_km = directions * rng.uniform(6378 + 300, 6378 + 1200, sat_count)[:, None]
+    return prepare_ue_geometry(locations), sat_ecef_km
+
+
+def test_gemm_kernel_matches_delta_kernel():
+    (ecef, east, north, up), sat_ecef_km = sample_geometry(np.random.RandomState(3))
+    elevation, distance = elevation_distance(ecef, east, north, up, sat_ecef_km)
+    gemm_elevation, gemm_distance = elevation_distance(ecef, east, north, up, sat_ecef_km, kernel="gemm")
+    assert np.max(np.abs(gemm_elevation - elevation)) < 1e-9
+    assert np.max(np.abs(gemm_distance - distance) / distance) < 1e-12
+
+
+def test_top_k_matches_full_argsort():
+    rng = np.random.RandomState(8)
+    elevation = rng.uniform(-90.0, 90.0, size=(500, 60))
+    for k in (1, 2, 3, 60, 80):
+        expected = np.argsort(elevation, axis=1)[:, ::-1][:, :k]
+        assert np.array_equal(top_k_by_elevation(elevation, k), expected)
+
+
+def test_float32_precision_report():
+    (ecef, east, north, up), sat_ecef_km = sample_geometry(np.random.RandomState(4))
+    for kernel in ("delta", "gemm"):
+        report = precision_report(
+            ecef, east, north, up, sat_ecef_km,
+            lambda elevation, distance: np.clip(elevation / 90.0, 0.0, 1.0),
+            kernel=kernel,
+        )
+        assert report["dtype"] == "float32"
+        assert 0 < report["max_elevation_error_deg"] < 1e-2
+        assert report["max_channel_probability_error"] < 1e-3
+        assert all(0 <= ue < len(ecef) for ue in report["group_order_changed_ues"])
+
+
+def test_unknown_kernel_is_rejected():
+    try:
+        elevation_distance(np.zeros((1, 3)), np.zeros((1, 3)), np.zeros((1, 3)), np.zeros((1, 3)), np.ones((1, 3)), kernel="fft")
+    except ValueError:
+        return
+    raise AssertionError("Expected an unknown geometry kernel to be rejected.")
+
+
+if __name__ == "__main__":
+    test_gemm_kernel_matches_delta_kernel()
+    test_top_k_matches_full_argsort()
+    test_float32_precision_report()
+    test_unknown_kernel_is_rejected()
+    print("geometry_kernel_test passed")
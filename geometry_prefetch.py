@@ -0,0 +1,61 @@
+import queue
+import threading
+
+
+class GeometryPrefetcher:
+    """
+    Runs compute(n) for n = 0, 1, ... on a worker thread, ahead of the caller.
+
+    main.main(PREFETCH_GEOMETRY=True) uses it for satellite positions and the
+    UE x satellite elevation/distance matrices, which depend only on the RAO
+    time. The bounded queue keeps at most `depth` RAOs of results in memory.
+    Results must be requested in order with get(n).
+    """
+
+    def __init__(self, compute, rao_count, depth=1):
+        if depth < 1:
+            raise ValueError("Prefetch depth must be at least 1.")
+        self.compute = compute
+        self.rao_count = int(rao_count)
+        self.results = queue.Queue(maxsize=int(depth))
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, name="geometry-prefetch", daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        for n in range(self.rao_count):
+            if self.stopped.is_set():
+                return
+            try:
+                item = (n, self.compute(n), None)
+            except BaseException as exc:
+                item = (n, None, exc)
+            while not self.stopped.is_set():
+                try:
+                    self.results.put(item, timeout=0.1)
+                    break
+                except queue.Full:
+                    continue
+            if item[2] is not None:
+                return
+
+    def get(self, n):
+        """Result of compute(n); re-raises an exception from the worker."""
+        produced_n, result, exc = self.results.get()
+        if exc is not None:
+            self.close()
+            raise exc
+        if produced_n != n:
+            self.close()
+            raise RuntimeError(f"Prefetched RAO {produced_n} requested as RAO {n}.")
+        return result
+
+    def close(self):
+        self.stopped.set()
+        # Drain so a blocked put() notices the stop flag promptly.
+        while True:
+            try:
+                self.results.get_nowait()
+            except queue.Empty:
+                break
+        self.thread.join()
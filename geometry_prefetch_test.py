@@ -0,0 +1,43 @@
+import numpy as np
+
+from geometry_prefetch import GeometryPrefetcher
+
+
+def test_results_arrive_in_order():
+    prefetcher = GeometryPrefetcher(lambda n: np.full(3, n), 20, depth=2)
+    try:
+        for n in range(20):
+            assert np.array_equal(prefetcher.get(n), np.full(3, n))
+    finally:
+        prefetcher.close()
+    assert not prefetcher.thread.is_alive()
+
+
+def test_worker_exception_is_raised_by_get():
+    def compute(n):
+        if n == 2:
+            raise FloatingPointError("bad RAO")
+        return n
+
+    prefetcher = GeometryPrefetcher(compute, 5)
+    assert prefetcher.get(0) == 0 and prefetcher.get(1) == 1
+    try:
+        prefetcher.get(2)
+    except FloatingPointError:
+        assert not prefetcher.thread.is_alive()
+        return
+    raise AssertionError("Expected the worker exception to reach the caller.")
+
+
+def test_close_stops_a_blocked_worker():
+    prefetcher = GeometryPrefetcher(lambda n: n, 1000, depth=1)
+    assert prefetcher.get(0) == 0
+    prefetcher.close()
+    assert not prefetcher.thread.is_alive()
+
+
+if __name__ == "__main__":
+    test_results_arrive_in_order()
+    test_worker_exception_is_raised_by_get()
+    test_close_stops_a_blocked_worker()
+    print("geometry_prefetch_test passed")
@@ -0,0 +1,160 @@
+import numpy as np
+
+
+class GroupTableRow:
+    """One RAO of the group table as dense arrays aligned with an integer group index."""
+
+    def __init__(self, keys, codes, weights, ps_matrix):
+        self.keys = keys
+        self.codes = codes
+        self.weights = weights
+        self.ps_matrix = ps_matrix
+        self.index = {key: idx for idx, key in enumerate(keys)}
+
+    def __len__(self):
+        return len(self.keys)
+
+
+def encode_groups(keys, sat_num):
+    """Integer code per ordered group key, stable across RAOs for a fixed sat_num."""
+    if len(keys) == 0:
+        return np.zeros(0, dtype=np.int64)
+    key_array = np.asarray(keys, dtype=np.int64)
+    if key_array.ndim != 2:
+        raise ValueError("All group keys in one table must have the same length.")
+    if np.any(key_array < 0) or np.any(key_array >= sat_num):
+        raise ValueError(f"Group keys must index satellites 0..{sat_num - 1}.")
+    return np.ravel_multi_index(key_array.T, (sat_num,) * key_array.shape[1]).astype(np.int64)
+
+
+def build_group_row(weights, ps_by_group, sat_num):
+    keys = [tuple(int(sat_id) for sat_id in group) for group in weights.keys()]
+    w = np.array([float(weights[group]) for group in weights.keys()], dtype=float)
+    if ps_by_group is None:
+        ps_matrix = None
+    elif len(keys) == 0:
+        ps_matrix = np.zeros((0, sat_num))
+    else:
+        ps_matrix = np.vstack([
+            np.asarray(ps_by_group[group], dtype=float)
+            for group in weights.keys()
+        ])
+        if ps_matrix.shape[1] != sat_num:
+            raise ValueError(
+                f"p_s vector length {ps_matrix.shape[1]} does not match "
+                f"number of satellites {sat_num}"
+            )
+    return GroupTableRow(keys, encode_groups(keys, sat_num), w, ps_matrix)
+
+
+class DenseGroupTable:
+    """Lazily converts group_weight_table / group_ps_table rows into GroupTableRow objects."""
+
+    def __init__(self, group_weight_table, group_ps_table=None):
+        self.group_weight_table = group_weight_table
+        self.group_ps_table = group_ps_table
+        self._rows = {}
+
+    def row(self, n, sat_num):
+        cache_key = (int(n), int(sat_num))
+        cached = self._rows.get(cache_key)
+        if cached is None:
+            cached = build_group_row(
+                self.group_weight_table[n],
+                self.group_ps_table[n] if self.group_ps_table is not None else None,
+                sat_num,
+            )
+            self._rows[cache_key] = cached
+        return cached
+
+
+def align_rows(previous_codes, current_codes):
+    """Row of each current group in the previous RAO's matrix, -1 where it is new."""
+    previous_codes = np.asarray(previous_codes, dtype=np.int64)
+    current_codes = np.asarray(current_codes, dtype=np.int64)
+    if len(previous_codes) == 0:
+        return np.full(len(current_codes), -1, dtype=np.int64)
+    order = np.argsort(previous_codes, kind="stable")
+    sorted_codes = previous_codes[order]
+    pos = np.searchsorted(sorted_codes, current_codes)
+    pos = np.minimum(pos, len(sorted_codes) - 1)
+    return np.where(sorted_codes[pos] == current_codes, order[pos], -1)
+
+
+def normalized_policy(policy_matrix):
+    """Validate A and row-normalize it; all-zero rows stay zero."""
+    policy_matrix = np.asarray(policy_matrix, dtype=float)
+    if np.any(policy_matrix < 0) or not np.all(np.isfinite(policy_matrix)):
+        raise ValueError("A_g contains invalid probabilities.")
+    row_sums = np.sum(policy_matrix, axis=1, keepdims=True)
+    return np.divide(
+        policy_matrix,
+        row_sums,
+        out=np.zeros_like(policy_matrix),
+        where=row_sums > 0,
+    )
+
+
+def success_probability(weights, policy_matrix, ps_matrix):
+    """p_s = sum_g w_g sum_k a_{g,k} p_{s,k}^g."""
+    group_success = np.sum(normalized_policy(policy_matrix) * ps_matrix, axis=1)
+    if len(group_success) == 0:
+        return 0.0
+    # cumsum accumulates in group order, matching the per-group loop bit for bit;
+    # the backoff optimizer is sensitive to the last ulp of p_s.
+    return float(np.cumsum(np.asarray(weights, dtype=float) * group_success)[-1])
+
+
+def effective_load(weights, policy_matrix, ps_matrix):
+    """Per-satellite received share sum_g w_g a_{g,k} p_{s,k}^g."""
+    return np.asarray(weights, dtype=float) @ (np.asarray(policy_matrix, dtype=float) * ps_matrix)
+
+
+def total_variation(current_matrix, previous_matrix, previous_rows):
+    """
+    TV distance 0.5 * ||A_g(t) - A_g(t-1)||_1 for groups present in both RAOs.
+
+    Returns (current row indices, tv values).
+    """
+    common = np.flatnonzero(previous_rows >= 0)
+    if len(common) == 0 or current_matrix.shape[1] != previous_matrix.shape[1]:
+        return common[:0], np.zeros(0)
+    diff = current_matrix[common] - previous_matrix[previous_rows[common]]
+    return common, 0.5 * np.sum(np.abs(diff), axis=1)
+
+
+def inverse_cdf_choice(policy_matrix, rows, uniforms):
+    """
+    Draw one satellite per entry of rows from A[rows] with the given uniforms.
+
+    The CDF is built once per group, so every UE in a group shares it.
+    Returns (choices, valid); valid is False where A_g is degenerate
+    (non-positive or non-finite sum) and choices there are -1.
+    """
+    policy_matrix = np.asarray(policy_matrix, dtype=float)
+    rows = np.asarray(rows, dtype=np.int64)
+    uniforms = np.asarray(uniforms, dtype=float)
+    choices = np.full(len(rows), -1, dtype=np.int64)
+    if policy_matrix.size == 0 or len(rows) == 0:
+        return choices, np.zeros(len(rows), dtype=bool)
+
+    totals = np.sum(policy_matrix, axis=1)
+    row_valid = (totals > 0) & np.isfinite(totals)
+    # Same normalization as np.random.choice(p=A_g / sum(A_g)).
+    cdf = np.cumsum(
+        np.divide(
+            policy_matrix,
+            totals[:, None],
+            out=np.zeros_like(policy_matrix),
+            where=row_valid[:, None],
+        ),
+        axis=1,
+    )
+    cdf_end = cdf[:, -1:]
+    np.divide(cdf, cdf_end, out=cdf, where=cdf_end > 0)
+
+    valid = row_valid[rows]
+    valid_rows = rows[valid]
+    picked = np.sum(cdf[valid_rows] <= uniforms[valid, None], axis=1)
+    choices[valid] = np.minimum(picked, policy_matrix.shape[1] - 1)
+    return choices, valid
@@ -0,0 +1,85 @@
+import numpy as np
+
+import group_policy
+
+
+def make_tables(sat_num=4):
+    weights = [
+        {(0, 1): 0.5, (2, 3): 0.3, (1, 0): 0.2},
+        {(2, 3): 0.6, (3, 1): 0.4},
+    ]
+    rng = np.random.RandomState(3)
+    ps = [
+        {group: rng.uniform(0.2, 0.9, sat_num) for group in row}
+        for row in weights
+    ]
+    return weights, ps
+
+
+def test_dense_row_matches_dict_formulas():
+    sat_num = 4
+    weights, ps = make_tables(sat_num)
+    row = group_policy.DenseGroupTable(weights, ps).row(0, sat_num)
+    rng = np.random.RandomState(5)
+    policy = rng.uniform(0.0, 1.0, (len(row), sat_num))
+    policy[2] = 0.0
+
+    expected_p_s = 0.0
+    expected_load = np.zeros(sat_num)
+    for idx, (group, w_g) in enumerate(weights[0].items()):
+        a_g = policy[idx]
+        expected_load += w_g * a_g * ps[0][group]
+        if np.sum(a_g) <= 0:
+            continue
+        expected_p_s += w_g * np.sum(a_g / np.sum(a_g) * ps[0][group])
+
+    assert group_policy.success_probability(row.weights, policy, row.ps_matrix) == expected_p_s
+    assert np.allclose(group_policy.effective_load(row.weights, policy, row.ps_matrix), expected_load)
+    assert row.index[(1, 0)] == 2
+
+
+def test_total_variation_uses_common_groups_only():
+    sat_num = 4
+    weights, ps = make_tables(sat_num)
+    table = group_policy.DenseGroupTable(weights, ps)
+    previous, current = table.row(0, sat_num), table.row(1, sat_num)
+    previous_policy = np.full((len(previous), sat_num), 0.25)
+    current_policy = np.array([
+        [1.0, 0.0, 0.0, 0.0],
+        [0.25, 0.25, 0.25, 0.25],
+    ])
+
+    previous_rows = group_policy.align_rows(previous.codes, current.codes)
+    assert np.array_equal(previous_rows, [1, -1])
+    common, tv = group_policy.total_variation(current_policy, previous_policy, previous_rows)
+    assert np.array_equal(common, [0])
+    assert np.allclose(tv, [0.75])
+
+
+def test_inverse_cdf_choice_matches_random_choice():
+    policy = np.array([
+        [0.1, 0.6, 0.3],
+        [0.0, 0.0, 0.0],
+        [0.0, 2.0, 2.0],
+    ])
+    rows = np.array([0, 2, 1, 0, 2, 0])
+    rng = np.random.RandomState(11)
+    uniforms = rng.random_sample(len(rows))
+    choices, valid = group_policy.inverse_cdf_choice(policy, rows, uniforms)
+
+    assert np.array_equal(valid, rows != 1)
+    assert np.all(choices[~valid] == -1)
+    rng = np.random.RandomState(11)
+    for idx, row in enumerate(rows):
+        p = policy[row]
+        if row == 1:
+            rng.random_sample()
+            continue
+        assert choices[idx] == rng.choice(len(p), p=p / np.sum(p))
+
+
+if __name__ == "__main__":
+    test_dense_row_matches_dict_formulas()
+    test_total_variation_uses_common_groups_only()
+    test_inverse_cdf_choice_matches_random_choice()
+    print("group_policy_test passed")
@@ -0,0 +1,118 @@
+import numpy as np
+
+
+EARTH_EQUATORIAL_RADIUS_KM = 6378.137
+EARTH_GM_KM3_S2 = 398600.4418
+EARTH_ROTATION_RATE_RAD_S = 7.2921159e-5
+# Covers the extra perigee speed of near-circular LEO orbits.
+ELEVATION_RATE_SAFETY_FACTOR = 1.2
+
+
+def max_elevation_rate_deg_s(sat_ecef_km):
+    """
+    Conservative bound on how fast any satellite elevation can change for a
+    ground UE: line-of-sight angular rate <= relative speed / minimum range.
+    """
+    sat_radius_km = np.linalg.norm(np.asarray(sat_ecef_km, dtype=float), axis=-1)
+    min_radius_km = float(np.min(sat_radius_km))
+    min_range_km = min_radius_km - EARTH_EQUATORIAL_RADIUS_KM
+    if min_range_km <= 0:
+        raise ValueError("Satellite positions must lie above the Earth surface.")
+    inertial_speed = np.sqrt(EARTH_GM_KM3_S2 / min_radius_km)
+    frame_speed = EARTH_ROTATION_RATE_RAD_S * float(np.max(sat_radius_km))
+    relative_speed = ELEVATION_RATE_SAFETY_FACTOR * (inertial_speed + frame_speed)
+    return float(np.degrees(relative_speed / min_range_km))
+
+
+class TopKGroupTracker:
+    """
+    Incremental ordered top-K satellite groups per UE.
+
+    A full ranking stores the smallest elevation gap among the top-K+1
+    satellites. Each gap can close by at most 2 * rate * dt, so a UE is only
+    re-ranked once that accumulated bound reaches its stored margin.
+    """
+
+    def __init__(self, ue_count, k=2):
+        if k <= 0:
+            raise ValueError("k must be positive.")
+        self.ue_count = int(ue_count)
+        self.k = int(k)
+        self.sat_count = None
+        self.top_k = np.full((self.ue_count, self.k), -1, dtype=int)
+        self.margin_deg = np.full(self.ue_count, -np.inf)
+        self.last_time_s = np.full(self.ue_count, np.nan)
+        self.change_history = []
+
+    def reset(self):
+        self.sat_count = None
+        self.top_k.fill(-1)
+        self.margin_deg.fill(-np.inf)
+        self.last_time_s.fill(np.nan)
+
+    def update(self, elevation_deg, time_s, rate_bound_deg_s, start=0):
+        """
+        Update UE rows start:start+len(elevation_deg) at time_s.
+
+        Returns the local row indices whose ordered top-K group changed.
+        """
+        elevation_deg = np.asarray(elevation_deg, dtype=float)
+        row_count, sat_count = elevation_deg.shape
+        if sat_count < self.k:
+            raise ValueError(f"Top-{self.k} grouping needs at least {self.k} satellites.")
+        if self.sat_count != sat_count:
+            self.reset()
+            self.sat_count = sat_count
+        rows = slice(start, start + row_count)
+
+        elapsed_s = time_s - self.last_time_s[rows]
+        # First update (NaN elapsed) or a backwards time step forces a re-rank.
+        closable_deg = np.where(
+            elapsed_s >= 0,
+            2.0 * rate_bound_deg_s * elapsed_s,
+            np.inf,
+        )
+        self.margin_deg[rows] -= closable_deg
+        self.last_time_s[rows] = time_s
+        stale = np.flatnonzero(~(self.margin_deg[rows] > 0))
+        if len(stale) == 0:
+            self._record_changes(time_s, 0, 0)
+            return stale
+
+        stale_elevation = elevation_deg[stale]
+        rank_count = min(self.k + 1, sat_count)
+        if rank_count < sat_count:
+            candidates = np.argpartition(-stale_elevation, rank_count - 1, axis=1)[:, :rank_count]
+        else:
+            candidates = np.broadcast_to(np.arange(sat_count), stale_elevation.shape)
+        candidate_elevation = np.take_along_axis(stale_elevation, candidates, axis=1)
+        order = np.argsort(-candidate_elevation, axis=1, kind="stable")
+        ranked = np.take_along_axis(candidates, order, axis=1)
+        ranked_elevation = np.take_along_axis(candidate_elevation, order, axis=1)
+
+        new_top_k = ranked[:, :self.k]
+        changed_mask = np.any(new_top_k != self.top_k[rows][stale], axis=1)
+        global_stale = stale + start
+        self.top_k[global_stale] = new_top_k
+        if rank_count > 1:
+            self.margin_deg[global_stale] = np.min(-np.diff(ranked_elevation, axis=1), axis=1)
+        else:
+            self.margin_deg[global_stale] = np.inf
+
+        changed = stale[changed_mask]
+        self._record_changes(time_s, len(stale), len(changed))
+        return changed
+
+    def _record_changes(self, time_s, reranked, changed):
+        # One entry per update time: chunks of the same RAO add to it.
+        time_s = float(time_s)
+        if self.change_history and self.change_history[-1]["time_s"] == time_s:
+            entry = self.change_history[-1]
+            entry["reranked"] += int(reranked)
+            entry["changed"] += int(changed)
+        else:
+            self.change_history.append({
+                "time_s": time_s,
+                "reranked": int(reranked),
+                "changed": int(changed),
+            })
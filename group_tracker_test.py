@@ -0,0 +1,59 @@
+import numpy as np
+
+from group_tracker import TopKGroupTracker, max_elevation_rate_deg_s
+
+
+def test_tracker_matches_full_sort_under_bounded_rates():
+    rng = np.random.RandomState(7)
+    ue_count, sat_count, k = 400, 12, 2
+    rate_bound = 0.8
+    base = rng.uniform(-60.0, 80.0, size=(ue_count, sat_count))
+    rates = rng.uniform(-rate_bound, rate_bound, size=(ue_count, sat_count))
+    tracker = TopKGroupTracker(ue_count, k=k)
+
+    reranked = 0
+    for step in range(200):
+        time_s = 0.1 * step
+        elevation = base + rates * time_s
+        # Split into two chunks like update_visibility_batch does.
+        tracker.update(elevation[:250], time_s, rate_bound, start=0)
+        tracker.update(elevation[250:], time_s, rate_bound, start=250)
+        expected = np.argsort(elevation, axis=1)[:, ::-1][:, :k]
+        assert np.array_equal(tracker.top_k, expected)
+        if step > 0:
+            reranked += tracker.change_history[-1]["reranked"]
+
+    # Chunks of the same time step share one history entry.
+    assert len(tracker.change_history) == 200
+    assert reranked < 199 * ue_count
+
+
+def test_change_events_report_only_reordered_ues():
+    tracker = TopKGroupTracker(2, k=2)
+    elevation = np.array([
+        [50.0, 40.0, 10.0],
+        [30.0, 20.0, 19.0],
+    ])
+    changed = tracker.update(elevation, 0.0, 1.0)
+    assert np.array_equal(changed, [0, 1])
+
+    elevation = np.array([
+        [50.0, 40.0, 10.0],
+        [30.0, 19.0, 20.0],
+    ])
+    changed = tracker.update(elevation, 1.0, 1.0)
+    assert np.array_equal(changed, [1])
+    assert np.array_equal(tracker.top_k[1], [0, 2])
+
+
+def test_rate_bound_for_starlink_altitude():
+    sat_ecef_km = np.array([[6378.137 + 550.0, 0.0, 0.0]])
+    rate = max_elevation_rate_deg_s(sat_ecef_km)
+    assert 0.8 < rate < 1.2
+
+
+if __name__ == "__main__":
+    test_tracker_matches_full_sort_under_bounded_rates()
+    test_change_events_report_only_reordered_ues()
+    test_rate_bound_for_starlink_altitude()
+    print("group_tracker_test passed")
@@ -0,0 +1,219 @@
+"""
+Scalar inner-loop kernels with a NumPy path and an optional Numba path.
+
+The NumPy functions keep the accumulation order of the original loops,
+so switching backends does not change results. Numba is used only when it is
+installed and the backend is "numba" or "auto".
+"""
+import numpy as np
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+
+HAVE_NUMBA = numba is not None
+BACKENDS = ("auto", "numpy", "numba")
+
+ACB_EXPIRED = -1
+ACB_BACKOFF = 0
+ACB_TRANSMIT = 1
+
+
+def _backoff_factors(p_b, p_c, D, p_s):
+    # f_j = 1 - (1 - p_b[j-1]) * p_s * (1 - p_c), j = 1..D
+    return 1 - (1 - np.asarray(p_b, dtype=float)[:D]) * p_s * (1 - p_c)
+
+
+def compute_C_numpy(p_b, p_c, D, p_s):
+    """C[k, n] = prod_{j=n+1}^{k} f_j for 1 <= n <= k <= D."""
+    factors = _backoff_factors(p_b, p_c, D, p_s)
+    C = np.zeros((D + 1, D + 1))
+    for n in range(1, D + 1):
+        C[n, n] = 1.0
+        # cumprod multiplies left to right, like the original j loop.
+        C[n + 1:, n] = np.cumprod(factors[n:])
+    return C
+
+
+def compute_pi_numpy(C, D, p_d, rho):
+    p_d = np.asarray(p_d, dtype=float)
+    numerator = np.zeros(D)
+    inner_sum = 0.0
+    for n in range(1, D + 1):
+        terms = p_d[n - 1:D] * C[n:D + 1, n]
+        val = np.cumsum(terms)[-1]
+        numerator[n - 1] = rho * val
+        inner_sum += val
+    # Pi is observed after packet arrivals and before the ACB decision.
+    return numerator / ((1 - rho) + rho * inner_sum)
+
+
+def get_loss_numpy(p_b, p_c, p_s, p_d_arr, D):
+    factors = _backoff_factors(p_b, p_c, D, p_s)
+    terms = np.asarray(p_d_arr, dtype=float)[:D] * np.cumprod(factors)
+    return float(np.cumsum(terms)[-1]) if D > 0 else 0.0
+
+
+def singleton_preambles_numpy(preambles, Z):
+    """(unique mask per UE, N_s, N_c) for the preambles one satellite received."""
+    preambles = np.asarray(preambles, dtype=np.int64)
+    occupancy = np.bincount(preambles, minlength=Z)
+    unique = occupancy[preambles] == 1
+    return unique, int(np.count_nonzero(occupancy == 1)), int(np.count_nonzero(occupancy >= 2))
+
+
+def acb_decisions_numpy(remaining_budget, r, p_b):
+    """UE.ACB_test budget and backoff branches: ACB_EXPIRED / ACB_BACKOFF / ACB_TRANSMIT."""
+    remaining_budget = np.asarray(remaining_budget, dtype=np.int64)
+    p_b = np.asarray(p_b, dtype=float)
+    decisions = np.full(len(remaining_budget), ACB_EXPIRED, dtype=np.int64)
+    live = remaining_budget > 0
+    backoff = np.asarray(r)[live] < p_b[remaining_budget[live] - 1]
+    decisions[live] = np.where(backoff, ACB_BACKOFF, ACB_TRANSMIT)
+    return decisions
+
+
+if HAVE_NUMBA:
+    @numba.njit(cache=True)
+    def compute_C_numba(p_b, p_c, D, p_s):
+        C = np.zeros((D + 1, D + 1))
+        for k in range(1, D + 1):
+            for n in range(1, k + 1):
+                prod = 1.0
+                for j in range(n + 1, k + 1):
+                    prod *= (1 - (1 - p_b[j - 1]) * p_s * (1 - p_c))
+                C[k, n] = prod
+        return C
+
+    @numba.njit(cache=True)
+    def compute_pi_numba(C, D, p_d, rho):
+        numerator = np.zeros(D)
+        inner_sum = 0.0
+        for n in range(1, D + 1):
+            val = 0.0
+            for k in range(n, D + 1):
+                val += p_d[k - 1] * C[k, n]
+            numerator[n - 1] = rho * val
+            inner_sum += val
+        return numerator / ((1 - rho) + rho * inner_sum)
+
+    @numba.njit(cache=True)
+    def get_loss_numba(p_b, p_c, p_s, p_d_arr, D):
+        L = 0.0
+        prod = 1.0
+        for i in range(1, D + 1):
+            prod *= (1 - (1 - p_b[i - 1]) * p_s * (1 - p_c))
+            L += p_d_arr[i - 1] * prod
+        return L
+
+    @numba.njit(cache=True)
+    def _singleton_preambles_numba(preambles, Z):
+        occupancy = np.zeros(Z, dtype=np.int64)
+        for preamble in preambles:
+            occupancy[preamble] += 1
+        unique = np.empty(len(preambles), dtype=np.bool_)
+        for idx in range(len(preambles)):
+            unique[idx] = occupancy[preambles[idx]] == 1
+        n_s = 0
+        n_c = 0
+        for count in occupancy:
+            if count == 1:
+                n_s += 1
+            elif count >= 2:
+                n_c += 1
+        return unique, n_s, n_c
+
+    def singleton_preambles_numba(preambles, Z):
+        unique, n_s, n_c = _singleton_preambles_numba(np.asarray(preambles, dtype=np.int64), int(Z))
+        return unique, int(n_s), int(n_c)
+
+    @numba.njit(cache=True)
+    def _acb_decisions_numba(remaining_budget, r, p_b):
+        decisions = np.empty(len(remaining_budget), dtype=np.int64)
+        for idx in range(len(remaining_budget)):
+            if remaining_budget[idx] <= 0:
+                decisions[idx] = ACB_EXPIRED
+            elif r[idx] < p_b[remaining_budget[idx] - 1]:
+                decisions[idx] = ACB_BACKOFF
+            else:
+                decisions[idx] = ACB_TRANSMIT
+        return decisions
+
+    def acb_decisions_numba(remaining_budget, r, p_b):
+        return _acb_decisions_numba(
+            np.asarray(remaining_budget, dtype=np.int64),
+            np.asarray(r, dtype=float),
+            np.asarray(p_b, dtype=float),
+        )
+
+
+_IMPLEMENTATIONS = {
+    "numpy": {
+        "compute_C": compute_C_numpy,
+        "compute_pi": compute_pi_numpy,
+        "get_loss": get_loss_numpy,
+        "singleton_preambles": singleton_preambles_numpy,
+        "acb_decisions": acb_decisions_numpy,
+    },
+}
+if HAVE_NUMBA:
+    _IMPLEMENTATIONS["numba"] = {
+        "compute_C": lambda p_b, p_c, D, p_s: compute_C_numba(
+            np.asarray(p_b, dtype=float), float(p_c), int(D), float(p_s)
+        ),
+        "compute_pi": lambda C, D, p_d, rho: compute_pi_numba(
+            np.asarray(C, dtype=float), int(D), np.asarray(p_d, dtype=float), float(rho)
+        ),
+        "get_loss": lambda p_b, p_c, p_s, p_d_arr, D: float(get_loss_numba(
+            np.asarray(p_b, dtype=float), float(p_c), float(p_s), np.asarray(p_d_arr, dtype=float), int(D)
+        )),
+        "singleton_preambles": singleton_preambles_numba,
+        "acb_decisions": acb_decisions_numba,
+    }
+
+_active = {}
+_backend = None
+
+
+def set_backend(name):
+    """Select "numpy", "numba" or "auto" (Numba when installed)."""
+    global _backend
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown kernel backend {name!r}; expected one of {BACKENDS}.")
+    if name == "auto":
+        name = "numba" if HAVE_NUMBA else "numpy"
+    if name not in _IMPLEMENTATIONS:
+        raise ValueError("Kernel backend 'numba' requested but numba is not installed.")
+    _active.clear()
+    _active.update(_IMPLEMENTATIONS[name])
+    _backend = name
+    return name
+
+
+def get_backend():
+    return _backend
+
+
+def compute_C(p_b, p_c, D, p_s):
+    return _active["compute_C"](p_b, p_c, D, p_s)
+
+
+def compute_pi(C, D, p_d, rho):
+    return _active["compute_pi"](C, D, p_d, rho)
+
+
+def get_loss(p_b, p_c, p_s, p_d_arr, D):
+    return _active["get_loss"](p_b, p_c, p_s, p_d_arr, D)
+
+
+def singleton_preambles(preambles, Z):
+    return _active["singleton_preambles"](preambles, Z)
+
+
+def acb_decisions(remaining_budget, r, p_b):
+    return _active["acb_decisions"](remaining_budget, r, p_b)
+
+
+set_backend("auto")
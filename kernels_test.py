@@ -0,0 +1,102 @@
+import numpy as np
+
+import kernels
+
+
+def reference_compute_C(p_b, p_c, D, p_s):
+    C = np.zeros((D + 1, D + 1))
+    for k in range(1, D + 1):
+        for n in range(1, k + 1):
+            prod = 1.0
+            for j in range(n + 1, k + 1):
+                prod *= (1 - (1 - p_b[j - 1]) * p_s * (1 - p_c))
+            C[k, n] = prod
+    return C
+
+
+def reference_get_loss(p_b, p_c, p_s, p_d_arr, D):
+    L = 0.0
+    for i in range(1, D + 1):
+        prod = 1.0
+        for j in range(1, i + 1):
+            prod *= (1 - (1 - p_b[j - 1]) * p_s * (1 - p_c))
+        L += p_d_arr[i - 1] * prod
+    return L
+
+
+def reference_compute_pi(C, D, p_d, rho):
+    numerator = np.zeros(D)
+    inner_sum = 0.0
+    for n in range(1, D + 1):
+        val = sum(p_d[k - 1] * C[k, n] for k in range(n, D + 1))
+        numerator[n - 1] = rho * val
+        inner_sum += val
+    return numerator / ((1 - rho) + rho * inner_sum)
+
+
+def backends():
+    return ["numpy", "numba"] if kernels.HAVE_NUMBA else ["numpy"]
+
+
+def test_backends_match_reference_loops_bit_for_bit():
+    rng = np.random.RandomState(9)
+    D = 20
+    p_d = rng.dirichlet(np.ones(D))
+    previous = kernels.get_backend()
+    try:
+        for backend in backends():
+            kernels.set_backend(backend)
+            for _ in range(20):
+                p_b = rng.uniform(0.0, 1.0, D)
+                p_c, p_s, rho = rng.uniform(0.0, 1.0, 3)
+                C = kernels.compute_C(p_b, p_c, D, p_s)
+                assert np.array_equal(C, reference_compute_C(p_b, p_c, D, p_s))
+                assert np.array_equal(
+                    kernels.compute_pi(C, D, p_d, rho),
+                    reference_compute_pi(C, D, p_d, rho),
+                )
+                assert kernels.get_loss(p_b, p_c, p_s, p_d, D) == reference_get_loss(p_b, p_c, p_s, p_d, D)
+    finally:
+        kernels.set_backend(previous)
+
+
+def test_preamble_and_acb_kernels_agree_across_backends():
+    rng = np.random.RandomState(1)
+    preambles = rng.randint(0, 54, size=80)
+    remaining_budget = rng.randint(-1, 21, size=200)
+    r = rng.uniform(size=200)
+    p_b = rng.uniform(size=20)
+    previous = kernels.get_backend()
+    try:
+        results = []
+        for backend in backends():
+            kernels.set_backend(backend)
+            unique, n_s, n_c = kernels.singleton_preambles(preambles, 54)
+            decisions = kernels.acb_decisions(remaining_budget, r, p_b)
+            results.append((unique, n_s, n_c, decisions))
+    finally:
+        kernels.set_backend(previous)
+
+    unique, n_s, n_c, decisions = results[0]
+    values, counts = np.unique(preambles, return_counts=True)
+    assert n_s == np.sum(counts == 1) and n_c == np.sum(counts >= 2)
+    assert np.array_equal(unique, np.isin(preambles, values[counts == 1]))
+    assert np.all(decisions[remaining_budget <= 0] == kernels.ACB_EXPIRED)
+    for other in results[1:]:
+        assert np.array_equal(unique, other[0]) and (n_s, n_c) == other[1:3]
+        assert np.array_equal(decisions, other[3])
+
+
+def test_unknown_backend_is_rejected():
+    try:
+        kernels.set_backend("fortran")
+    except ValueError:
+        return
+    raise AssertionError("Expected an unknown backend to be rejected.")
+
+
+if __name__ == "__main__":
+    test_backends_match_reference_loops_bit_for_bit()
+    test_preamble_and_acb_kernels_agree_across_backends()
+    test_unknown_backend_is_rejected()
+    print("kernels_test passed")
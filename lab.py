@@ -7,6 +7,7 @@ from matplotlib.ticker import MaxNLocator
 import Load_estimator
 import backoff_control
 import main
+import result_cache
 
 # =============================================================================
 # 第一層實驗模式索引
@@ -169,6 +170,12 @@ import main
 EXPERIMENT_CODE = 2
 SIM_SECONDS = 3
 SIM_RHO_VALUES = np.array([1.0,1.5,2.0,2.5,3.0])
+# Opt-in: serve repeated main.main configurations from result_cache/ (keyed
+# by the arguments, the TLE/pool/table contents and the simulator sources).
+# Runs with SEED=None are never cached.
+USE_RESULT_CACHE = False
+# Experiments 1, 4, 6 and 15 are also declared in lab_experiments.py, which
+# runs several of them together and simulates their shared runs once.
 # Kept separate because this diagnostic intentionally spans a much wider load
 # range than the rho values used by the comparison experiments.
 OFFERED_LOAD_RHO_VALUES = np.array(
@@ -228,6 +235,16 @@ RUN_UE_SPATIAL_DISTRIBUTION_COMPARISON = EXPERIMENT_CODE == 22
 RUN_BETA_SPATIAL_MISMATCH_COMPARISON = EXPERIMENT_CODE == 23
 
 
+RESULT_CACHE = result_cache.ResultCache() if USE_RESULT_CACHE else None
+
+
+def run_main(*args, **kwargs):
+    """main.main with a per-process shared Scenario, served from RESULT_CACHE when enabled."""
+    if RESULT_CACHE is None:
+        return main.run_with_shared_scenario(*args, **kwargs)
+    return RESULT_CACHE.run(*args, runner=main.run_with_shared_scenario, **kwargs)
+
+
 def validate_beta_spatial_sampler(
     center,
     radius_km,
@@ -321,7 +338,7 @@ if RUN_ALL:
     for mode, label in MODES:
         for rho in RHO_VALUES:
             print(f"\nRunning PLR arrival-rate sweep: {label}, arrival rate={rho}")
-            avg_throughput, plr, n_history, actual_pi, observe_pi, load_imbalance_history, run_history = main.main(
+            avg_throughput, plr, n_history, actual_pi, observe_pi, load_imbalance_history, run_history = run_main(
                 rho,
                 SECONDS,
                 NUM_UE,
@@ -409,7 +426,7 @@ if RHO_SWEEP_PB:
     pb_results = []
     for rho in RHO_VALUES:
         print(f"\nRunning p_b arrival-rate sweep: rho_s={rho}")
-        avg_throughput, plr, n_history, actual_pi, observe_pi, load_imbalance_history, run_history = main.main(
+        avg_throughput, plr, n_history, actual_pi, observe_pi, load_imbalance_history, run_history = run_main(
             rho,
             SECONDS,
             NUM_UE,
@@ -563,7 +580,7 @@ if RUN_QOS_DISTRIBUTION_COMPARISON:
     for qos_label, qos_distribution in QOS_DISTRIBUTIONS:
         for mode, label in MODES:
             print(f"\nRunning QoS distribution comparison: {label}, {qos_label}, rho_s={RHO}")
-            avg_throughput, plr, n_history, actual_pi, observe_pi, load_imbalance_history, run_history = main.main(
+            avg_throughput, plr, n_history, actual_pi, observe_pi, load_imbalance_history, run_history = run_main(
                 RHO,
                 SECONDS,
                 NUM_UE,
@@ -630,7 +647,7 @@ if RUN_RHO_SWEEP:
     for mode, label in MODES:
         for rho in RHO_VALUES:
             print(f"\nRunning PLR arrival-rate sweep: {label}, arrival rate={rho}")
-            avg_throughput, plr, n_history, actual_pi, observe_pi, load_imbalance_history, run_history = main.main(
+            avg_throughput, plr, n_history, actual_pi, observe_pi, load_imbalance_history, run_history = run_main(
                 rho,
                 SECONDS,
                 NUM_UE,
@@ -735,7 +752,7 @@ if RUN_FIXED_LOAD_IMBALANCE_SWEEP:
                 f"\nRunning load-imbalance constraint sweep: "
                 f"{text_label}, arrival rate={rho}"
             )
-            avg_throughput, plr, n_history, actual_pi, observe_pi, load_imbalance_history, run_history = main.main(
+            avg_throughput, plr, n_history, actual_pi, observe_pi, load_imbalance_history, run_history = run_main(
                 rho,
                 SECONDS,
                 NUM_UE,
@@ -803,7 +820,7 @@ if RUN_SATELLITE_SELECTION_SWEEP:
                 f"\nRunning satellite selection arrival-rate sweep: "
                 f"{label}, arrival rate={rho}"
             )
-            avg_throughput, plr, n_history, actual_pi, observe_pi, load_imbalance_history, run_history = main.main(
+            avg_throughput, plr, n_history, actual_pi, observe_pi, load_imbalance_history, run_history = run_main(
                 rho,
                 SECONDS,
                 NUM_UE,
@@ -928,7 +945,7 @@ if RUN_ESTIMATION_VALIDATION_RHO_SWEEP:
     validation_results = []
     for rho in RHO_VALUES:
         print(f"\nRunning estimation validation arrival-rate sweep: arrival rate={rho}")
-        avg_throughput, plr, n_history, actual_pi, observe_pi, load_imbalance_history, run_history = main.main(
+        avg_throughput, plr, n_history, actual_pi, observe_pi, load_imbalance_history, run_history = run_main(
             rho,
             SECONDS,
             NUM_UE,
@@ -1087,7 +1104,7 @@ if RUN_SATELLITE_SELECTION_PERFORMANCE:
     fixed_epsilon_results = []
     for eps in FIXED_EPSILON_VALUES:
         print(f"\nRunning fixed-epsilon satellite selection performance: epsilon={eps}")
-        avg_throughput, plr, n_history, actual_pi, observe_pi, load_imbalance_history, run_history = main.main(
+        avg_throughput, plr, n_history, actual_pi, observe_pi, load_imbalance_history, run_history = run_main(
             FIXED_EPSILON_RHO,
             SECONDS,
             NUM_UE,
@@ -1126,7 +1143,7 @@ if RUN_SATELLITE_SELECTION_PERFORMANCE:
     adaptive_epsilon_results = []
     for rho in ADAPTIVE_EPSILON_RHO_VALUES:
         print(f"\nRunning adaptive-epsilon trajectory: arrival rate={rho}")
-        avg_throughput, plr, n_history, actual_pi, observe_pi, load_imbalance_history, run_history = main.main(
+        avg_throughput, plr, n_history, actual_pi, observe_pi, load_imbalance_history, run_history = run_main(
             rho,
             SECONDS,
             NUM_UE,
@@ -1337,7 +1354,7 @@ if RUN_ALLA_ETA_SWEEP:
         eta_results[rho] = []
         for eta in ETA_VALUES:
             print(f"\nRunning ALLA eta sweep: rho={rho:g}, eta={eta:g}")
-            _, plr, _, _, _, _, _ = main.main(
+            _, plr, _, _, _, _, _ = run_main(
                 rho,
                 SECONDS,
                 NUM_UE,
@@ -1380,7 +1397,7 @@ if RUN_OFFERED_LOAD_RHO_SWEEP:
     offered_load_results = []
     for rho in OFFERED_LOAD_RHO_VALUES:
         print(f"\nRunning normalized offered-load sweep: rho_s={rho:g}")
-        _, _, _, _, _, _, run_history = main.main(
+        _, _, _, _, _, _, run_history = run_main(
             rho,
             SECONDS,
             NUM_UE,
@@ -1490,7 +1507,7 @@ if RUN_SATELLITE_SELECTION_CONCENTRATION:
             f"\nRunning UE satellite-selection concentration analysis: "
             f"{label}, arrival rate={RHO:g}"
         )
-        _, _, _, _, _, _, run_history = main.main(
+        _, _, _, _, _, _, run_history = run_main(
             RHO,
             SECONDS,
             NUM_UE,
@@ -1757,7 +1774,7 @@ if RUN_COLLISION_RATE_COMPARISON:
         print(
             f"\nRunning collision-rate comparison: arrival rate={rho:g}"
         )
-        _, _, _, _, _, _, run_history = main.main(
+        _, _, _, _, _, _, run_history = run_main(
             rho,
             SECONDS,
             NUM_UE,
@@ -1885,7 +1902,7 @@ if RUN_SERVICE_RADIUS_COMPARISON:
                 _,
                 _,
                 run_history,
-            ) = main.main(
+            ) = run_main(
                 RHO,
                 SECONDS,
                 NUM_UE,
@@ -1997,7 +2014,7 @@ if RUN_BACKOFF_INITIAL_GUESS_SENSITIVITY:
         _final_pi,
         _reward_history,
         run_history,
-    ) = main.main(
+    ) = run_main(
         RHO,
         SECONDS,
         NUM_UE,
@@ -2227,7 +2244,7 @@ if RUN_ORBIT_PLANE_COMPARISON:
                 _,
                 _,
                 run_history,
-            ) = main.main(
+            ) = run_main(
                 RHO,
                 SECONDS,
                 NUM_UE,
@@ -2329,6 +2346,7 @@ if RUN_TOP_K_GROUPING_ANALYSIS:
     from skyfield.api import load
     from skyfield.framelib import itrs
 
+    from geometry_kernel import elevation_distance, top_k_by_elevation
     from satellite_preselection import generate_uniform_locations
     from satellite_preselection_top3 import prepare_ue_geometry
     from scenario_time import get_tle_scenario_metadata
@@ -2352,26 +2370,29 @@ if RUN_TOP_K_GROUPING_ANALYSIS:
         category=RuntimeWarning,
     )
 
-    def get_top_k_ue_channel_data(real_sats, current_time, ue_geometry):
+    def get_top_k_ue_channel_data(real_sats, current_time, ue_geometry, kernel="delta"):
         ecef, east, north, up = ue_geometry
         sat_ecef = np.stack([
             sat.at(current_time).frame_xyz(itrs).km
             for sat in real_sats
         ])
-        delta = sat_ecef[None, :, :] - ecef[:, None, :]
-        up_component = np.einsum("nkd,nd->nk", delta, up)
-        east_component = np.einsum("nkd,nd->nk", delta, east)
-        north_component = np.einsum("nkd,nd->nk", delta, north)
-        angles = np.degrees(np.arctan2(
-            up_component,
-            np.hypot(east_component, north_component),
-        ))
-        distances = np.linalg.norm(delta, axis=2)
+        angles, distances = elevation_distance(
+            ecef,
+            east,
+            north,
+            up,
+            sat_ecef,
+            kernel=kernel,
+        )
         channel_ps = main.estimate_channel_success_probability(
             angles,
             distances,
         )
-        ranking = np.argsort(angles, axis=1)[:, ::-1]
+        # Policies use at most the Top-3 prefix.
+        ranking = top_k_by_elevation(
+            angles,
+            max(length for _, length in TOP_K_POLICIES),
+        )
         return channel_ps, ranking
 
     def merge_top_k_groups(weights_max_k, ps_max_k, prefix_length):
@@ -3353,7 +3374,7 @@ if RUN_SATELLITE_SELECTION_TOP5_OVER_TIME:
         f"{SECONDS} seconds, {EXPECTED_RAOS} RAOs, "
         f"{WINDOW_COUNT} windows of {WINDOW_RAOS} RAOs"
     )
-    _, _, _, _, _, _, run_history = main.main(
+    _, _, _, _, _, _, run_history = run_main(
         RHO,
         SECONDS,
         NUM_UE,
@@ -3624,7 +3645,7 @@ if RUN_SATELLITE_POOL_REALIZATION_COMPARISON:
                 _,
                 _,
                 run_history,
-            ) = main.main(
+            ) = run_main(
                 RHO,
                 SECONDS,
                 NUM_UE,
@@ -3749,6 +3770,7 @@ if RUN_UE_SPATIAL_DISTRIBUTION_COMPARISON:
     from skyfield.api import load, wgs84
     from skyfield.framelib import itrs
 
+    from geometry_kernel import elevation_distance, top_k_by_elevation
     from scenario_time import get_tle_scenario_metadata
     from selection import solve_group_selection_policy
 
@@ -3809,22 +3831,22 @@ if RUN_UE_SPATIAL_DISTRIBUTION_COMPARISON:
         ))
         return ecef, east, north, up
 
-    def get_mode22_channel_data(satellite_ecef, ue_geometry):
+    def get_mode22_channel_data(satellite_ecef, ue_geometry, kernel="delta"):
         ecef, east, north, up = ue_geometry
-        delta = satellite_ecef[None, :, :] - ecef[:, None, :]
-        up_component = np.einsum("nkd,nd->nk", delta, up)
-        east_component = np.einsum("nkd,nd->nk", delta, east)
-        north_component = np.einsum("nkd,nd->nk", delta, north)
-        angles = np.degrees(np.arctan2(
-            up_component,
-            np.hypot(east_component, north_component),
-        ))
-        distances = np.linalg.norm(delta, axis=2)
+        angles, distances = elevation_distance(
+            ecef,
+            east,
+            north,
+            up,
+            satellite_ecef,
+            kernel=kernel,
+        )
         channel_ps = main.estimate_channel_success_probability(
             angles,
             distances,
         )
-        ranking = np.argsort(angles, axis=1)[:, ::-1]
+        # Mode 22 groups are the Top-2 satellites.
+        ranking = top_k_by_elevation(angles, 2)
         return channel_ps, ranking
 
     def evaluate_mode22_policy(policy, channel_ps, ranking):
@@ -4131,7 +4153,7 @@ if RUN_BETA_SPATIAL_MISMATCH_COMPARISON:
                 _,
                 _,
                 run_history,
-            ) = main.main(
+            ) = run_main(
                 RHO,
                 SECONDS,
                 NUM_UE,
@@ -4207,7 +4229,7 @@ num = 10000
 m = [6,1] #Satellite selection mode and backoff control mode.
 USE_REAL_PS = False
 # Proposed satellite selection and backoff control.
-a, b, c, d, e, f, g = main.main(
+a, b, c, d, e, f, g = run_main(
     1.2,
     SIM_SECONDS,
     num,
@@ -0,0 +1,227 @@
+"""
+lab.py experiments 1, 4, 6 and 15 as experiment_dag graphs.
+
+    python lab_experiments.py 1 4 6 15 --workers 4
+
+The four experiments share many (mode, arrival rate) runs; the scheduler
+simulates each distinct configuration once and later invocations are served
+from result_cache/. Figures are saved under FIGURE_DIR with the thesis file
+names instead of being shown.
+"""
+import argparse
+from pathlib import Path
+
+import matplotlib.pyplot as plt
+import numpy as np
+
+import experiment_dag
+
+
+# Same settings as the corresponding lab.py blocks.
+SIM_SECONDS = 3
+SIM_RHO_VALUES = np.array([1.0, 1.5, 2.0, 2.5, 3.0])
+NUM_UE = 10000
+SEED = 42
+IMBALANCE_EPSILON = 0.001
+USE_REAL_PS = False
+FIGURE_DIR = Path("figures")
+
+
+def run_summary(result):
+    avg_throughput, plr, n_history, _, _, _, run_history = result
+    return {
+        "plr": float(plr),
+        "throughput": float(avg_throughput),
+        "average_delay_ms": float(run_history.get("average_delay_ms", np.nan)),
+        "average_deadline_budget_utilization": float(
+            run_history.get("average_deadline_budget_utilization", np.nan)
+        ),
+        "final_n_estimate": float(n_history[-1]) if len(n_history) > 0 else np.nan,
+    }
+
+
+def add_sweep(experiment, modes, points, run_kwargs):
+    """
+    One run per (mode, point) plus one evaluation per mode collecting
+    run_summary rows. run_kwargs(point) gives (rho, extra main.main kwargs).
+    Returns the evaluation node names by label.
+    """
+    rows = {}
+    for mode, label in modes:
+        names = []
+        for point in points:
+            rho, extra_kwargs = run_kwargs(point)
+            names.append(experiment.run(
+                f"{label} @ {point:g}",
+                float(rho),
+                SIM_SECONDS,
+                NUM_UE,
+                list(mode),
+                SEED,
+                IMBALANCE_EPSILON,
+                USE_REAL_PS=USE_REAL_PS,
+                **extra_kwargs,
+            ))
+        rows[label] = experiment.evaluate(
+            f"{label} rows",
+            lambda *results, points=tuple(points): [
+                dict(run_summary(result), x=float(point))
+                for point, result in zip(points, results)
+            ],
+            names,
+        )
+    return rows
+
+
+def save_line_figure(filename, title, xlabel, ylabel, metric, labels, scale=1.0, xticks=None):
+    def render(*label_rows):
+        FIGURE_DIR.mkdir(parents=True, exist_ok=True)
+        figure, axis = plt.subplots(figsize=(10, 6))
+        for label, rows in zip(labels, label_rows):
+            axis.plot(
+                [row["x"] for row in rows],
+                [row[metric] * scale for row in rows],
+                marker="o",
+                linewidth=1.6,
+                label=label,
+            )
+        axis.set(title=title, xlabel=xlabel, ylabel=ylabel)
+        if xticks is not None:
+            axis.set_xticks(xticks)
+        axis.grid(True, alpha=0.3)
+        axis.legend()
+        figure.tight_layout()
+        path = FIGURE_DIR / filename
+        figure.savefig(path, bbox_inches="tight")
+        plt.close(figure)
+        return str(path)
+    return render
+
+
+def rho_sweep_experiment(name, modes, figures):
+    """figures: (filename, title, ylabel, metric, scale) tuples over arrival rate."""
+    experiment = experiment_dag.Experiment(name)
+    rows = add_sweep(experiment, modes, SIM_RHO_VALUES, lambda rho: (rho, {}))
+    labels = [label for _, label in modes]
+    for filename, title, ylabel, metric, scale in figures:
+        experiment.render(
+            filename,
+            save_line_figure(filename, title, "Arrival rate (packets/s)", ylabel, metric, labels, scale=scale),
+            [rows[label] for label in labels],
+        )
+    return experiment
+
+
+def integrated_scheme_comparison():
+    return rho_sweep_experiment(
+        "1",
+        [([6, 1], "DCLARA"), ([5, 3], "ALLA with SAACB")],
+        [
+            ("all_plr.pdf", "PLR Comparison under Different Arrival Rates", "Packet Loss Rate", "plr", 1.0),
+            ("all_throughput.pdf", "Throughput Comparison under Different Arrival Rates",
+             "Average Throughput (packets/second)", "throughput", 1.0),
+            ("db_consumption.pdf", "Deadline Budget Utilization under Different Arrival Rates",
+             "Average deadline budget utilized (%)", "average_deadline_budget_utilization", 100.0),
+        ],
+    )
+
+
+def backoff_scheme_comparison():
+    return rho_sweep_experiment(
+        "4",
+        [([6, 1], "DCLARA-BC"), ([6, 2], "DACB"), ([6, 3], "SAACB")],
+        [
+            ("bs_new.pdf", "PLR Comparison under Different Arrival Rates", "Packet Loss Rate", "plr", 1.0),
+            ("bs_throughput.pdf", "Throughput Comparison under Different Arrival Rates",
+             "Average Throughput (packets/second)", "throughput", 1.0),
+            ("bs_delay.pdf", "Average Delay Comparison under Different Arrival Rates",
+             "Average Delay (ms)", "average_delay_ms", 1.0),
+        ],
+    )
+
+
+def satellite_selection_comparison():
+    return rho_sweep_experiment(
+        "6",
+        [([3, 3], "VU"), ([5, 3], "ALLA"), ([6, 3], "DCLARA-SS"), ([7, 3], "LLA")],
+        [
+            ("ssplr.pdf", "Satellite Selection PLR Comparison under Different Arrival Rates",
+             "Packet Loss Rate", "plr", 1.0),
+            ("ss_throughput.pdf", "Satellite Selection Throughput Comparison under Different Arrival Rates",
+             "Average Throughput (packets/second)", "throughput", 1.0),
+            ("ss_delay.pdf", "Satellite Selection Average Delay Comparison under Different Arrival Rates",
+             "Average Delay (ms)", "average_delay_ms", 1.0),
+        ],
+    )
+
+
+RADIUS_TABLES = {
+    100.0: "group_ps_table_radius_100km.npz",
+    200.0: "group_ps_table.npz",
+    300.0: "group_ps_table_radius_300km.npz",
+}
+
+
+def service_radius_comparison(rho=1.5):
+    modes = [([6, 1], "DCLARA"), ([5, 3], "ALLA with SAACB")]
+    experiment = experiment_dag.Experiment("15")
+    rows = add_sweep(
+        experiment,
+        modes,
+        list(RADIUS_TABLES),
+        lambda radius_km: (rho, {"SERVICE_RADIUS_KM": radius_km, "GROUP_TABLE_FILENAME": RADIUS_TABLES[radius_km]}),
+    )
+    labels = [label for _, label in modes]
+    for filename, title, ylabel, metric, scale in (
+        ("radius_plr.pdf", "PLR Comparison under Different Service Radii", "Packet loss rate", "plr", 1.0),
+        ("radius_throughput.pdf", "Throughput Comparison under Different Service Radii",
+         "Average throughput (packets/second)", "throughput", 1.0),
+        ("radius_db_consumption.pdf", "Deadline Budget Utilization under Different Service Radii",
+         "Average deadline budget utilized (%)", "average_deadline_budget_utilization", 100.0),
+    ):
+        experiment.render(
+            filename,
+            save_line_figure(
+                filename, title, "Service radius (km)", ylabel, metric, labels,
+                scale=scale, xticks=list(RADIUS_TABLES),
+            ),
+            [rows[label] for label in labels],
+        )
+    return experiment
+
+
+EXPERIMENTS = {
+    1: integrated_scheme_comparison,
+    4: backoff_scheme_comparison,
+    6: satellite_selection_comparison,
+    15: service_radius_comparison,
+}
+
+
+def print_rows(results):
+    for name, rows in results.items():
+        if not name.endswith(" rows"):
+            continue
+        for row in rows:
+            print(
+                f"[{name[:-5]}] x={row['x']:g}: PLR={row['plr']:.4f}, "
+                f"throughput={row['throughput']:.2f}, avg_delay_ms={row['average_delay_ms']:.2f}"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("experiments", nargs="+", type=int, choices=sorted(EXPERIMENTS))
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--cache-dir", default="result_cache")
+    options = parser.parse_args()
+    scheduler = experiment_dag.Scheduler(
+        [EXPERIMENTS[code]() for code in options.experiments],
+        cache_dir=options.cache_dir,
+        workers=options.workers,
+    )
+    results = scheduler.execute()
+    print_rows(results)
+    for name, value in results.items():
+        if name.endswith(".pdf"):
+            print(f"Saved {value}")
@@ -4,12 +4,27 @@ from skyfield.framelib import itrs  # 此次 2026/6/9 凌晨 visibility 加速
 import orbit
 from datetime import datetime, timezone, timedelta  # 必須有 timedelta
 import Load_estimator, backoff_control, N_estimate, selection
+import cohort_engine
+import crn
+import ephemeris
+import event_scheduler
+import geometry_prefetch
+import geometry_kernel
+import group_policy
+import group_tracker as group_tracker_module
+import kernels
+import satellite_culling
+import steady_state
+import visibility_bits
 import json
+import os
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
 from scipy.special import erf
-from scenario_time import get_tle_scenario_metadata, load_starlink_tles
+from scenario_time import TLE_FILENAME, get_tle_scenario_metadata, load_starlink_tles
 
 class controller:
-    def __init__(self, group_weight_table=None, group_ps_table=None):
+    def __init__(self, group_weight_table=None, group_ps_table=None, dense_group_table=None):
         self.satellites = []
         self.sat_num = len(self.satellites) 
         self.Dmax = 20 #Delay budget的最大值
@@ -18,7 +33,12 @@ class controller:
         self.success_state_ratio = np.ones(self.Dmax) / self.Dmax
         self.group_weight_table = group_weight_table
         self.group_ps_table = group_ps_table
-        self.A_by_group = {}
+        if dense_group_table is None and group_weight_table is not None:
+            dense_group_table = group_policy.DenseGroupTable(group_weight_table, group_ps_table)
+        self.dense_group_table = dense_group_table
+        # A_g for the current RAO: row i of policy_matrix belongs to group_row.keys[i].
+        self.group_row = None
+        self.policy_matrix = np.zeros((0, 0))
         self.N_estimate = 0
         self.rls = N_estimate.RLSEstimator(initial_N=self.N_estimate)
         self.actualPi = np.zeros(self.Dmax + 1) #用來記錄每個pi的真實值，供測試參考，包含 idle state
@@ -32,45 +52,56 @@ class controller:
         self.load_aware_load_ema_history = []
         self.adaptive_epsilon_load_ema = 0.0
         self.adaptive_epsilon_history = []
-        self.previous_A_by_group = None
+        self.previous_policy_matrix = None
+        self.previous_group_codes = None
         self.selection_policy_variation_history = []
         self.backoff_optimizer_history = []
+    @property
+    def group_index(self):
+        return self.group_row.index if self.group_row is not None else {}
+
+    def _clear_group_policy(self):
+        self.group_row = None
+        self.policy_matrix = np.zeros((0, self.sat_num))
+
     def set_group_probabilities_for_rao(self, n, selection_mode, use_convex_solver=False, imbalance_epsilon=0.01, preamble_count=None):
         if selection_mode in (5, 7):
-            self.A_by_group = {}
+            self._clear_group_policy()
             return
         if self.group_weight_table is None:
-            self.A_by_group = {}
+            self._clear_group_policy()
             return
-        weights = self.group_weight_table[n]
-        ps_by_group = self.group_ps_table[n] if self.group_ps_table is not None else None
+        if self.sat_num <= 0:
+            raise ValueError("Cannot build A_g before satellites are registered.")
+        previous_row = self.group_row
+        previous_policy = self.policy_matrix
+        row = self.dense_group_table.row(n, self.sat_num)
+        self.group_row = row
+        group_count = len(row)
         if selection_mode == 4:
             # Mode 4 baseline: every group selects its highest-elevation satellite,
             # which is stored as the first satellite index in the ordered group key.
-            current_probabilities = {}
-            for group in weights.keys():
-                group_key = tuple(group)
-                if self.sat_num <= 0:
-                    raise ValueError("Cannot build A_g before satellites are registered.")
-                top_satellite = int(group_key[0])
-                if top_satellite < 0 or top_satellite >= self.sat_num:
-                    raise ValueError(
-                        f"Mode 4 group {group_key} points to satellite {top_satellite}, "
-                        f"but sat_num is {self.sat_num}."
-                    )
-                a_g = np.zeros(self.sat_num)
-                a_g[top_satellite] = 1.0
-                current_probabilities[group_key] = a_g
-            self.A_by_group = current_probabilities
+            policy = np.zeros((group_count, self.sat_num))
+            if group_count > 0:
+                top_satellites = np.asarray([key[0] for key in row.keys], dtype=int)
+                policy[np.arange(group_count), top_satellites] = 1.0
+            self.policy_matrix = policy
             return
-        if use_convex_solver and ps_by_group is not None:
+        if use_convex_solver and row.ps_matrix is not None:
             try:
-                self.A_by_group = selection.solve_group_selection_policy(
-                    weights=weights,
-                    ps_by_group=ps_by_group,
-                    sat_num=self.sat_num,
+                initial_matrix = None
+                if previous_row is not None and len(previous_row) > 0:
+                    # Warm start from the previous RAO; a group without a previous
+                    # A_g fails the solve and falls back to uniform below.
+                    previous_rows = group_policy.align_rows(previous_row.codes, row.codes)
+                    if np.any(previous_rows < 0):
+                        raise KeyError(f"No previous A_g to warm start RAO {n}.")
+                    initial_matrix = previous_policy[previous_rows]
+                self.policy_matrix = selection.solve_group_selection_matrix(
+                    row.weights,
+                    row.ps_matrix,
                     imbalance_epsilon=imbalance_epsilon,
-                    initial_policy=self.A_by_group if self.A_by_group else None,
+                    initial_matrix=initial_matrix,
                 )
                 return
             except Exception as exc:
@@ -80,75 +111,38 @@ class controller:
                   #  f"falling back to uniform A_g. Reason: {exc}"
                 #)
 
-        current_probabilities = {}
-        for group in weights.keys():
-            group_key = tuple(group)
-            if self.sat_num <= 0:
-                raise ValueError("Cannot build A_g before satellites are registered.")
-            current_probabilities[group_key] = np.ones(self.sat_num) / self.sat_num
-        self.A_by_group = current_probabilities
+        self.policy_matrix = np.full((group_count, self.sat_num), 1.0 / self.sat_num)
 
     def record_selection_policy_variation(self, n, selection_mode):
         # Diagnostic only: measure how much the broadcast group selection
         # probabilities A_g change between consecutive RAOs.
-        current_policy = {
-            tuple(group): np.asarray(probabilities, dtype=float).copy()
-            for group, probabilities in self.A_by_group.items()
-        }
-
-        if selection_mode in (3, 5, 7):
-            self.selection_policy_variation_history.append({
-                "time_slot": n,
-                "mean_tv": np.nan,
-                "weighted_tv": np.nan,
-                "max_tv": np.nan,
-                "common_group_count": 0,
-            })
-            self.previous_A_by_group = current_policy
-            return
-
-        if self.previous_A_by_group is None:
-            self.selection_policy_variation_history.append({
-                "time_slot": n,
-                "mean_tv": np.nan,
-                "weighted_tv": np.nan,
-                "max_tv": np.nan,
-                "common_group_count": 0,
-            })
-            self.previous_A_by_group = current_policy
-            return
-
-        common_groups = set(current_policy).intersection(self.previous_A_by_group)
-        if not common_groups:
-            self.selection_policy_variation_history.append({
-                "time_slot": n,
-                "mean_tv": np.nan,
-                "weighted_tv": np.nan,
-                "max_tv": np.nan,
-                "common_group_count": 0,
-            })
-            self.previous_A_by_group = current_policy
-            return
-
-        weights = self.group_weight_table[n] if self.group_weight_table is not None else {}
-        tv_values = []
-        weight_values = []
-        for group in common_groups:
-            current = current_policy[group]
-            previous = self.previous_A_by_group[group]
-            if len(current) != len(previous):
-                continue
-            tv = 0.5 * np.sum(np.abs(current - previous))
-            tv_values.append(tv)
-            weight_values.append(float(weights.get(group, 0.0)))
+        current_policy = self.policy_matrix
+        current_codes = (
+            self.group_row.codes
+            if self.group_row is not None
+            else np.zeros(0, dtype=np.int64)
+        )
+        previous_policy = self.previous_policy_matrix
+        previous_codes = self.previous_group_codes
+        # policy_matrix is replaced, never written in place, so no copy is needed.
+        self.previous_policy_matrix = current_policy
+        self.previous_group_codes = current_codes
+
+        tv_values = np.zeros(0)
+        if selection_mode not in (3, 5, 7) and previous_policy is not None:
+            previous_rows = group_policy.align_rows(previous_codes, current_codes)
+            common, tv_values = group_policy.total_variation(
+                current_policy,
+                previous_policy,
+                previous_rows,
+            )
 
         if len(tv_values) == 0:
             mean_tv = np.nan
             weighted_tv = np.nan
             max_tv = np.nan
         else:
-            tv_values = np.asarray(tv_values, dtype=float)
-            weight_values = np.asarray(weight_values, dtype=float)
+            weight_values = self.group_row.weights[common]
             mean_tv = float(np.mean(tv_values))
             max_tv = float(np.max(tv_values))
             if np.sum(weight_values) > 0:
@@ -163,7 +157,6 @@ class controller:
             "max_tv": max_tv,
             "common_group_count": len(tv_values),
         })
-        self.previous_A_by_group = current_policy
 
     def add_satellite(self, satellite):
         self.satellites.append(satellite)
@@ -251,7 +244,7 @@ class controller:
         reward = -np.mean((Lambda - avg_load) ** 2)
         self.history_reward.append(reward)
         if n % 50 == 0 and n>0:
-            print(f"Current group selection policies: {len(self.A_by_group)} groups")
+            print(f"Current group selection policies: {len(self.policy_matrix)} groups")
             print(f"Current Reward: {reward}")
         return
     def N_estimation(self, Lambda, denominator):
@@ -302,7 +295,9 @@ class controller:
         return epsilon
      
 class satellite:
-    def __init__(self, id, skyfield_sat, Z=54):
+    PREAMBLE_COUNT = 54
+
+    def __init__(self, id, skyfield_sat, Z=PREAMBLE_COUNT):
         self.id = id
         self.skyfield_sat = skyfield_sat
         self.Z = Z          # Number of available preambles 固定為54
@@ -313,12 +308,18 @@ class satellite:
         self.actual_lambda = 0 # 真實附載 (UE數量)，供測試參考
     def assign_id(self, new_id):
         self.id = new_id
-    def receive_preamble(self,ue_id,angle, distance, remaining_budget=None, fixed_channel_success_prob=None):
+    def receive_preamble(self,ue_id,angle, distance, remaining_budget=None, fixed_channel_success_prob=None, channel_draws=None):
         # 模擬 UE隨機選取一個 Preamble (0 到 Z-1)
+        # channel_draws: (LOS uniform, standard-normal shadow fading) from common random numbers.
         if fixed_channel_success_prob is None:
-            channel_success = channel_calculator(angle, distance)
-        else:
+            if channel_draws is None:
+                channel_success = channel_calculator(angle, distance)
+            else:
+                channel_success = channel_calculator(angle, distance, *channel_draws)
+        elif channel_draws is None:
             channel_success = np.random.rand() < fixed_channel_success_prob
+        else:
+            channel_success = channel_draws[0] < fixed_channel_success_prob
 
         if channel_success:
             chosen_preamble = np.random.randint(0, self.Z)
@@ -332,23 +333,20 @@ class satellite:
         alt, az, distance = topocentric.altaz()
         return alt.degrees, distance.km
     def check_RA_success(self):
-        seen_values = set()
-        duplicates = set()
-        success_list = []
-        for value in self.ue_pre.values():
-            preamble = value[0]
-            if preamble in seen_values:
-                duplicates.add(preamble)
-            else:
-                seen_values.add(preamble)
-        for ue, value in self.ue_pre.items():
-            preamble, remaining_budget = value
-            if preamble not in duplicates:
-                success_list.append((ue, remaining_budget))
+        received = list(self.ue_pre.items())
+        unique, n_s, n_c = kernels.singleton_preambles(
+            [value[0] for _, value in received],
+            self.Z,
+        )
+        success_list = [
+            (ue, value[1])
+            for (ue, value), is_unique in zip(received, unique)
+            if is_unique
+        ]
         self.actual_lambda = len(self.ue_pre) #記錄真實附載供測試參考
         self.ue_pre.clear()
-        self.N_s = len(success_list)
-        self.N_c = len(duplicates)
+        self.N_s = n_s
+        self.N_c = n_c
         self.N_i = self.Z - self.N_s - self.N_c
         return success_list
 
@@ -376,9 +374,12 @@ class UE:
         self.active_prob = rho
         self.QoS_requirement = np.zeros(20)
         self.QoS_requirement[[4, 9, 14, 19]] = 0.25
-        self.visible_satellites = []
+        # Visible satellites are a packed bitmask over all_satellites positions;
+        # all_satellites is the shared per-RAO snapshot list, not a per-UE copy.
+        self.visible_bits = visibility_bits.pack_rows(np.zeros(0, dtype=bool))
         self.all_satellites = []
         self.A_g = None
+        self.group_row = -1
         self.selection_mode = None
         self.fixed_channel_success_prob = None
         self.channel_success_prob = np.zeros(0)
@@ -387,6 +388,8 @@ class UE:
         self.acb_selection_count = 0
         self.acb_policy_fallback_count = 0
         self.selected_satellite_id_this_rao = None
+        # crn.CommonRandomNumbers when arrivals, budgets and fading use common random numbers.
+        self.crn = None
         self.geo = wgs84.latlon(self.location[0], self.location[1])
         # 此次 2026/6/9 凌晨 visibility 加速修改：UE 位置固定，先保存 ECEF 與 ENU 單位向量，避免每個 RAO 重複建立地面座標。
         self.lat_rad = np.deg2rad(self.location[0])
@@ -403,15 +406,20 @@ class UE:
             np.cos(self.lat_rad) * np.sin(self.lon_rad),
             np.sin(self.lat_rad),
         ])
+    @property
+    def visible_satellites(self):
+        return [self.all_satellites[i] for i in self.visible_satellite_ids()]
+    def visible_satellite_ids(self):
+        return visibility_bits.indices(self.visible_bits)
     def acquire_visible_sat(self,sat_list,current_time_obj,mode,num):
-        self.visible_satellites = []
         self.all_satellites = list(sat_list)
         self.angle = np.zeros(len(sat_list))        
         self.distance = np.zeros(len(sat_list))
+        visible_mask = np.zeros(len(sat_list), dtype=bool)
         if mode == 2:
             self.fixed_channel_success_prob = 1.0
-            for sat in sat_list:
-                self.visible_satellites.append(sat) #全部都看的到
+            visible_mask[:] = True #全部都看的到
+            self.visible_bits = visibility_bits.pack_rows(visible_mask)
         else:
             self.fixed_channel_success_prob = None
             index = 0
@@ -420,9 +428,9 @@ class UE:
                 self.angle[index] = angle
                 self.distance[index] = distance
                 # 中文註解：對齊 preselection，仰角小於等於 0 的衛星不放入 UE 本輪可選 active set。
-                if visible:
-                    self.visible_satellites.append(sat)
+                visible_mask[index] = visible
                 index += 1
+            self.visible_bits = visibility_bits.pack_rows(visible_mask)
             sorted_indices = np.argsort(self.angle)[::-1]
             # 提取前兩好衛星的實體 ID 或是物件指標
             k1_sat_id = sat_list[sorted_indices[0]].id
@@ -432,6 +440,7 @@ class UE:
             self.group = (k1_sat_id, k2_sat_id)
 
     def new_time(self,bursty):
+        # Returns True when the packet is dropped at its deadline.
         if self.active == True:
             self.delay += 1
             self.current_delay_raos += 1
@@ -440,13 +449,17 @@ class UE:
                 self.loss += 1
                 self.delay = 0
                 self.current_delay_raos = 0
+                return True
         else:
             if bursty:
                 self.new_packet()
     def new_packet(self):
         self.active = True
-        r = np.random.rand()
-        self.budget = np.random.choice(np.arange(1, 21), p=self.QoS_requirement) #根據QoS需求隨機分配delay budget
+        if self.crn is not None:
+            self.budget = self.crn.delay_budget(self.id, self.QoS_requirement)
+        else:
+            r = np.random.rand()
+            self.budget = np.random.choice(np.arange(1, 21), p=self.QoS_requirement) #根據QoS需求隨機分配delay budget
         self.delay = 0
         self.current_delay_raos = 1
         self.target_satellite = None
@@ -454,6 +467,7 @@ class UE:
         #取得系統資訊，包含backoff機率和衛星選擇資訊
         #print(f"UE {self.id}, group {self.group}")
         self.p_b = ctrl.p_b
+        self.group_row = -1
         if self.selection_mode in (5, 7):
             self.load_indicator = ctrl.last_load_indicator
             self.load_aware_eta = ctrl.load_aware_eta
@@ -462,15 +476,17 @@ class UE:
         if self.group is None:
             self.A_g = None
             return
-        group_key = tuple(self.group)
-        if group_key not in ctrl.A_by_group:
+        group_row = ctrl.group_index.get(tuple(self.group))
+        if group_row is None:
             self.A_g = None
             return
-        group_probabilities = ctrl.A_by_group[group_key]
+        self.group_row = group_row
+        group_probabilities = ctrl.policy_matrix[group_row]
         if len(group_probabilities) != ctrl.sat_num:
             raise ValueError(f"UE {self.id} received A_g length {len(group_probabilities)}, expected {ctrl.sat_num}.")
         self.A_g = group_probabilities
     def ACB_test(self):
+        # Returns True when the packet is dropped for an exhausted budget.
         backoff = False
         target_sat = None
         r= np.random.rand()
@@ -480,35 +496,33 @@ class UE:
             self.loss += 1
             self.delay = 0
             self.current_delay_raos = 0
-            return
+            return True
 
         if r < self.p_b[remaining_budget - 1]:
             backoff = True
+        visible_ids = self.visible_satellite_ids()
         if self.selection_mode in (3, 5, 7):
             # VU and load-aware modes select only from the UE-side visible set.
-            candidate_satellites = self.visible_satellites
+            candidate_ids = visible_ids
         else:
-            candidate_satellites = self.all_satellites if len(self.all_satellites) > 0 else self.visible_satellites
-        if not backoff and len(candidate_satellites) > 0:
+            candidate_ids = np.arange(len(self.all_satellites)) if len(self.all_satellites) > 0 else visible_ids
+        if not backoff and len(candidate_ids) > 0:
             self.acb_selection_count += 1
             if self.selection_mode == 3:
-                target_sat = np.random.choice(candidate_satellites)
+                target_sat = self.all_satellites[np.random.choice(candidate_ids)]
                 self.execute_RA(target_sat)
                 return
             if self.selection_mode in (5, 7):
                 load_indicator = self.load_indicator
-                candidate_ids = [sat.id for sat in candidate_satellites]
-                if load_indicator is None or len(load_indicator) <= max(candidate_ids):
+                if load_indicator is None or len(load_indicator) <= candidate_ids[-1]:
                     self.acb_policy_fallback_count += 1
-                    target_sat = max(candidate_satellites, key=lambda sat: self.angle[sat.id])
-                    self.execute_RA(target_sat)
+                    self.execute_RA(self.highest_elevation_satellite(candidate_ids))
                     return
-                if len(self.channel_success_prob) <= max(candidate_ids):
+                if len(self.channel_success_prob) <= candidate_ids[-1]:
                     self.acb_policy_fallback_count += 1
-                    target_sat = max(candidate_satellites, key=lambda sat: self.angle[sat.id])
-                    self.execute_RA(target_sat)
+                    self.execute_RA(self.highest_elevation_satellite(candidate_ids))
                     return
-                load_scale = float(candidate_satellites[0].Z)
+                load_scale = float(self.all_satellites[candidate_ids[0]].Z)
                 link_probabilities = np.asarray(self.channel_success_prob)[candidate_ids]
                 probabilities = link_probabilities * np.exp(
                     -self.load_aware_eta
@@ -518,44 +532,44 @@ class UE:
                 prob_sum = np.sum(probabilities)
                 if prob_sum <= 0 or not np.isfinite(prob_sum):
                     self.acb_policy_fallback_count += 1
-                    target_sat = max(candidate_satellites, key=lambda sat: self.angle[sat.id])
-                    self.execute_RA(target_sat)
+                    self.execute_RA(self.highest_elevation_satellite(candidate_ids))
                     return
                 if self.selection_mode == 5:
-                    chosen_idx = np.random.choice(len(candidate_satellites), p=probabilities / prob_sum)
+                    chosen_idx = np.random.choice(len(candidate_ids), p=probabilities / prob_sum)
                 else:
                     chosen_idx = int(np.argmax(probabilities))
-                target_sat = candidate_satellites[chosen_idx]
+                target_sat = self.all_satellites[candidate_ids[chosen_idx]]
                 self.execute_RA(target_sat)
                 return
             if self.fixed_channel_success_prob is not None:
-                target_sat = np.random.choice(candidate_satellites)
+                target_sat = self.all_satellites[np.random.choice(candidate_ids)]
                 self.execute_RA(target_sat)
                 return
             if self.A_g is None:
                 self.acb_policy_fallback_count += 1
-                fallback_satellites = self.visible_satellites if len(self.visible_satellites) > 0 else candidate_satellites
-                target_sat = max(fallback_satellites, key=lambda sat: self.angle[sat.id])
-                self.execute_RA(target_sat)
+                fallback_ids = visible_ids if len(visible_ids) > 0 else candidate_ids
+                self.execute_RA(self.highest_elevation_satellite(fallback_ids))
                 return
-            candidate_ids = [sat.id for sat in candidate_satellites]
-            probabilities = np.array([self.A_g[k] for k in candidate_ids], dtype=float)
+            probabilities = np.asarray(self.A_g, dtype=float)[candidate_ids]
             prob_sum = np.sum(probabilities)
             if prob_sum <= 0 or not np.isfinite(prob_sum):
                 self.acb_policy_fallback_count += 1
-                fallback_satellites = self.visible_satellites if len(self.visible_satellites) > 0 else candidate_satellites
-                target_sat = max(fallback_satellites, key=lambda sat: self.angle[sat.id])
-                self.execute_RA(target_sat)
+                fallback_ids = visible_ids if len(visible_ids) > 0 else candidate_ids
+                self.execute_RA(self.highest_elevation_satellite(fallback_ids))
                 return
             probabilities = probabilities / prob_sum
             # 隨機選擇一顆衛星並執行 RA
-            chosen_idx = np.random.choice(len(candidate_satellites), p=probabilities)
-            target_sat = candidate_satellites[chosen_idx]            
+            chosen_idx = np.random.choice(len(candidate_ids), p=probabilities)
+            target_sat = self.all_satellites[candidate_ids[chosen_idx]]
             self.execute_RA(target_sat)
         else:
             # Backoff: 本回合不傳輸
             pass
 
+    def highest_elevation_satellite(self, satellite_ids):
+        # argmax keeps the first maximum, matching max() over the ordered list.
+        return self.all_satellites[satellite_ids[int(np.argmax(self.angle[satellite_ids]))]]
+
     def execute_RA(self,target_sat):
         #實際傳輸 Preamble
         # Record the UE-side selection before the channel outcome is known.
@@ -566,6 +580,7 @@ class UE:
             self.distance[target_sat.id],
             remaining_budget=self.budget - self.delay,
             fixed_channel_success_prob=self.fixed_channel_success_prob,
+            channel_draws=None if self.crn is None else self.crn.channel_draws(self.id),
         )
         if r:
             self.transmission_success += 1
@@ -587,31 +602,176 @@ class UE:
             # 碰撞失敗，保持 active，下回合 delay 會增加
             pass
 
+BATCHED_SELECTION_MODES = (1, 4, 5, 6, 7)
+
+
+def _stack_visible(ues, sat_count):
+    return visibility_bits.unpack_rows(
+        np.vstack([ue.visible_bits for ue in ues]),
+        sat_count,
+    )
+
+
+def _highest_elevation_ids(ues, visible):
+    # Vectorized UE.highest_elevation_satellite over the visible set, or over
+    # every satellite for UEs that see none (same fallback as ACB_test).
+    if len(ues) == 0:
+        return np.zeros(0, dtype=int)
+    angles = np.vstack([ue.angle for ue in ues])
+    visible = visible.copy()
+    visible[~np.any(visible, axis=1)] = True
+    return np.argmax(np.where(visible, angles, -np.inf), axis=1)
+
+
+def _policy_targets(ues, ctrl):
+    """Modes 1/4/6: inverse-CDF draw from A_g; -1 where A_g is missing or degenerate."""
+    group_rows = np.array([ue.group_row for ue in ues], dtype=np.int64)
+    has_policy = group_rows >= 0
+    targets = np.full(len(ues), -1, dtype=np.int64)
+    choices, valid = group_policy.inverse_cdf_choice(
+        ctrl.policy_matrix,
+        group_rows[has_policy],
+        np.random.rand(int(np.sum(has_policy))),
+    )
+    targets[np.flatnonzero(has_policy)[valid]] = choices[valid]
+    return targets
+
+
+def _load_aware_targets(ues, ctrl, visible, selection_mode):
+    """
+    Modes 5/7: weight visible satellites by p_link * exp(-eta * load / Z) as one
+    (UE x satellite) matrix; Gumbel-max sampling for mode 5, argmax for mode 7.
+    Returns -1 where ACB_test would fall back to the highest-elevation satellite.
+    """
+    targets = np.full(len(ues), -1, dtype=np.int64)
+    sat_count = visible.shape[1]
+    load_indicator = ctrl.last_load_indicator
+    if load_indicator is None or len(load_indicator) < sat_count:
+        return targets
+    link_probabilities = np.vstack([ue.channel_success_prob for ue in ues])
+    if link_probabilities.shape[1] < sat_count:
+        return targets
+
+    # ACB_test scales the load by the first visible satellite's preamble count.
+    preamble_counts = np.array([sat.Z for sat in ues[0].all_satellites], dtype=float)
+    load_scale = preamble_counts[np.argmax(visible, axis=1)]
+    load = np.maximum(np.asarray(load_indicator, dtype=float)[:sat_count], 0.0)
+    probabilities = link_probabilities[:, :sat_count] * np.exp(
+        -ctrl.load_aware_eta * load[None, :] / load_scale[:, None]
+    )
+    probabilities = np.where(visible, probabilities, 0.0)
+    prob_sum = np.sum(probabilities, axis=1)
+    valid = (prob_sum > 0) & np.isfinite(prob_sum)
+    if selection_mode == 5:
+        with np.errstate(divide="ignore"):
+            scores = np.log(probabilities[valid])
+        scores += np.random.gumbel(size=scores.shape)
+    else:
+        scores = np.where(visible[valid], probabilities[valid], -np.inf)
+    targets[valid] = np.argmax(scores, axis=1)
+    return targets
+
+
+def batched_backoff(active_ues, ctrl):
+    """
+    Budget and backoff branches of ACB_test for all active UEs at once.
+
+    Returns the UEs that passed the ACB draw, in ue_list order, and the
+    number of packets dropped for an exhausted budget.
+    """
+    if len(active_ues) == 0:
+        return [], 0
+    remaining_budget = np.array([ue.budget - ue.delay for ue in active_ues])
+    r = np.random.rand(len(active_ues))
+    decisions = kernels.acb_decisions(remaining_budget, r, ctrl.p_b)
+    expired = np.flatnonzero(decisions == kernels.ACB_EXPIRED)
+    for idx in expired:
+        ue = active_ues[idx]
+        ue.active = False
+        ue.loss += 1
+        ue.delay = 0
+        ue.current_delay_raos = 0
+    return [active_ues[idx] for idx in np.flatnonzero(decisions == kernels.ACB_TRANSMIT)], len(expired)
+
+
+def batched_ACB_test(active_ues, ctrl, selection_mode):
+    """
+    ACB_test for all active UEs at once (modes in BATCHED_SELECTION_MODES).
+
+    Backoff is one uniform vector; satellites come from group inverse-CDF
+    draws (1/4/6) or the load-aware matrix rule (5/7). RNG draws are
+    batched, so the random stream differs from the per-UE loop. Returns
+    the number of packets dropped for an exhausted budget.
+    """
+    transmitting, dropped = batched_backoff(active_ues, ctrl)
+    batched_select(transmitting, ctrl, selection_mode)
+    return dropped
+
+
+def batched_select(transmitting, ctrl, selection_mode):
+    """Satellite choice and RA for UEs that already passed the ACB draw."""
+    sat_count = len(transmitting[0].all_satellites) if transmitting else 0
+    if sat_count == 0:
+        return
+    visible = _stack_visible(transmitting, sat_count)
+    if selection_mode in (5, 7):
+        # Load-aware modes only choose among UE-visible satellites.
+        has_candidates = np.flatnonzero(np.any(visible, axis=1))
+        transmitting = [transmitting[idx] for idx in has_candidates]
+        visible = visible[has_candidates]
+        if len(transmitting) == 0:
+            return
+    for ue in transmitting:
+        ue.acb_selection_count += 1
+
+    if selection_mode in (5, 7):
+        targets = _load_aware_targets(transmitting, ctrl, visible, selection_mode)
+    else:
+        targets = _policy_targets(transmitting, ctrl)
+
+    fallback = np.flatnonzero(targets < 0)
+    if len(fallback) > 0:
+        fallback_ues = [transmitting[idx] for idx in fallback]
+        for ue in fallback_ues:
+            ue.acb_policy_fallback_count += 1
+        targets[fallback] = _highest_elevation_ids(fallback_ues, visible[fallback])
+
+    for ue, target in zip(transmitting, targets):
+        ue.execute_RA(ue.all_satellites[target])
+
+def advance_event_driven_arrivals(ue_list, scheduler, n, rho_rao):
+    """UE.new_time for RAO n driven by ArrivalScheduler events; returns (offered arrivals, dropped packets)."""
+    active_before = len(scheduler.active)
+    for ue_id in scheduler.active:
+        ue = ue_list[ue_id]
+        ue.delay += 1
+        ue.current_delay_raos += 1
+    deadlines = scheduler.pop_deadlines(n)
+    for ue_id in deadlines:
+        ue = ue_list[ue_id]
+        ue.active = False
+        ue.loss += 1
+        ue.delay = 0
+        ue.current_delay_raos = 0
+        scheduler.deactivate(ue_id, n)
+    arrivals = scheduler.pop_arrivals(n)
+    for ue_id in arrivals:
+        ue = ue_list[ue_id]
+        ue.new_packet()
+        scheduler.activate(ue_id, n + ue.budget)
+    # The legacy arrival mask also counts draws that hit already-active UEs.
+    return len(arrivals) + int(np.random.binomial(active_before, rho_rao)), len(deadlines)
+
 def calculate_ps(ctrl,n,group_weight_table, group_ps_table):
-    weights = group_weight_table[n]
-    ps_by_group = group_ps_table[n]
     # 中文註解：依照公式 p_s = sum_g w_g sum_k a_{g,k} p_{s,k}^g 計算，p_{s,k}^g 由預計算表提供。
-    p_s = 0.0
-    for group, w_g in weights.items():
-        group_key = tuple(group)
-        ps_g = ps_by_group[group_key]   # shape: (K,)
-        if len(ps_g) != ctrl.sat_num:
-            raise ValueError(f"p_s vector length {len(ps_g)} does not match number of satellites {ctrl.sat_num} for group {group_key}")
-        if group_key not in ctrl.A_by_group:
-            raise KeyError(f"Missing A_g for group {group_key} at RAO {n}")
-
-        a_g = np.asarray(ctrl.A_by_group[group_key], dtype=float)
-        if len(a_g) != ctrl.sat_num:
-            raise ValueError(f"A_g length {len(a_g)} does not match number of satellites {ctrl.sat_num} for group {group_key}")
-        if np.any(a_g < 0) or not np.all(np.isfinite(a_g)):
-            raise ValueError(f"A_g contains invalid probabilities for group {group_key}")
-        prob_sum = np.sum(a_g)
-        if prob_sum <= 0:
-            continue
-        a_g = a_g / prob_sum
-        group_success = np.sum(a_g * ps_g)
-        p_s += w_g * group_success
-    return p_s
+    dense_table = ctrl.dense_group_table
+    if dense_table is not None and dense_table.group_weight_table is group_weight_table:
+        row = dense_table.row(n, ctrl.sat_num)
+    else:
+        row = group_policy.build_group_row(group_weight_table[n], group_ps_table[n], ctrl.sat_num)
+    if ctrl.policy_matrix.shape != (len(row), ctrl.sat_num):
+        raise KeyError(f"A_g matrix shape {ctrl.policy_matrix.shape} does not match the groups at RAO {n}")
+    return group_policy.success_probability(row.weights, ctrl.policy_matrix, row.ps_matrix)
 
 def _normal_cdf(x):
     return 0.5 * (1.0 + erf(x / np.sqrt(2.0)))
@@ -652,7 +812,8 @@ def estimate_channel_success_probability(elevation_angle, distance_km):
     )
     return np.where(valid, p_success, 0.0)
 
-def channel_calculator(elevation_angle, distance_km):
+def channel_calculator(elevation_angle, distance_km, los_uniform=None, shadow_normal=None):
+    # los_uniform / shadow_normal replace the np.random draws under common random numbers.
     if elevation_angle <= 0:
         return False
 
@@ -686,7 +847,7 @@ def channel_calculator(elevation_angle, distance_km):
         LOS_PROB["prob"]
     )
 
-    is_los = np.random.rand() < p_los
+    is_los = (np.random.rand() if los_uniform is None else los_uniform) < p_los
 
     if is_los:
         sigma_sf = np.interp(
@@ -694,7 +855,7 @@ def channel_calculator(elevation_angle, distance_km):
             CHANNEL_PARAMETER["elevation_deg"],
             CHANNEL_PARAMETER["los_sigma_sf_db"]
         )
-        shadow_fading_db = np.random.normal(0, sigma_sf)
+        shadow_fading_db = np.random.normal(0, sigma_sf) if shadow_normal is None else sigma_sf * shadow_normal
         clutter_loss_db = 0.0
     else:
         sigma_sf = np.interp(
@@ -702,7 +863,7 @@ def channel_calculator(elevation_angle, distance_km):
             CHANNEL_PARAMETER["elevation_deg"],
             CHANNEL_PARAMETER["nlos_sigma_sf_db"]
         )
-        shadow_fading_db = np.random.normal(0, sigma_sf)
+        shadow_fading_db = np.random.normal(0, sigma_sf) if shadow_normal is None else sigma_sf * shadow_normal
         clutter_loss_db = np.interp(
             elevation_angle,
             CHANNEL_PARAMETER["elevation_deg"],
@@ -827,12 +988,183 @@ def generate_ue_locations(
     longitudes = center_longitude + x_km / 100.0
     return np.column_stack((latitudes, longitudes))
 
-def update_visibility_batch(ue_list, sat_list, current_time_obj, mode, min_elevation=0, chunk_size=5000):
+class UEGeometryBuffers:
+    """
+    Static UE ECEF/ENU arrays stored once, plus per-RAO elevation, distance,
+    channel-probability and visibility buffers shared by all UEs.
+
+    UE attributes (angle, distance, channel_success_prob, visible_bits) are
+    row views into these buffers; they are rebound only when the satellite
+    snapshot, the mode, or the buffer shape changes. With dtype float32 the
+    per-RAO buffers and the frames used for the computation (`frames`) are
+    float32; ecef_km/east/north/up stay float64 for reference checks.
+    """
+
+    def __init__(self, ue_list, kernel="delta", dtype="float64"):
+        self.ue_list = ue_list
+        self.ue_count = len(ue_list)
+        self.kernel = geometry_kernel.check_kernel(kernel)
+        self.dtype = geometry_kernel.check_dtype(dtype)
+        if self.ue_count > 0:
+            self.ecef_km = np.ascontiguousarray(np.vstack([ue.ecef_km for ue in ue_list]), dtype=float)
+            self.east = np.ascontiguousarray(np.vstack([ue.enu_east for ue in ue_list]), dtype=float)
+            self.north = np.ascontiguousarray(np.vstack([ue.enu_north for ue in ue_list]), dtype=float)
+            self.up = np.ascontiguousarray(np.vstack([ue.enu_up for ue in ue_list]), dtype=float)
+        else:
+            self.ecef_km = np.zeros((0, 3))
+            self.east = np.zeros((0, 3))
+            self.north = np.zeros((0, 3))
+            self.up = np.zeros((0, 3))
+        self.frames = tuple(
+            array.astype(self.dtype, copy=False)
+            for array in (self.ecef_km, self.east, self.north, self.up)
+        )
+        self.sat_snapshot = None
+        self.sat_count = None
+        self.mode = None
+        self.elevation_deg = None
+        self.distance_km = None
+        self.channel_success_prob = None
+        self.visible_bits = None
+
+    def invalidate(self):
+        # Another code path rewrote the UE attributes; force a rebind.
+        self.mode = None
+
+    def bind(self, ue_list, sat_list, mode):
+        if ue_list is not self.ue_list:
+            raise ValueError("UEGeometryBuffers was built for a different UE list.")
+        sat_count = len(sat_list)
+        same_snapshot = (
+            self.sat_snapshot is not None
+            and len(self.sat_snapshot) == sat_count
+            and all(left is right for left, right in zip(self.sat_snapshot, sat_list))
+        )
+        if same_snapshot and self.mode == mode:
+            return self.sat_snapshot
+
+        if self.sat_count != sat_count:
+            self.elevation_deg = np.zeros((self.ue_count, sat_count), dtype=self.dtype)
+            self.distance_km = np.zeros((self.ue_count, sat_count), dtype=self.dtype)
+            self.channel_success_prob = np.zeros((self.ue_count, sat_count), dtype=self.dtype)
+            self.visible_bits = np.zeros((self.ue_count, visibility_bits.word_count(sat_count)), dtype=np.uint64)
+            self.sat_count = sat_count
+        else:
+            self.channel_success_prob.fill(0.0)
+        self.sat_snapshot = list(sat_list)
+        self.mode = mode
+        for ue_idx, ue in enumerate(ue_list):
+            ue.all_satellites = self.sat_snapshot
+            ue.angle = self.elevation_deg[ue_idx]
+            ue.distance = self.distance_km[ue_idx]
+            ue.channel_success_prob = self.channel_success_prob[ue_idx]
+            ue.visible_bits = self.visible_bits[ue_idx]
+            ue.selection_mode = mode
+            ue.fixed_channel_success_prob = None
+            ue.load_indicator = None
+            if mode in (5, 7):
+                ue.group = None
+        return self.sat_snapshot
+
+# UEs compared against float64 geometry when GEOMETRY_DTYPE is reduced.
+GEOMETRY_PRECISION_SAMPLE_UES = 1000
+# UEs seeing fewer culling survivors than this are computed unculled (Top-2 groups).
+CULLING_EXACT_RANK = 2
+
+
+def visibility_min_elevation_deg(mode, min_elevation=0):
+    # VU and load-aware modes use the same 10-degree UE-side visibility filter.
+    return 10 if mode in (3, 5, 7) else min_elevation
+
+
+def ue_sat_geometry(geometry, rows, sat_ecef_km, elevation_out, distance_out, sat_mask=None, min_elevation=0):
+    """
+    Elevation (deg) and slant range (km) of every satellite for UE rows of geometry.
+
+    Satellites outside sat_mask (culled at min_elevation) are skipped and get
+    CULLED_ELEVATION_DEG and an infinite distance. Culled satellites are below
+    min_elevation for every UE, so the Top-2 order is exact for UEs that see
+    at least two satellites above it; the other UEs are recomputed over all
+    satellites, keeping their groups and highest-elevation fallback unchanged.
+    """
+    if sat_mask is not None and not np.all(sat_mask):
+        kept = np.flatnonzero(sat_mask)
+        elevation_out[...] = satellite_culling.CULLED_ELEVATION_DEG
+        distance_out[...] = np.inf
+        if len(kept) > 0:
+            kept_shape = (elevation_out.shape[0], len(kept))
+            kept_elevation = np.empty(kept_shape, dtype=elevation_out.dtype)
+            kept_distance = np.empty(kept_shape, dtype=distance_out.dtype)
+            ue_sat_geometry(geometry, rows, sat_ecef_km[kept], kept_elevation, kept_distance)
+            elevation_out[:, kept] = kept_elevation
+            distance_out[:, kept] = kept_distance
+        exact = np.flatnonzero(np.count_nonzero(elevation_out > min_elevation, axis=1) < CULLING_EXACT_RANK)
+        if len(exact) > 0:
+            exact_shape = (len(exact), elevation_out.shape[1])
+            exact_elevation = np.empty(exact_shape, dtype=elevation_out.dtype)
+            exact_distance = np.empty(exact_shape, dtype=distance_out.dtype)
+            ue_sat_geometry(geometry, np.arange(geometry.ue_count)[rows][exact], sat_ecef_km, exact_elevation, exact_distance)
+            elevation_out[exact] = exact_elevation
+            distance_out[exact] = exact_distance
+        return
+    ecef_km, east, north, up = geometry.frames
+    geometry_kernel.elevation_distance(
+        ecef_km[rows],
+        east[rows],
+        north[rows],
+        up[rows],
+        np.asarray(sat_ecef_km, dtype=geometry.dtype),
+        kernel=geometry.kernel,
+        elevation_out=elevation_out,
+        distance_out=distance_out,
+    )
+
+
+def prefetch_rao_geometry(geometry, sat_ecef_km, chunk_size=5000, culler=None, min_elevation=0, workers=1, executor=None):
+    """(sat_ecef_km, elevation_deg, distance_km) for one RAO, in fresh arrays."""
+    sat_ecef_km = np.asarray(sat_ecef_km, dtype=float)
+    sat_mask = culler.potentially_visible(sat_ecef_km, min_elevation) if culler is not None else None
+    elevation_deg = np.empty((geometry.ue_count, len(sat_ecef_km)), dtype=geometry.dtype)
+    distance_km = np.empty_like(elevation_deg)
+
+    def fill_rows(rows):
+        ue_sat_geometry(geometry, rows, sat_ecef_km, elevation_deg[rows], distance_km[rows], sat_mask, min_elevation)
+
+    fill_size = chunk_size if workers <= 1 else max(1, min(chunk_size, -(-geometry.ue_count // workers)))
+    fill_slices = [
+        slice(start, min(start + fill_size, geometry.ue_count))
+        for start in range(0, geometry.ue_count, fill_size)
+    ]
+    map_chunks(fill_rows, fill_slices, workers, executor)
+    return sat_ecef_km, elevation_deg, distance_km
+
+
+def geometry_executor(workers):
+    """Thread pool for geometry chunks, or None for one worker; the caller shuts it down."""
+    if workers <= 1:
+        return None
+    return ThreadPoolExecutor(max_workers=workers, thread_name_prefix="geometry-chunk")
+
+
+def map_chunks(function, chunks, workers=1, executor=None):
+    """[function(chunk) for chunk in chunks], on executor (or a pool for this call) when workers > 1."""
+    if workers <= 1 or len(chunks) <= 1:
+        return [function(chunk) for chunk in chunks]
+    if executor is not None:
+        return list(executor.map(function, chunks))
+    with geometry_executor(workers) as call_executor:
+        return list(call_executor.map(function, chunks))
+
+
+def update_visibility_batch(ue_list, sat_list, current_time_obj, mode, min_elevation=0, chunk_size=5000, sat_ecef_km=None, group_tracker=None, geometry=None, prefetched=None, culler=None, kernel="delta", dtype="float64", workers=1, ue_rows=None, executor=None):
     # 此次 2026/6/9 凌晨 visibility 加速修改：每個 RAO 仍完整更新 visibility，但改成批次 ECEF/ENU 投影，避免 UE*衛星 次 Skyfield altaz 呼叫。
     sat_count = len(sat_list)
     if sat_count == 0:
-        for ue in ue_list:
-            ue.visible_satellites = []
+        if geometry is not None:
+            geometry.invalidate()
+        empty_bits = visibility_bits.pack_rows(np.zeros((len(ue_list), 0), dtype=bool))
+        for ue_idx, ue in enumerate(ue_list):
+            ue.visible_bits = empty_bits[ue_idx]
             ue.all_satellites = []
             ue.angle = np.zeros(0)
             ue.distance = np.zeros(0)
@@ -842,12 +1174,15 @@ def update_visibility_batch(ue_list, sat_list, current_time_obj, mode, min_eleva
             ue.channel_success_prob = np.zeros(0)
         return 0
 
-    sat_snapshot = list(sat_list)
     if mode == 2:
+        if geometry is not None:
+            geometry.invalidate()
+        sat_snapshot = list(sat_list)
         # 此次 2026/6/9 凌晨 visibility 加速修改：保留 ideal mode 的原始語意，所有 UE 都視為可見全部衛星。
+        all_visible_bits = visibility_bits.pack_rows(np.ones(sat_count, dtype=bool))
         for ue in ue_list:
-            ue.visible_satellites = list(sat_snapshot)
-            ue.all_satellites = list(sat_snapshot)
+            ue.visible_bits = all_visible_bits
+            ue.all_satellites = sat_snapshot
             ue.angle = np.zeros(sat_count)
             ue.distance = np.zeros(sat_count)
             ue.group = None
@@ -856,62 +1191,142 @@ def update_visibility_batch(ue_list, sat_list, current_time_obj, mode, min_eleva
             ue.channel_success_prob = np.ones(sat_count)
         return len(ue_list) * sat_count
 
-    # VU and load-aware modes use the same 10-degree UE-side visibility filter.
-    visibility_min_elevation = 10 if mode in (3, 5, 7) else min_elevation
+    visibility_min_elevation = visibility_min_elevation_deg(mode, min_elevation)
 
-    for sat in sat_snapshot:
+    for sat in sat_list:
         if sat.id < 0 or sat.id >= sat_count:
             raise ValueError(
                 f"Satellite id {sat.id} is outside angle/distance array length {sat_count}."
             )
 
+    # Geometry buffers are normally owned by main.main and reused every RAO;
+    # standalone callers get a temporary one. ue_rows gives the rows of
+    # ue_list in a buffer built for a larger UE list (lazy visibility): the
+    # buffer stays bound to that list and only these rows are recomputed.
+    if ue_rows is not None:
+        if geometry is None:
+            raise ValueError("ue_rows needs the geometry buffers of the full UE list.")
+        ue_rows = np.asarray(ue_rows, dtype=np.intp)
+        if ue_rows.shape != (len(ue_list),):
+            raise ValueError(f"ue_rows has shape {ue_rows.shape}, expected ({len(ue_list)},).")
+        sat_snapshot = geometry.bind(geometry.ue_list, sat_list, mode)
+    else:
+        if geometry is None:
+            geometry = UEGeometryBuffers(ue_list, kernel, dtype)
+        sat_snapshot = geometry.bind(ue_list, sat_list, mode)
+
     # 此次 2026/6/9 凌晨 visibility 加速修改：衛星位置只和當前 RAO 時間有關，每顆衛星在本 RAO 只轉一次 ITRS/ECEF。
-    sat_ecef_km = np.stack(
-        [sat.skyfield_sat.at(current_time_obj).frame_xyz(itrs).km for sat in sat_snapshot],
-        axis=0,
-    )
+    # Callers holding an interpolated ephemeris pass the positions directly;
+    # a prefetch_rao_geometry result also carries the UE x satellite geometry.
+    if prefetched is not None:
+        sat_ecef_km = prefetched[0]
+        if prefetched[1].shape != geometry.elevation_deg.shape:
+            raise ValueError(
+                f"Prefetched geometry shape {prefetched[1].shape} does not match {geometry.elevation_deg.shape}."
+            )
+    if sat_ecef_km is None:
+        sat_ecef_km = np.stack(
+            [sat.skyfield_sat.at(current_time_obj).frame_xyz(itrs).km for sat in sat_snapshot],
+            axis=0,
+        )
+    elif np.shape(sat_ecef_km) != (sat_count, 3):
+        raise ValueError(
+            f"sat_ecef_km shape {np.shape(sat_ecef_km)} does not match ({sat_count}, 3)."
+        )
 
-    visible_count = 0
-    for start in range(0, len(ue_list), chunk_size):
-        # 此次 2026/6/9 凌晨 visibility 加速修改：分批處理 UE，維持矩陣化速度，同時避免大量 UE 時一次配置過大的 delta 矩陣。
-        chunk = ue_list[start:start + chunk_size]
-        ue_ecef_km = np.vstack([ue.ecef_km for ue in chunk])
-        east_vectors = np.vstack([ue.enu_east for ue in chunk])
-        north_vectors = np.vstack([ue.enu_north for ue in chunk])
-        up_vectors = np.vstack([ue.enu_up for ue in chunk])
-
-        delta = sat_ecef_km[None, :, :] - ue_ecef_km[:, None, :]
-        up_component = np.einsum("nkd,nd->nk", delta, up_vectors)
-        east_component = np.einsum("nkd,nd->nk", delta, east_vectors)
-        north_component = np.einsum("nkd,nd->nk", delta, north_vectors)
-        horizontal_distance = np.hypot(east_component, north_component)
-        elevation_deg = np.degrees(np.arctan2(up_component, horizontal_distance))
-        distance_km = np.linalg.norm(delta, axis=2)
-        channel_success_prob = estimate_channel_success_probability(elevation_deg, distance_km) if mode in (5, 7) else None
+    # Satellites outside the service cone (culler) keep a placeholder elevation
+    # and are not passed to the per-UE geometry. Prefetched arrays were
+    # culled by prefetch_rao_geometry with the same threshold.
+    sat_mask = None
+    if culler is not None and prefetched is None:
+        sat_mask = culler.potentially_visible(sat_ecef_km, visibility_min_elevation)
+
+    # The tracker's elevation-rate bound does not hold across a placeholder
+    # jump, so culled runs re-rank every UE.
+    use_group_tracker = (
+        group_tracker is not None
+        and culler is None
+        and ue_rows is None
+        and mode not in (5, 7)
+        and sat_count >= 2
+    )
+    if use_group_tracker:
+        # Incremental top-2 groups: only UEs whose elevation margin could have
+        # closed since their last ranking are re-sorted.
+        sat_ids = np.array([sat.id for sat in sat_snapshot], dtype=int)
+        tracker_time_s = float(current_time_obj.tt) * 86400.0
+        elevation_rate_bound = group_tracker_module.max_elevation_rate_deg_s(sat_ecef_km)
+
+    # Top-2 by full sort when the tracker is not used.
+    ranked_top2 = None
+    if not use_group_tracker and mode not in (5, 7) and sat_count >= 2:
+        ranked_top2 = np.empty((len(ue_list), 2), dtype=np.intp)
+
+    def fill_rows(rows):
+        # Numeric part of a chunk; writes only its own rows, so chunks can run in parallel.
+        # rows index ue_list; buffer_rows are the matching geometry rows.
+        buffer_rows = rows if ue_rows is None else ue_rows[rows]
+        if ue_rows is None:
+            elevation_deg = geometry.elevation_deg[rows]
+            distance_km = geometry.distance_km[rows]
+        else:
+            elevation_deg = np.empty((len(buffer_rows), sat_count), dtype=geometry.dtype)
+            distance_km = np.empty_like(elevation_deg)
+        # 回填共用 buffer；UE 的 angle/distance/channel_success_prob 是這些 buffer 的 row view。
+        if prefetched is not None:
+            elevation_deg[...] = prefetched[1][buffer_rows]
+            distance_km[...] = prefetched[2][buffer_rows]
+        else:
+            ue_sat_geometry(
+                geometry, buffer_rows, sat_ecef_km, elevation_deg, distance_km, sat_mask, visibility_min_elevation,
+            )
+        if ue_rows is not None:
+            geometry.elevation_deg[buffer_rows] = elevation_deg
+            geometry.distance_km[buffer_rows] = distance_km
+        if mode in (5, 7):
+            geometry.channel_success_prob[buffer_rows] = estimate_channel_success_probability(
+                elevation_deg,
+                distance_km,
+            )
         visible_mask = elevation_deg > visibility_min_elevation
-        sorted_indices = np.argsort(elevation_deg, axis=1)[:, ::-1]
-
-        for local_idx, ue in enumerate(chunk):
-            # 此次 2026/6/9 凌晨 visibility 加速修改：回填既有 UE 欄位，讓後續 ACB/RA 邏輯沿用原本資料介面。
-            ue.all_satellites = list(sat_snapshot)
-            ue.angle = elevation_deg[local_idx].copy()
-            ue.distance = distance_km[local_idx].copy()
-            ue.selection_mode = mode
-            ue.fixed_channel_success_prob = None
-            ue.channel_success_prob = channel_success_prob[local_idx].copy() if mode in (5, 7) else np.zeros(sat_count)
-            ue.load_indicator = None
-            visible_indices = np.flatnonzero(visible_mask[local_idx])
-            ue.visible_satellites = [sat_snapshot[i] for i in visible_indices]
-            visible_count += len(visible_indices)
-            if mode in (5, 7):
-                ue.group = None
-            elif sat_count >= 2:
-                ue.group = (
-                    sat_snapshot[sorted_indices[local_idx, 0]].id,
-                    sat_snapshot[sorted_indices[local_idx, 1]].id,
+        geometry.visible_bits[buffer_rows] = visibility_bits.pack_rows(visible_mask)
+        if ranked_top2 is not None:
+            ranked_top2[rows] = np.argsort(elevation_deg, axis=1)[:, ::-1][:, :2]
+        return int(np.count_nonzero(visible_mask))
+
+    # 此次 2026/6/9 凌晨 visibility 加速修改：分批處理 UE，維持矩陣化速度，同時避免大量 UE 時一次配置過大的 delta 矩陣。
+    # With workers > 1 the chunks are split so every worker gets rows, and
+    # run on the caller's thread pool (einsum/trig/norm release the GIL).
+    ue_count = len(ue_list)
+    fill_size = chunk_size if workers <= 1 else max(1, min(chunk_size, -(-ue_count // workers)))
+    fill_slices = [
+        slice(start, min(start + fill_size, ue_count))
+        for start in range(0, ue_count, fill_size)
+    ]
+    visible_count = sum(map_chunks(fill_rows, fill_slices, workers, executor))
+
+    if mode not in (5, 7) and sat_count >= 2:
+        # UE.group and the tracker history are updated in chunk order.
+        for start in range(0, ue_count, chunk_size):
+            rows = slice(start, min(start + chunk_size, ue_count))
+            chunk = ue_list[rows]
+            if use_group_tracker:
+                changed_rows = group_tracker.update(
+                    geometry.elevation_deg[rows],
+                    tracker_time_s,
+                    elevation_rate_bound,
+                    start=start,
                 )
+                for local_idx in changed_rows:
+                    top_k = group_tracker.top_k[start + local_idx]
+                    chunk[local_idx].group = (int(sat_ids[top_k[0]]), int(sat_ids[top_k[1]]))
             else:
-                ue.group = None
+                for ue, (first, second) in zip(chunk, ranked_top2[rows]):
+                    ue.group = (sat_snapshot[first].id, sat_snapshot[second].id)
+
+    if sat_count < 2 and mode not in (5, 7):
+        for ue in ue_list:
+            ue.group = None
 
     return visible_count
 
@@ -925,36 +1340,31 @@ def evaluate_visibility_heterogeneity(ue_list, num_samples=100):
         return {"jaccard": 1.0, "unique_ratio": 0.0, "cv": 0.0}
 
     # 1. 計算 Jaccard Similarity (量化重疊度)
-    jaccard_indices = []
     # 限制採樣數以提升速度
-    pairs = [np.random.choice(ue_list, 2, replace=False) for _ in range(min(num_samples, len(ue_list)//2))]
-    
-    for u1, u2 in pairs:
-        set1 = set(s.id for s in u1.visible_satellites)
-        set2 = set(s.id for s in u2.visible_satellites)
-        
-        union = set1.union(set2)
-        if len(union) == 0:
-            continue
-        
-        intersection = set1.intersection(set2)
-        jaccard_indices.append(len(intersection) / len(union))
-    
-    avg_jaccard = np.mean(jaccard_indices) if jaccard_indices else 1.0
+    ue_visible_bits = np.stack([ue.visible_bits for ue in ue_list])
+    pairs = np.array(
+        [np.random.choice(len(ue_list), 2, replace=False) for _ in range(min(num_samples, len(ue_list)//2))],
+        dtype=int,
+    ).reshape(-1, 2)
+    jaccard_indices = visibility_bits.jaccard(
+        ue_visible_bits[pairs[:, 0]],
+        ue_visible_bits[pairs[:, 1]],
+    )
+    jaccard_indices = jaccard_indices[np.isfinite(jaccard_indices)]
+
+    avg_jaccard = np.mean(jaccard_indices) if len(jaccard_indices) > 0 else 1.0
 
     # 2. 統計每顆衛星被看見的次數 (量化空間壓力分佈)
     # 假設所有可能的衛星 ID 已經在 active_sat_pool 中
-    sat_appearance = {}
-    for ue in ue_list:
-        for sat in ue.visible_satellites:
-            sat_appearance[sat.id] = sat_appearance.get(sat.id, 0) + 1
+    sat_count = max((len(ue.all_satellites) for ue in ue_list), default=0)
+    sat_appearance = visibility_bits.appearance_counts(ue_visible_bits, sat_count)
     
     # 計算變異係數 (CV)
-    counts = list(sat_appearance.values())
-    cv = np.std(counts) / np.mean(counts) if counts else 0.0
+    counts = sat_appearance[sat_appearance > 0]
+    cv = np.std(counts) / np.mean(counts) if len(counts) > 0 else 0.0
     
     # 3. 統計全體 UE 覆蓋的獨特衛星總數
-    unique_sats = len(sat_appearance.keys())
+    unique_sats = len(counts)
 
     return {
         "avg_jaccard": avg_jaccard, # 越小代表 UE 看到的星越不一樣 (RL 更有利)
@@ -962,11 +1372,12 @@ def evaluate_visibility_heterogeneity(ue_list, num_samples=100):
         "total_unique_sats": unique_sats # 系統當前總共利用了幾顆衛星
     }
 
-def load_fixed_satellites(filename="fixed_satellite_pool.json"):
+def load_fixed_satellites(filename="fixed_satellite_pool.json", satellites=None):
     with open(filename, "r", encoding="utf-8") as f:
         records = json.load(f)
     # 重新載入與 generate_satellite_pool.py 相同的 TLE
-    satellites = load_starlink_tles()
+    if satellites is None:
+        satellites = load_starlink_tles()
     sat_dict = {
         sat.model.satnum: sat
         for sat in satellites
@@ -1054,6 +1465,118 @@ def load_ps_tables(
         print(f"VU ps table shape: {mode3_visible_random_ps_table.shape}")
     return group_weight_table, group_ps_table, mode3_visible_random_ps_table
 
+def table_satellite_count(group_ps_table):
+    """Length of the p_s vectors in group_ps_table, or None when it has no groups."""
+    first_ps_table = next((table for table in group_ps_table if len(table) > 0), None)
+    if first_ps_table is None:
+        return None
+    return len(next(iter(first_ps_table.values())))
+
+class Scenario:
+    """
+    Run-independent inputs of main.main: timescale, TLE-derived start time,
+    the fixed satellite pool, the validated group tables (with their dense
+    row cache) and the load-estimator expectation tables. Build it once and
+    pass it as main(SCENARIO=...) so repeated runs pay only simulation cost.
+    Runs only add to two caches: expected_tables() for a new Z and the
+    DenseGroupTable rows. The Z=54 tables are computed here and warm()
+    builds every dense row, so a warmed Scenario is not modified by runs
+    and forked workers share it copy-on-write. UEs are still built per
+    run: their locations come from the SEED-driven random stream.
+    """
+
+    def __init__(
+        self,
+        satellite_pool_filename="fixed_satellite_pool.json",
+        group_table_filename="group_ps_table.npz",
+        service_radius_km=200.0,
+    ):
+        self.satellite_pool_filename = str(satellite_pool_filename)
+        self.group_table_filename = str(group_table_filename)
+        self.service_radius_km = float(service_radius_km)
+        self.timescale = load.timescale()
+        starlink_sats = load_starlink_tles()
+        self.metadata = get_tle_scenario_metadata(starlink_sats)
+        self.real_sats = load_fixed_satellites(self.satellite_pool_filename, satellites=starlink_sats)
+        (
+            self.group_weight_table,
+            self.group_ps_table,
+            self.mode3_visible_random_ps_table,
+        ) = load_ps_tables(
+            filename=self.group_table_filename,
+            scenario_metadata=self.metadata,
+            expected_sat_norad_ids=[int(sat.model.satnum) for sat in self.real_sats],
+            expected_radius_km=self.service_radius_km,
+        )
+        self.dense_group_table = group_policy.DenseGroupTable(self.group_weight_table, self.group_ps_table)
+        self._expected_tables = {}
+        self.expected_tables(satellite.PREAMBLE_COUNT)
+
+    def matches(self, satellite_pool_filename, group_table_filename, service_radius_km):
+        return (
+            Path(self.satellite_pool_filename).resolve() == Path(satellite_pool_filename).resolve()
+            and Path(self.group_table_filename).resolve() == Path(group_table_filename).resolve()
+            and np.isclose(self.service_radius_km, float(service_radius_km))
+        )
+
+    def expected_tables(self, Z):
+        tables = self._expected_tables.get(Z)
+        if tables is None:
+            tables = Load_estimator.precompute_expected_tables(Z=Z, Nmax=1000)
+            self._expected_tables[Z] = tables
+        return tables
+
+    def warm(self):
+        """Build every DenseGroupTable row for the table's satellite count."""
+        sat_num = table_satellite_count(self.group_ps_table)
+        if sat_num is not None:
+            for n in range(len(self.group_weight_table)):
+                self.dense_group_table.row(n, sat_num)
+        return self
+
+
+_shared_scenarios = {}
+
+
+def _file_signature(filename):
+    stat = os.stat(filename)
+    return str(Path(filename).resolve()), stat.st_size, stat.st_mtime_ns
+
+
+def shared_scenario(
+    satellite_pool_filename="fixed_satellite_pool.json",
+    group_table_filename="group_ps_table.npz",
+    service_radius_km=200.0,
+):
+    """
+    Per-process Scenario cache. The key includes the size and mtime of the
+    TLE, pool and table files, so a regenerated file gets a fresh Scenario.
+    Scenarios are warmed on creation, so workers forked afterwards inherit
+    filled caches.
+    """
+    key = (
+        _file_signature(TLE_FILENAME),
+        _file_signature(satellite_pool_filename),
+        _file_signature(group_table_filename),
+        float(service_radius_km),
+    )
+    scenario = _shared_scenarios.get(key)
+    if scenario is None:
+        scenario = Scenario(satellite_pool_filename, group_table_filename, service_radius_km).warm()
+        _shared_scenarios[key] = scenario
+    return scenario
+
+
+def run_with_shared_scenario(*args, **kwargs):
+    """main(*args, **kwargs) using shared_scenario() for its pool, table and radius unless SCENARIO is given."""
+    if kwargs.get("SCENARIO") is None:
+        kwargs["SCENARIO"] = shared_scenario(
+            kwargs.get("SATELLITE_POOL_FILENAME", "fixed_satellite_pool.json"),
+            kwargs.get("GROUP_TABLE_FILENAME", "group_ps_table.npz"),
+            kwargs.get("SERVICE_RADIUS_KM", 200.0),
+        )
+    return main(*args, **kwargs)
+
 def main(
     RHO,
     SECONDS,
@@ -1077,6 +1600,25 @@ def main(
     UE_SPATIAL_DISTRIBUTION="uniform",
     UE_LOCATION_SEED=None,
     UE_SPATIAL_BETA_B=1.0,
+    EPHEMERIS_GRID_SECONDS=None,
+    EPHEMERIS_BACKEND="skyfield",
+    EPHEMERIS_FRAME="exact",
+    BATCHED_SELECTION=False,
+    ENGINE="ue",
+    EVENT_DRIVEN_ARRIVALS=False,
+    KERNEL_BACKEND="auto",
+    LAZY_VISIBILITY=False,
+    PREFETCH_GEOMETRY=False,
+    SATELLITE_CULLING=False,
+    GEOMETRY_KERNEL="delta",
+    GEOMETRY_DTYPE="float64",
+    GEOMETRY_WORKERS=1,
+    GROUP_TRACKER=False,
+    SCENARIO=None,
+    COMMON_RANDOM_NUMBERS=False,
+    STEADY_STATE=False,
+    STEADY_STATE_BATCHES=steady_state.DEFAULT_BATCH_COUNT,
+    STEADY_STATE_EARLY_EXIT=None,
 ):
     # 模式設定
     np.random.seed(SEED) # 固定隨機種子以確保可重現性
@@ -1093,6 +1635,40 @@ def main(
         raise ValueError(
             "Collision diagnostics require DCLARA-SS selection mode 1 or 6."
         )
+    if ENGINE not in ("ue", "cohort"):
+        raise ValueError(f"Unknown ENGINE {ENGINE!r}; expected 'ue' or 'cohort'.")
+    if LAZY_VISIBILITY and (ENGINE == "cohort" or selection_mode not in BATCHED_SELECTION_MODES):
+        raise ValueError(
+            f"LAZY_VISIBILITY needs the per-UE engine and a selection mode in {BATCHED_SELECTION_MODES}."
+        )
+    if ephemeris.check_frame(EPHEMERIS_FRAME) != "exact" and (
+        EPHEMERIS_BACKEND != "sgp4" or EPHEMERIS_GRID_SECONDS is not None
+    ):
+        raise ValueError("EPHEMERIS_FRAME='gmst' needs EPHEMERIS_BACKEND='sgp4' without EPHEMERIS_GRID_SECONDS.")
+    if int(GEOMETRY_WORKERS) < 1:
+        raise ValueError("GEOMETRY_WORKERS must be at least 1.")
+    if PREFETCH_GEOMETRY and (ENGINE == "cohort" or LAZY_VISIBILITY):
+        raise ValueError("PREFETCH_GEOMETRY needs full per-UE geometry (ENGINE='ue', LAZY_VISIBILITY=False).")
+    if GROUP_TRACKER and (ENGINE == "cohort" or LAZY_VISIBILITY or SATELLITE_CULLING or EVENT_DRIVEN_ARRIVALS):
+        raise ValueError(
+            "GROUP_TRACKER needs full unculled per-UE geometry every RAO "
+            "(ENGINE='ue', LAZY_VISIBILITY=False, SATELLITE_CULLING=False, EVENT_DRIVEN_ARRIVALS=False)."
+        )
+    if STEADY_STATE_EARLY_EXIT is not None and not STEADY_STATE:
+        raise ValueError("STEADY_STATE_EARLY_EXIT needs STEADY_STATE=True.")
+    if COMMON_RANDOM_NUMBERS and (ENGINE == "cohort" or EVENT_DRIVEN_ARRIVALS):
+        raise ValueError("COMMON_RANDOM_NUMBERS needs the per-UE engine with per-RAO arrival draws.")
+    if COMMON_RANDOM_NUMBERS and SEED is None:
+        raise ValueError("COMMON_RANDOM_NUMBERS needs an integer SEED to derive the common streams.")
+    if ENGINE == "cohort" and EVENT_DRIVEN_ARRIVALS:
+        raise ValueError("EVENT_DRIVEN_ARRIVALS applies to the per-UE engine only.")
+    if ENGINE == "cohort" and selection_mode not in cohort_engine.COHORT_SELECTION_MODES:
+        raise ValueError(
+            f"The cohort engine supports selection modes {cohort_engine.COHORT_SELECTION_MODES}, "
+            f"not {selection_mode}."
+        )
+    # Set on every call so one run's backend does not carry over to the next.
+    kernels.set_backend(KERNEL_BACKEND)
     print(f"--- Simulation Start ---")
     print(f"Mode: {MODE}, Arrival rate lambda: {RHO} packets/s,  Time Slots: {SECONDS}")
     if selection_mode == 0:
@@ -1113,6 +1689,29 @@ def main(
         print(f"Actual UE Beta concentration b: {UE_SPATIAL_BETA_B:g}")
     if selection_mode == 5:
         print(f"Mode 5 load EMA beta: {LOAD_AWARE_LOAD_EMA_BETA}")
+    if BATCHED_SELECTION:
+        print("Batched UE satellite selection: on")
+    if ENGINE == "cohort":
+        print("Engine: cohort counts (no per-UE state; visible-satellite feasibility check skipped)")
+    if EVENT_DRIVEN_ARRIVALS:
+        print("Event-driven arrivals: on (per-RAO geometry only for active UEs)")
+    if COMMON_RANDOM_NUMBERS:
+        print("Common random numbers: arrivals, delay budgets and fading per (UE, RAO)")
+    if STEADY_STATE:
+        print(
+            f"Steady-state estimation: MSER-5 warm-up, {int(STEADY_STATE_BATCHES)} batch means in run_history['steady_state']"
+            + (f", early exit at ±{STEADY_STATE_EARLY_EXIT:g} relative" if STEADY_STATE_EARLY_EXIT is not None else "")
+        )
+    print(f"Kernel backend: {kernels.get_backend()}")
+    print(
+        f"Geometry kernel: {geometry_kernel.check_kernel(GEOMETRY_KERNEL)}, "
+        f"dtype: {geometry_kernel.check_dtype(GEOMETRY_DTYPE).name}, "
+        f"workers: {int(GEOMETRY_WORKERS)}"
+    )
+    if LAZY_VISIBILITY:
+        print("Lazy visibility: geometry only for UEs that pass ACB")
+    if GROUP_TRACKER:
+        print("Group tracker: incremental top-2 groups (re-rank only near elevation crossovers)")
     # Optional QoS sweep hook: use the default delay distribution when none is provided.
     if QOS_DISTRIBUTION is None:
         qos_distribution = np.zeros(20, dtype=float)
@@ -1137,25 +1736,31 @@ def main(
     
     # 設定觀察點 (台北)
     geo = wgs84.latlon(25.03, 121.56)
-    ts = load.timescale()
-    scenario_metadata = get_tle_scenario_metadata()
+    if SCENARIO is None:
+        SCENARIO = Scenario(SATELLITE_POOL_FILENAME, GROUP_TABLE_FILENAME, SERVICE_RADIUS_KM)
+    elif not SCENARIO.matches(SATELLITE_POOL_FILENAME, GROUP_TABLE_FILENAME, SERVICE_RADIUS_KM):
+        raise ValueError(
+            "SCENARIO was built for a different satellite pool, group table or service radius."
+        )
+    ts = SCENARIO.timescale
+    scenario_metadata = SCENARIO.metadata
     start_dt = scenario_metadata["start_dt"]
     print(f"Scenario start time from TLE median epoch: {scenario_metadata['start_dt_iso']}")
     #t_start = ts.from_datetime(start_dt)
-    real_sats = load_fixed_satellites(SATELLITE_POOL_FILENAME)
+    real_sats = SCENARIO.real_sats
     #設定controller
     #載入其他預運算資料
-    expected_sat_norad_ids = [int(sat.model.satnum) for sat in real_sats]
-    group_weight_table, group_ps_table, mode3_visible_random_ps_table = load_ps_tables(
-        filename=GROUP_TABLE_FILENAME,
-        scenario_metadata=scenario_metadata,
-        expected_sat_norad_ids=expected_sat_norad_ids,
-        expected_radius_km=SERVICE_RADIUS_KM,
-    )
+    group_weight_table = SCENARIO.group_weight_table
+    group_ps_table = SCENARIO.group_ps_table
+    mode3_visible_random_ps_table = SCENARIO.mode3_visible_random_ps_table
     if selection_mode in (5, 7):
         group_weight_table = None
         group_ps_table = None
-    ctrl = controller(group_weight_table=group_weight_table, group_ps_table=group_ps_table)
+    ctrl = controller(
+        group_weight_table=group_weight_table,
+        group_ps_table=group_ps_table,
+        dense_group_table=SCENARIO.dense_group_table if group_weight_table is not None else None,
+    )
     ctrl.load_aware_eta = LOAD_AWARE_ETA
     # 將真實衛星「封裝」進您的 Simulation Class
     sat_list = []
@@ -1176,10 +1781,9 @@ def main(
     if selection_mode in (5, 7):
         active_sat_pool = sat_list
     else:
-        first_ps_table = next((table for table in group_ps_table if len(table) > 0), None)
-        if first_ps_table is None:
+        table_sat_count = table_satellite_count(group_ps_table)
+        if table_sat_count is None:
             raise ValueError("group_ps_table has no groups; cannot infer satellite count.")
-        table_sat_count = len(next(iter(first_ps_table.values())))
         if len(sat_list) < table_sat_count:
             raise ValueError(
                 f"Fixed satellite pool has {len(sat_list)} satellites, but group_ps_table expects {table_sat_count}."
@@ -1192,39 +1796,96 @@ def main(
         sat = active_sat_pool[i]
         ctrl.add_satellite(sat) #Controller只加入active_sat_pool裡的衛星
         sat.assign_id(i) #為每個衛星分配新的ID
-    expected_tables = Load_estimator.precompute_expected_tables(Z=sat_list[0].Z, Nmax=1000) #預計算期望值表，傳入Z值和Nmax上限
+    expected_tables = SCENARIO.expected_tables(sat_list[0].Z) #預計算期望值表，傳入Z值和Nmax上限
+    sat_ephemeris = None
+    if EPHEMERIS_GRID_SECONDS is not None and selection_mode != 2:
+        # Optional coarse-grid ephemeris: propagate every EPHEMERIS_GRID_SECONDS
+        # and interpolate the per-RAO positions instead of calling SGP4 each RAO.
+        sat_ephemeris = ephemeris.InterpolatedEphemeris(
+            [sat.skyfield_sat for sat in active_sat_pool],
+            start_dt,
+            RAO_COUNTS * trao / 1000,
+            grid_step_s=EPHEMERIS_GRID_SECONDS,
+            timescale=ts,
+            backend=EPHEMERIS_BACKEND,
+        )
+        print(
+            f"Interpolated ephemeris ({EPHEMERIS_BACKEND}): grid={EPHEMERIS_GRID_SECONDS:g} s, "
+            f"max position error={sat_ephemeris.max_position_error_km() * 1000:.3f} m"
+        )
+    elif ephemeris.check_backend(EPHEMERIS_BACKEND) == "sgp4" and selection_mode != 2:
+        # Per-RAO positions from one SatrecArray call instead of one Skyfield call per satellite.
+        sat_ephemeris = ephemeris.SGP4Ephemeris(
+            [sat.skyfield_sat for sat in active_sat_pool],
+            start_dt,
+            timescale=ts,
+            frame=EPHEMERIS_FRAME,
+        )
+        print(
+            "Array SGP4 ephemeris: max difference from Skyfield="
+            f"{sat_ephemeris.max_position_error_km([0.0, RAO_COUNTS * trao / 1000]) * 1000:.3e} m"
+        )
+        if EPHEMERIS_FRAME != "exact":
+            frame_report = sat_ephemeris.frame_error_report([0.0, RAO_COUNTS * trao / 2000, RAO_COUNTS * trao / 1000])
+            print(
+                f"Fast {EPHEMERIS_FRAME} frame: max rotation error={frame_report['max_rotation_error_rad']:.3e} rad, "
+                f"max position error vs exact frame={frame_report['max_position_error_m']:.3e} m"
+            )
     n_history = [] # 記錄每個 Slot 的 N_estimate
     ue_list = []
-    R_km = SERVICE_RADIUS_KM
-    c = [25.03, 121.56] # 台北中心點
-    location_rng = (
-        None
-        if UE_LOCATION_SEED is None
-        else np.random.RandomState(UE_LOCATION_SEED)
-    )
-    ue_locations = generate_ue_locations(
-        NUM_UE,
-        center=c,
-        radius_km=R_km,
-        distribution=UE_SPATIAL_DISTRIBUTION,
-        random_generator=location_rng,
-        beta_b=UE_SPATIAL_BETA_B,
-    )
-    if UE_LOCATION_SEED is not None:
-        # Keep packet arrivals, QoS draws, and channel randomness aligned with
-        # the legacy Uniform-location run in every spatial-distribution case.
-        generate_ue_locations(
+    cohorts = None
+    ue_group_tracker = None
+    ue_geometry = None
+    if ENGINE == "cohort":
+        cohorts = cohort_engine.CohortPopulation(NUM_UE, qos_distribution)
+    else:
+        R_km = SERVICE_RADIUS_KM
+        c = [25.03, 121.56] # 台北中心點
+        location_rng = (
+            None
+            if UE_LOCATION_SEED is None
+            else np.random.RandomState(UE_LOCATION_SEED)
+        )
+        ue_locations = generate_ue_locations(
             NUM_UE,
             center=c,
             radius_km=R_km,
-            distribution="uniform",
-            random_generator=np.random,
+            distribution=UE_SPATIAL_DISTRIBUTION,
+            random_generator=location_rng,
+            beta_b=UE_SPATIAL_BETA_B,
+        )
+        if UE_LOCATION_SEED is not None:
+            # Keep packet arrivals, QoS draws, and channel randomness aligned with
+            # the legacy Uniform-location run in every spatial-distribution case.
+            generate_ue_locations(
+                NUM_UE,
+                center=c,
+                radius_km=R_km,
+                distribution="uniform",
+                random_generator=np.random,
+            )
+        for i, (lat, lon) in enumerate(ue_locations):
+            ue = UE(location=[lat, lon], id=i, rho=RHO)
+            ue.QoS_requirement = qos_distribution.copy()
+            ue_list.append(ue)
+        ctrl.ue_list = ue_list #將UE列表傳給controller，讓controller可以在需要的時候訪問UE資訊
+        if COMMON_RANDOM_NUMBERS:
+            common_random_numbers = crn.CommonRandomNumbers(SEED, NUM_UE)
+            for ue in ue_list:
+                ue.crn = common_random_numbers
+        if GROUP_TRACKER:
+            # Opt-in: the elevation-rate bound is a heuristic and ties can
+            # break differently from the full argsort, so groups may differ.
+            ue_group_tracker = group_tracker_module.TopKGroupTracker(NUM_UE, k=2)
+        ue_geometry = UEGeometryBuffers(ue_list, GEOMETRY_KERNEL, GEOMETRY_DTYPE)
+    arrival_scheduler = None
+    if EVENT_DRIVEN_ARRIVALS:
+        arrival_scheduler = event_scheduler.ArrivalScheduler(
+            NUM_UE,
+            RAO_COUNTS,
+            rho_rao,
+            max_budget=len(qos_distribution),
         )
-    for i, (lat, lon) in enumerate(ue_locations):
-        ue = UE(location=[lat, lon], id=i, rho=RHO)
-        ue.QoS_requirement = qos_distribution.copy()
-        ue_list.append(ue)
-    ctrl.ue_list = ue_list #將UE列表傳給controller，讓controller可以在需要的時候訪問UE資訊
 
     throughput_history = []
     last_real_p_s = None
@@ -1242,306 +1903,556 @@ def main(
         sat.N_i = sat.N_s = sat.N_c = 0
         sat.actual_lambda = 0
 
-    for n in range(RAO_COUNTS): #統一用n，表示現在是在第幾個RAO
-        # --- 更新時間與產生封包 ---
-        arrival_mask = np.random.rand(NUM_UE) < rho_rao
-        # Record the exogenous offered traffic before active-state and backoff
-        # gating so this metric remains independent of the control scheme.
-        offered_arrival_history.append(int(np.count_nonzero(arrival_mask)))
-        for i, ue in enumerate(ue_list):
-            ue.new_time(bursty=arrival_mask[i])
-
-        current_ms = n * trao
-        current_dt = start_dt + timedelta(milliseconds=current_ms)
-        current_t = ts.from_datetime(current_dt)
-        # --- 衛星移動與可見衛星列表更新 ---
-        visible_count = update_visibility_batch(ue_list, active_sat_pool, current_t, selection_mode)
-        avg_visible = visible_count / NUM_UE
-        if n % 50 == 0 and n>0:
-            print(f"RAO {n}: Average visible satellites per UE: {avg_visible:.2f}")
-        if avg_visible < 1:
-            print("Warning: Too few visible satellites on average. The simulation scenario is not feasible. Ending simulation.")
-            return
-        if selection_mode == 0: #測試模式，不是真的跑模擬
-            eval_metrics = evaluate_visibility_heterogeneity(ue_list)
-            return eval_metrics
-        real_counts = np.zeros(ctrl.Dmax)
-        idle_ue_count=0
-        for ue in ue_list:
-            if ue.active:
-                # 取得該 UE 剩餘的延遲預算 
-                nn = ue.budget - ue.delay
-                if nn > 0:
-                    real_counts[nn-1] += 1
+    sat_culler = None
+    if SATELLITE_CULLING and ue_geometry is not None and ue_geometry.ue_count > 0:
+        sat_culler = satellite_culling.ServiceConeCuller(ue_geometry.ecef_km)
+        print(
+            "Satellite culling: service cap half-angle "
+            f"{np.degrees(sat_culler.cap_half_angle):.2f} deg"
+        )
+    def rao_sat_ecef_km(rao):
+        if sat_ephemeris is not None:
+            return sat_ephemeris.positions_km(rao * trao / 1000)
+        rao_t = ts.from_datetime(start_dt + timedelta(milliseconds=rao * trao))
+        return np.stack([sat.skyfield_sat.at(rao_t).frame_xyz(itrs).km for sat in active_sat_pool], axis=0)
+
+    geometry_precision = None
+    if (
+        ue_geometry is not None
+        and ue_geometry.dtype != np.float64
+        and ue_geometry.ue_count > 0
+        and selection_mode != 2
+        and len(active_sat_pool) > 0
+    ):
+        # Reduced-precision geometry is checked against float64 once, at RAO 0,
+        # on evenly spaced UEs (no draws from the simulation random stream).
+        sample_rows = np.unique(np.linspace(
+            0, ue_geometry.ue_count - 1, min(ue_geometry.ue_count, GEOMETRY_PRECISION_SAMPLE_UES)
+        ).astype(int))
+        geometry_precision = geometry_kernel.precision_report(
+            ue_geometry.ecef_km[sample_rows],
+            ue_geometry.east[sample_rows],
+            ue_geometry.north[sample_rows],
+            ue_geometry.up[sample_rows],
+            rao_sat_ecef_km(0),
+            estimate_channel_success_probability,
+            dtype=ue_geometry.dtype,
+            kernel=ue_geometry.kernel,
+        )
+        geometry_precision["rao"] = 0
+        geometry_precision["sampled_ues"] = len(sample_rows)
+        geometry_precision["group_order_changed_ues"] = [
+            int(sample_rows[row]) for row in geometry_precision["group_order_changed_ues"]
+        ]
+        print(
+            f"{geometry_precision['dtype']} geometry vs float64 at RAO 0 ({len(sample_rows)} UEs): "
+            f"max elevation error={geometry_precision['max_elevation_error_deg']:.2e} deg, "
+            f"max channel probability error={geometry_precision['max_channel_probability_error']:.2e}, "
+            f"UEs with changed Top-2 order={len(geometry_precision['group_order_changed_ues'])}"
+        )
+    # Owned by this run and shut down with the prefetcher; a pool shared
+    # across runs would leak threads and break in forked sweep workers.
+    chunk_executor = geometry_executor(int(GEOMETRY_WORKERS))
+    geometry_prefetcher = None
+    if PREFETCH_GEOMETRY and selection_mode != 2 and len(active_sat_pool) > 0:
+        # Geometry depends only on the RAO time, so RAO n+1 is computed on a
+        # worker thread while RAO n runs the controller and UE logic.
+        geometry_prefetcher = geometry_prefetch.GeometryPrefetcher(
+            lambda rao: prefetch_rao_geometry(
+                ue_geometry,
+                rao_sat_ecef_km(rao),
+                culler=sat_culler,
+                min_elevation=visibility_min_elevation_deg(selection_mode),
+                workers=int(GEOMETRY_WORKERS),
+                executor=chunk_executor,
+            ),
+            RAO_COUNTS,
+        )
+        print("Geometry prefetch: background thread, 1 RAO ahead")
+
+    completed_raos = RAO_COUNTS
+    # Per-RAO dropped packets and summed success delay (RAOs), for steady-state batch means.
+    loss_history = []
+    success_delay_sum_history = []
+    cumulative_loss = 0
+    cumulative_delay_sum = 0.0
+
+    def steady_state_estimate():
+        warmup_series = {"throughput": throughput_history, "p_b": p_b_history}
+        if backoff_mode == 1:
+            warmup_series["n_estimate"] = n_history
+        return steady_state.estimate(
+            throughput_history,
+            loss_history,
+            success_delay_sum_history,
+            trao,
+            warmup_series,
+            batch_count=int(STEADY_STATE_BATCHES),
+        )
+
+    try:
+        for n in range(RAO_COUNTS): #統一用n，表示現在是在第幾個RAO
+            # --- 更新時間與產生封包 ---
+            # Packets dropped at their deadline this RAO (per-UE engine).
+            deadline_drops = 0
+            if cohorts is not None:
+                offered_arrival_history.append(cohorts.new_time(rho_rao))
+            elif arrival_scheduler is not None:
+                offered_arrivals, deadline_drops = advance_event_driven_arrivals(ue_list, arrival_scheduler, n, rho_rao)
+                offered_arrival_history.append(offered_arrivals)
+            else:
+                if COMMON_RANDOM_NUMBERS:
+                    common_random_numbers.begin_rao(n)
+                    arrival_mask = common_random_numbers.arrival_mask(rho_rao)
+                else:
+                    arrival_mask = np.random.rand(NUM_UE) < rho_rao
+                # Record the exogenous offered traffic before active-state and backoff
+                # gating so this metric remains independent of the control scheme.
+                offered_arrival_history.append(int(np.count_nonzero(arrival_mask)))
+                for i, ue in enumerate(ue_list):
+                    if ue.new_time(bursty=arrival_mask[i]):
+                        deadline_drops += 1
+
+            # UEs the per-RAO loops visit; with event-driven arrivals only the active ones.
+            if arrival_scheduler is not None:
+                rao_ues = [ue_list[ue_id] for ue_id in arrival_scheduler.active_ids()]
             else:
-                idle_ue_count += 1
+                rao_ues = ue_list
+
+            current_ms = n * trao
+            current_dt = start_dt + timedelta(milliseconds=current_ms)
+            current_t = ts.from_datetime(current_dt)
+            # --- 衛星移動與可見衛星列表更新 ---
+            if cohorts is not None:
+                # Cohorts carry no UE geometry, so there is no visible count and
+                # the feasibility check below is skipped; groups come from the table.
+                avg_visible = None
+            elif LAZY_VISIBILITY:
+                # Lazy visibility computes geometry after the ACB draw; the visible
+                # count and the feasibility check follow it below.
+                avg_visible = None
+            else:
+                prefetched = geometry_prefetcher.get(n) if geometry_prefetcher is not None else None
+                if arrival_scheduler is not None and selection_mode != 0:
+                    # Event-driven arrivals: only active UEs read their geometry
+                    # this RAO, so idle rows of the shared buffer are left stale.
+                    visibility_ues = rao_ues
+                    visibility_rows = [ue.id for ue in rao_ues]
+                else:
+                    visibility_ues = ue_list
+                    visibility_rows = None
+                visible_count = update_visibility_batch(
+                    visibility_ues,
+                    active_sat_pool,
+                    current_t,
+                    selection_mode,
+                    sat_ecef_km=(
+                        sat_ephemeris.positions_km(current_ms / 1000)
+                        if sat_ephemeris is not None and prefetched is None
+                        else None
+                    ),
+                    group_tracker=ue_group_tracker,
+                    geometry=ue_geometry,
+                    prefetched=prefetched,
+                    culler=sat_culler,
+                    workers=int(GEOMETRY_WORKERS),
+                    executor=chunk_executor,
+                    ue_rows=visibility_rows,
+                )
+                avg_visible = visible_count / len(visibility_ues) if visibility_ues else None
+            if n % 50 == 0 and n>0 and not LAZY_VISIBILITY:
+                if cohorts is not None:
+                    print(f"RAO {n}: Average visible satellites per UE: not computed by the cohort engine (feasibility check skipped)")
+                elif avg_visible is None:
+                    print(f"RAO {n}: Average visible satellites per UE: no active UEs (feasibility check skipped)")
+                else:
+                    print(f"RAO {n}: Average visible satellites per UE: {avg_visible:.2f}")
+            if avg_visible is not None and avg_visible < 1:
+                print("Warning: Too few visible satellites on average. The simulation scenario is not feasible. Ending simulation.")
+                return
+            if selection_mode == 0: #測試模式，不是真的跑模擬
+                eval_metrics = evaluate_visibility_heterogeneity(ue_list)
+                return eval_metrics
+            real_counts = np.zeros(ctrl.Dmax)
+            # UEs skipped by rao_ues are idle.
+            idle_ue_count = NUM_UE - len(rao_ues)
+            if cohorts is not None:
+                real_counts[:cohorts.max_budget] = cohorts.remaining_budget_counts()[:ctrl.Dmax]
+                idle_ue_count = NUM_UE - cohorts.active_count
+            for ue in rao_ues:
+                if ue.active:
+                    # 取得該 UE 剩餘的延遲預算 
+                    nn = ue.budget - ue.delay
+                    if nn > 0:
+                        real_counts[nn-1] += 1
+                else:
+                    idle_ue_count += 1
         
-        ctrl.actualPi = np.concatenate(([idle_ue_count / NUM_UE], real_counts / NUM_UE)) #更新真實pi供測試參考，index 0 為 idle state
-        if n == 0:
-            Lambda = np.zeros(ctrl.sat_num)
-            current_n_hat = ctrl.N_estimate
-        else:
-            Lambda = ctrl.load_estimator(expected_tables) #每個RAO都呼叫一次load estimator，並且傳入預計算好的期望值表
-            current_n_hat = ctrl.N_estimate
-        # Mode 5 smooths the latest available load report before making the
-        # current RAO's load-and-link-aware satellite selection decision.
-        if selection_mode == 5: #original 5 but removing it currently
-            ctrl.update_load_aware_load_indicator(Lambda, LOAD_AWARE_LOAD_EMA_BETA)
-        else:
-            ctrl.last_load_indicator = Lambda.copy()
-        effective_imbalance_epsilon = IMBALANCE_EPSILON
-        if selection_mode == 6:
-            # Mode 6 keeps the proposed convex selection, but tightens epsilon
-            # when the EMA-smoothed normalized load becomes high.
-            effective_imbalance_epsilon = ctrl.adaptive_imbalance_epsilon(
-                total_load=sum(Lambda),
-                total_preambles=ctrl.sat_num * sat_list[0].Z,
-                epsilon_min=ADAPTIVE_EPSILON_MIN,
-                epsilon_max=ADAPTIVE_EPSILON_MAX,
-                alpha=ADAPTIVE_EPSILON_ALPHA,
-                beta=ADAPTIVE_EPSILON_BETA,
+            ctrl.actualPi = np.concatenate(([idle_ue_count / NUM_UE], real_counts / NUM_UE)) #更新真實pi供測試參考，index 0 為 idle state
+            if n == 0:
+                Lambda = np.zeros(ctrl.sat_num)
+                current_n_hat = ctrl.N_estimate
+            else:
+                Lambda = ctrl.load_estimator(expected_tables) #每個RAO都呼叫一次load estimator，並且傳入預計算好的期望值表
+                current_n_hat = ctrl.N_estimate
+            # Mode 5 smooths the latest available load report before making the
+            # current RAO's load-and-link-aware satellite selection decision.
+            if selection_mode == 5: #original 5 but removing it currently
+                ctrl.update_load_aware_load_indicator(Lambda, LOAD_AWARE_LOAD_EMA_BETA)
+            else:
+                ctrl.last_load_indicator = Lambda.copy()
+            effective_imbalance_epsilon = IMBALANCE_EPSILON
+            if selection_mode == 6:
+                # Mode 6 keeps the proposed convex selection, but tightens epsilon
+                # when the EMA-smoothed normalized load becomes high.
+                effective_imbalance_epsilon = ctrl.adaptive_imbalance_epsilon(
+                    total_load=sum(Lambda),
+                    total_preambles=ctrl.sat_num * sat_list[0].Z,
+                    epsilon_min=ADAPTIVE_EPSILON_MIN,
+                    epsilon_max=ADAPTIVE_EPSILON_MAX,
+                    alpha=ADAPTIVE_EPSILON_ALPHA,
+                    beta=ADAPTIVE_EPSILON_BETA,
+                )
+                if n % 50 == 0:
+                    print(f"Adaptive epsilon at RAO {n}: {effective_imbalance_epsilon:.6f}")
+            #Controller-side processing
+            ctrl.set_group_probabilities_for_rao(
+                n,
+                selection_mode=selection_mode,
+                use_convex_solver=(selection_mode in (1, 6)),
+                imbalance_epsilon=effective_imbalance_epsilon,
+                preamble_count=sat_list[0].Z,
             )
-            if n % 50 == 0:
-                print(f"Adaptive epsilon at RAO {n}: {effective_imbalance_epsilon:.6f}")
-        #Controller-side processing
-        ctrl.set_group_probabilities_for_rao(
-            n,
-            selection_mode=selection_mode,
-            use_convex_solver=(selection_mode in (1, 6)),
-            imbalance_epsilon=effective_imbalance_epsilon,
-            preamble_count=sat_list[0].Z,
-        )
-        ctrl.record_selection_policy_variation(n, selection_mode)
-        ss_received_load_fractions = None
-        if COLLECT_COLLISION_DIAGNOSTICS:
-            weights = group_weight_table[n]
-            ps_by_group = group_ps_table[n]
-            ss_received_shares = np.zeros(ctrl.sat_num, dtype=float)
-            for group, weight in weights.items():
-                group_key = tuple(group)
-                ss_received_shares += (
-                    float(weight)
-                    * np.asarray(ctrl.A_by_group[group_key], dtype=float)
-                    * np.asarray(ps_by_group[group_key], dtype=float)
+            ctrl.record_selection_policy_variation(n, selection_mode)
+            ss_received_load_fractions = None
+            if COLLECT_COLLISION_DIAGNOSTICS:
+                group_row = ctrl.dense_group_table.row(n, ctrl.sat_num)
+                ss_received_shares = group_policy.effective_load(
+                    group_row.weights,
+                    ctrl.policy_matrix,
+                    group_row.ps_matrix,
                 )
-            total_ss_received_share = float(np.sum(ss_received_shares))
-            if total_ss_received_share > 0:
-                ss_received_load_fractions = (
-                    ss_received_shares / total_ss_received_share
+                total_ss_received_share = float(np.sum(ss_received_shares))
+                if total_ss_received_share > 0:
+                    ss_received_load_fractions = (
+                        ss_received_shares / total_ss_received_share
+                    )
+            # Compute the precomputed p_s from the group selection policy; optionally replace it with lagged real p_s for control.
+            if selection_mode == 2:
+                precomputed_p_s = 1.0
+            elif selection_mode in (3, 5, 7):
+                # Mode 3 uses the preselection table for uniform random selection
+                # over satellites visible above 10 degrees, matching its UE-side rule.
+                if mode3_visible_random_ps_table is None:
+                    raise ValueError(
+                        "Mode 3/5/7 requires mode3_visible_random_ps_table. "
+                        "Regenerate group_ps_table.npz with satellite_preselection.py."
                 )
-        # Compute the precomputed p_s from the group selection policy; optionally replace it with lagged real p_s for control.
-        if selection_mode == 2:
-            precomputed_p_s = 1.0
-        elif selection_mode in (3, 5, 7):
-            # Mode 3 uses the preselection table for uniform random selection
-            # over satellites visible above 10 degrees, matching its UE-side rule.
-            if mode3_visible_random_ps_table is None:
-                raise ValueError(
-                    "Mode 3/5/7 requires mode3_visible_random_ps_table. "
-                    "Regenerate group_ps_table.npz with satellite_preselection.py."
-            )
-            precomputed_p_s = mode3_visible_random_ps_table[n]
-        else:
-            precomputed_p_s = calculate_ps(ctrl,n,group_weight_table, group_ps_table)
-        p_s = last_real_p_s if (USE_REAL_PS and last_real_p_s is not None) else precomputed_p_s
-        #print(f"Precomputed p_s for RAO {n}: {p_s:.4f}")
-        if n > 0:
-            ctrl.satellite_selection(Lambda=Lambda,MODE=selection_mode, n=n, target_location=geo, t=current_t)
-            ctrl.backoff_control(
-                total_load=sum(Lambda),
-                rho=rho_rao,
-                p_d=ue_list[0].QoS_requirement,
-                p_s=p_s,
-                K=ctrl.sat_num,
-                Z=sat_list[0].Z,
-                backoff_mode=backoff_mode,
-                n=n,
-                collect_optimizer_diagnostics=(
-                    COLLECT_BACKOFF_OPTIMIZER_DIAGNOSTICS
-                ),
-            )
-            p_b_history.append(ctrl.p_b.copy())
-            current_n_hat = ctrl.N_estimate
-        if backoff_mode == 1:
-            n_history.append(current_n_hat)
-        
-        if n % 50 == 0:
-            if backoff_mode == 1:
-                print(f"Current N_tilde: {ctrl.N_estimate}, Total Load (Lambda): {sum(Lambda)}, Backoff rate: {ctrl.p_b}", end='\n')
+                precomputed_p_s = mode3_visible_random_ps_table[n]
             else:
-                print(f"Total Load (Lambda): {sum(Lambda)}, Backoff rate: {ctrl.p_b}", end='\n')
-
-        for ue in ue_list:
-            ue.selected_satellite_id_this_rao = None
-            if ue.active: #只對active的UE計算ACB和決定順序
-                ue.acquire_SIB(ctrl)
-
-        # 中文註解：記錄本輪 UE 執行 RA 前的通道成功/失敗累積值，用來計算本輪真實 p_s。
-        if backoff_mode == 1:
-            channel_success_before = sum(ue.transmission_success for ue in ue_list)
-            channel_fail_before = sum(ue.transmission_fail for ue in ue_list)
-
-        # UE-side processing
-        for ue in ue_list:
-            # 如果通過 ACB，會呼叫 sat.receive_preamble()
-            if ue.active: 
-                ue.ACB_test()
+                precomputed_p_s = calculate_ps(ctrl,n,group_weight_table, group_ps_table)
+            p_s = last_real_p_s if (USE_REAL_PS and last_real_p_s is not None) else precomputed_p_s
+            #print(f"Precomputed p_s for RAO {n}: {p_s:.4f}")
+            if n > 0:
+                ctrl.satellite_selection(Lambda=Lambda,MODE=selection_mode, n=n, target_location=geo, t=current_t)
+                ctrl.backoff_control(
+                    total_load=sum(Lambda),
+                    rho=rho_rao,
+                    p_d=qos_distribution,
+                    p_s=p_s,
+                    K=ctrl.sat_num,
+                    Z=sat_list[0].Z,
+                    backoff_mode=backoff_mode,
+                    n=n,
+                    collect_optimizer_diagnostics=(
+                        COLLECT_BACKOFF_OPTIMIZER_DIAGNOSTICS
+                    ),
+                )
+                p_b_history.append(ctrl.p_b.copy())
+                current_n_hat = ctrl.N_estimate
+            if backoff_mode == 1:
+                n_history.append(current_n_hat)
+        
+            if n % 50 == 0:
+                if backoff_mode == 1:
+                    print(f"Current N_tilde: {ctrl.N_estimate}, Total Load (Lambda): {sum(Lambda)}, Backoff rate: {ctrl.p_b}", end='\n')
+                else:
+                    print(f"Total Load (Lambda): {sum(Lambda)}, Backoff rate: {ctrl.p_b}", end='\n')
 
-        selected_satellite_ids = [
-            ue.selected_satellite_id_this_rao
-            for ue in ue_list
-            if ue.selected_satellite_id_this_rao is not None
-        ]
-        selection_counts = np.bincount(
-            selected_satellite_ids,
-            minlength=ctrl.sat_num,
-        ).astype(int)
-        total_selections = int(np.sum(selection_counts))
-        if total_selections > 0:
-            most_selected_satellite = int(np.argmax(selection_counts))
-            highest_satellite_share = float(
-                selection_counts[most_selected_satellite] / total_selections
-            )
-        else:
-            most_selected_satellite = None
-            highest_satellite_share = np.nan
-        ue_satellite_selection_history.append({
-            "time_slot": n,
-            "selection_counts": selection_counts,
-            "total_selections": total_selections,
-            "most_selected_satellite": most_selected_satellite,
-            "highest_satellite_share": highest_satellite_share,
-        })
+            for ue in rao_ues:
+                ue.selected_satellite_id_this_rao = None
+                if ue.active and not LAZY_VISIBILITY: #只對active的UE計算ACB和決定順序
+                    ue.acquire_SIB(ctrl)
 
-        # 中文註解：真實 p_s 定義為本輪實際嘗試 RA 的 UE 中，通道判定成功的比例；若本輪無嘗試則不計算。
-        if backoff_mode == 1:
-            channel_success_after = sum(ue.transmission_success for ue in ue_list)
-            channel_fail_after = sum(ue.transmission_fail for ue in ue_list)
-            slot_channel_success = channel_success_after - channel_success_before
-            slot_channel_fail = channel_fail_after - channel_fail_before
-            slot_channel_attempts = slot_channel_success + slot_channel_fail
-            if slot_channel_attempts > 0:
-                real_p_s = slot_channel_success / slot_channel_attempts
-                last_real_p_s = real_p_s
-                ps_history.append({
-                    "time_slot": n,
-                    "real": real_p_s,
-                    "precomputed": precomputed_p_s,
-                    "control": p_s,
-                    "error": real_p_s - precomputed_p_s,
-                })
-                if n % 50 == 0:
-                    print(
-                        f"RAO {n}: Real p_s={real_p_s:.4f}, "
-                        f"Precomputed p_s={precomputed_p_s:.4f}, "
-                        f"Control p_s={p_s:.4f}, "
-                        f"Diff={real_p_s - precomputed_p_s:+.4f}"
-                    )
-        #else:
-            #print(f"RAO {n}: Real p_s=N/A (no RA attempts), Precomputed p_s={p_s:.4f}")
-            
-        # [新增] 進度條與監控資訊 (每 50 slots 印一次)
-        if n % 50 == 0:
-            # 計算當前統計數據
-            active_count = sum(u.active for u in ue_list)
-            # 計算平均可視衛星數
-            avg_vis_sats = np.mean([len(u.visible_satellites) for u in ue_list])
-            # 使用 \r 讓同一行刷新，不會洗版
-            print(f"Slot {n}/{RAO_COUNTS} | Active: {active_count:3d} | AvgVisSat: {avg_vis_sats:.1f}", end='\r')
-        # --- 衛星端處理 (碰撞檢測) ---
-        total_success_ids_in_this_slot = []
-        success_states_in_this_slot = []
-        for sat in sat_list:
-            # 回傳該衛星成功接收的 UE ID 列表
-            successes = sat.check_RA_success()
-            for ue_id, remaining_budget in successes:
-                total_success_ids_in_this_slot.append(ue_id)
-                success_states_in_this_slot.append(remaining_budget)
-
-        if COLLECT_COLLISION_DIAGNOSTICS:
-            received_load_by_satellite = np.array(
-                [sat.actual_lambda for sat in active_sat_pool],
-                dtype=float,
-            )
-            successful_preambles_by_satellite = np.array(
-                [sat.N_s for sat in active_sat_pool],
-                dtype=float,
-            )
-            total_received_load = float(np.sum(received_load_by_satellite))
-            collision_transmissions = float(np.sum(
-                received_load_by_satellite - successful_preambles_by_satellite
-            ))
-            real_collision_rate = (
-                collision_transmissions / total_received_load
-                if total_received_load > 0
-                else np.nan
-            )
-            if (
-                total_received_load > 0
-                and ss_received_load_fractions is not None
-            ):
-                predicted_load_by_satellite = (
-                    total_received_load * ss_received_load_fractions
+            # 中文註解：記錄本輪 UE 執行 RA 前的通道成功/失敗累積值，用來計算本輪真實 p_s。
+            if backoff_mode == 1:
+                if cohorts is not None:
+                    channel_success_before = cohorts.transmission_success
+                    channel_fail_before = cohorts.transmission_fail
+                else:
+                    channel_success_before = sum(ue.transmission_success for ue in rao_ues)
+                    channel_fail_before = sum(ue.transmission_fail for ue in rao_ues)
+
+            # ACB_test and batched_backoff drop packets whose budget ran out.
+            acb_drops = 0
+
+            # UE-side processing
+            if cohorts is not None:
+                selection_counts = cohorts.attempt(
+                    ctrl.p_b,
+                    cohort_engine.outcome_probabilities(
+                        selection_mode,
+                        ctrl.group_row,
+                        ctrl.policy_matrix,
+                        ctrl.sat_num,
+                    ),
                 )
-                predicted_collision_by_satellite = 1.0 - np.exp(
-                    -predicted_load_by_satellite / sat_list[0].Z
+            else:
+                if LAZY_VISIBILITY:
+                    # Backoff first; geometry, groups and SIB only for UEs that transmit.
+                    transmitting, acb_drops = batched_backoff([ue for ue in rao_ues if ue.active], ctrl)
+                    if transmitting:
+                        visible_count = update_visibility_batch(
+                            transmitting,
+                            active_sat_pool,
+                            current_t,
+                            selection_mode,
+                            sat_ecef_km=(
+                                sat_ephemeris.positions_km(current_ms / 1000)
+                                if sat_ephemeris is not None
+                                else None
+                            ),
+                            geometry=ue_geometry,
+                            culler=sat_culler,
+                            workers=int(GEOMETRY_WORKERS),
+                            executor=chunk_executor,
+                            ue_rows=[ue.id for ue in transmitting],
+                        )
+                        avg_visible = visible_count / len(transmitting)
+                        if n % 50 == 0 and n > 0:
+                            print(f"RAO {n}: Average visible satellites per transmitting UE: {avg_visible:.2f}")
+                        if avg_visible < 1:
+                            print("Warning: Too few visible satellites on average. The simulation scenario is not feasible. Ending simulation.")
+                            return
+                        for ue in transmitting:
+                            ue.acquire_SIB(ctrl)
+                    batched_select(transmitting, ctrl, selection_mode)
+                elif BATCHED_SELECTION and selection_mode in BATCHED_SELECTION_MODES:
+                    acb_drops = batched_ACB_test([ue for ue in rao_ues if ue.active], ctrl, selection_mode)
+                else:
+                    for ue in rao_ues:
+                        # 如果通過 ACB，會呼叫 sat.receive_preamble()
+                        if ue.active and ue.ACB_test():
+                            acb_drops += 1
+
+                selected_satellite_ids = [
+                    ue.selected_satellite_id_this_rao
+                    for ue in rao_ues
+                    if ue.selected_satellite_id_this_rao is not None
+                ]
+                selection_counts = np.bincount(
+                    selected_satellite_ids,
+                    minlength=ctrl.sat_num,
+                ).astype(int)
+            total_selections = int(np.sum(selection_counts))
+            if total_selections > 0:
+                most_selected_satellite = int(np.argmax(selection_counts))
+                highest_satellite_share = float(
+                    selection_counts[most_selected_satellite] / total_selections
                 )
-                ss_predicted_collision_rate = float(np.sum(
-                    ss_received_load_fractions
-                    * predicted_collision_by_satellite
-                ))
             else:
-                predicted_load_by_satellite = np.full(ctrl.sat_num, np.nan)
-                ss_predicted_collision_rate = np.nan
-            collision_history.append({
+                most_selected_satellite = None
+                highest_satellite_share = np.nan
+            ue_satellite_selection_history.append({
                 "time_slot": n,
-                "received_load_by_satellite": received_load_by_satellite,
-                "successful_preambles_by_satellite": successful_preambles_by_satellite,
-                "total_received_load": total_received_load,
-                "collision_transmissions": collision_transmissions,
-                "real_collision_rate": real_collision_rate,
-                "ss_received_load_fractions": (
-                    ss_received_load_fractions.copy()
-                    if ss_received_load_fractions is not None
-                    else np.full(ctrl.sat_num, np.nan)
-                ),
-                "ss_predicted_load_by_satellite": predicted_load_by_satellite,
-                "ss_predicted_collision_rate": ss_predicted_collision_rate,
-                "normalized_effective_load": (
-                    total_received_load / (ctrl.sat_num * sat_list[0].Z)
-                ),
+                "selection_counts": selection_counts,
+                "total_selections": total_selections,
+                "most_selected_satellite": most_selected_satellite,
+                "highest_satellite_share": highest_satellite_share,
             })
 
-        # 記錄本時間點的總吞吐量
-        throughput_history.append(len(total_success_ids_in_this_slot))
+            # 中文註解：真實 p_s 定義為本輪實際嘗試 RA 的 UE 中，通道判定成功的比例；若本輪無嘗試則不計算。
+            if backoff_mode == 1:
+                if cohorts is not None:
+                    channel_success_after = cohorts.transmission_success
+                    channel_fail_after = cohorts.transmission_fail
+                else:
+                    channel_success_after = sum(ue.transmission_success for ue in rao_ues)
+                    channel_fail_after = sum(ue.transmission_fail for ue in rao_ues)
+                slot_channel_success = channel_success_after - channel_success_before
+                slot_channel_fail = channel_fail_after - channel_fail_before
+                slot_channel_attempts = slot_channel_success + slot_channel_fail
+                if slot_channel_attempts > 0:
+                    real_p_s = slot_channel_success / slot_channel_attempts
+                    last_real_p_s = real_p_s
+                    ps_history.append({
+                        "time_slot": n,
+                        "real": real_p_s,
+                        "precomputed": precomputed_p_s,
+                        "control": p_s,
+                        "error": real_p_s - precomputed_p_s,
+                    })
+                    if n % 50 == 0:
+                        print(
+                            f"RAO {n}: Real p_s={real_p_s:.4f}, "
+                            f"Precomputed p_s={precomputed_p_s:.4f}, "
+                            f"Control p_s={p_s:.4f}, "
+                            f"Diff={real_p_s - precomputed_p_s:+.4f}"
+                        )
+            #else:
+                #print(f"RAO {n}: Real p_s=N/A (no RA attempts), Precomputed p_s={p_s:.4f}")
+            
+            # [新增] 進度條與監控資訊 (每 50 slots 印一次)
+            if n % 50 == 0:
+                # 計算當前統計數據
+                active_count = (
+                    cohorts.active_count
+                    if cohorts is not None
+                    else sum(u.active for u in rao_ues)
+                )
+                # 計算平均可視衛星數
+                avg_vis_sats = f"{avg_visible:.1f}" if avg_visible is not None else "N/A"
+                # 使用 \r 讓同一行刷新，不會洗版
+                print(f"Slot {n}/{RAO_COUNTS} | Active: {active_count:3d} | AvgVisSat: {avg_vis_sats}", end='\r')
+            # --- 衛星端處理 (碰撞檢測) ---
+            total_success_ids_in_this_slot = []
+            success_states_in_this_slot = []
+            if cohorts is not None:
+                success_states_in_this_slot = cohorts.resolve(active_sat_pool)
+                total_success_ids_in_this_slot = success_states_in_this_slot
+            else:
+                for sat in sat_list:
+                    # 回傳該衛星成功接收的 UE ID 列表
+                    successes = sat.check_RA_success()
+                    for ue_id, remaining_budget in successes:
+                        total_success_ids_in_this_slot.append(ue_id)
+                        success_states_in_this_slot.append(remaining_budget)
+
+            if COLLECT_COLLISION_DIAGNOSTICS:
+                received_load_by_satellite = np.array(
+                    [sat.actual_lambda for sat in active_sat_pool],
+                    dtype=float,
+                )
+                successful_preambles_by_satellite = np.array(
+                    [sat.N_s for sat in active_sat_pool],
+                    dtype=float,
+                )
+                total_received_load = float(np.sum(received_load_by_satellite))
+                collision_transmissions = float(np.sum(
+                    received_load_by_satellite - successful_preambles_by_satellite
+                ))
+                real_collision_rate = (
+                    collision_transmissions / total_received_load
+                    if total_received_load > 0
+                    else np.nan
+                )
+                if (
+                    total_received_load > 0
+                    and ss_received_load_fractions is not None
+                ):
+                    predicted_load_by_satellite = (
+                        total_received_load * ss_received_load_fractions
+                    )
+                    predicted_collision_by_satellite = 1.0 - np.exp(
+                        -predicted_load_by_satellite / sat_list[0].Z
+                    )
+                    ss_predicted_collision_rate = float(np.sum(
+                        ss_received_load_fractions
+                        * predicted_collision_by_satellite
+                    ))
+                else:
+                    predicted_load_by_satellite = np.full(ctrl.sat_num, np.nan)
+                    ss_predicted_collision_rate = np.nan
+                collision_history.append({
+                    "time_slot": n,
+                    "received_load_by_satellite": received_load_by_satellite,
+                    "successful_preambles_by_satellite": successful_preambles_by_satellite,
+                    "total_received_load": total_received_load,
+                    "collision_transmissions": collision_transmissions,
+                    "real_collision_rate": real_collision_rate,
+                    "ss_received_load_fractions": (
+                        ss_received_load_fractions.copy()
+                        if ss_received_load_fractions is not None
+                        else np.full(ctrl.sat_num, np.nan)
+                    ),
+                    "ss_predicted_load_by_satellite": predicted_load_by_satellite,
+                    "ss_predicted_collision_rate": ss_predicted_collision_rate,
+                    "normalized_effective_load": (
+                        total_received_load / (ctrl.sat_num * sat_list[0].Z)
+                    ),
+                })
 
-        # --- 回傳結果給 UE (更新狀態) ---
-        for ue in ue_list:
-            if ue.active: #只有active的UE才會收到反饋，並且可能改變狀態
-                ue.receive_feedback(total_success_ids_in_this_slot)
-        ctrl.update_success_state_ratio(success_states_in_this_slot)
+            # 記錄本時間點的總吞吐量
+            throughput_history.append(len(total_success_ids_in_this_slot))
+
+            # --- 回傳結果給 UE (更新狀態) ---
+            success_id_set = set(total_success_ids_in_this_slot)
+            for ue in rao_ues:
+                if ue.active: #只有active的UE才會收到反饋，並且可能改變狀態
+                    ue.receive_feedback(success_id_set)
+            if arrival_scheduler is not None:
+                for ue in rao_ues:
+                    if not ue.active:
+                        arrival_scheduler.deactivate(ue.id, n)
+            ctrl.update_success_state_ratio(success_states_in_this_slot)
+            if STEADY_STATE:
+                if cohorts is not None:
+                    rao_loss = cohorts.loss - cumulative_loss
+                    # success_delay_counts[budget - 1, delay_raos - 1]
+                    rao_delay_sum = float(np.sum(
+                        cohorts.success_delay_counts * np.arange(1, cohorts.max_budget + 1)
+                    )) - cumulative_delay_sum
+                else:
+                    rao_loss = deadline_drops + acb_drops
+                    rao_delay_sum = float(sum(ue_list[ue_id].success_delay_raos[-1] for ue_id in success_id_set))
+                cumulative_loss += rao_loss
+                cumulative_delay_sum += rao_delay_sum
+                loss_history.append(rao_loss)
+                success_delay_sum_history.append(rao_delay_sum)
+                if STEADY_STATE_EARLY_EXIT is not None and (n + 1) % 50 == 0 and n + 1 < RAO_COUNTS:
+                    if steady_state.converged(steady_state_estimate(), STEADY_STATE_EARLY_EXIT):
+                        completed_raos = n + 1
+                        print(f"Steady-state intervals converged; stopping after {completed_raos} of {RAO_COUNTS} RAOs.")
+                        break
+    finally:
+        if geometry_prefetcher is not None:
+            geometry_prefetcher.close()
+        if chunk_executor is not None:
+            chunk_executor.shutdown()
     # 統計結果
     total_success_packets = sum(throughput_history)
-    total_lost_packets = sum(ue.loss for ue in ue_list)
-    success_delay_raos = [
-        delay_raos
-        for ue in ue_list
-        for delay_raos in ue.success_delay_raos
-    ]
-    success_deadline_budget_utilizations = [
-        utilization
-        for ue in ue_list
-        for utilization in ue.success_deadline_budget_utilizations
-    ]
-    avg_delay_ms = np.mean(success_delay_raos) * trao if len(success_delay_raos) > 0 else np.nan
-    avg_deadline_budget_utilization = (
-        np.mean(success_deadline_budget_utilizations)
-        if len(success_deadline_budget_utilizations) > 0
-        else np.nan
-    )
-    channel_failure_rates = sum(ue.transmission_fail for ue in ue_list) / (sum(ue.transmission_success for ue in ue_list) + sum(ue.transmission_fail for ue in ue_list))
-    policy_fallback_count = sum(ue.acb_policy_fallback_count for ue in ue_list)
-    acb_selection_count = sum(ue.acb_selection_count for ue in ue_list)
+    if cohorts is not None:
+        total_lost_packets = cohorts.loss
+        average_delay_raos, avg_deadline_budget_utilization = cohorts.success_delay_stats()
+        avg_delay_ms = average_delay_raos * trao
+        total_transmission_success = cohorts.transmission_success
+        total_transmission_fail = cohorts.transmission_fail
+        policy_fallback_count = cohorts.acb_policy_fallback_count
+        acb_selection_count = cohorts.acb_selection_count
+    else:
+        total_lost_packets = sum(ue.loss for ue in ue_list)
+        success_delay_raos = [
+            delay_raos
+            for ue in ue_list
+            for delay_raos in ue.success_delay_raos
+        ]
+        success_deadline_budget_utilizations = [
+            utilization
+            for ue in ue_list
+            for utilization in ue.success_deadline_budget_utilizations
+        ]
+        average_delay_raos = np.mean(success_delay_raos) if len(success_delay_raos) > 0 else np.nan
+        avg_delay_ms = np.mean(success_delay_raos) * trao if len(success_delay_raos) > 0 else np.nan
+        avg_deadline_budget_utilization = (
+            np.mean(success_deadline_budget_utilizations)
+            if len(success_deadline_budget_utilizations) > 0
+            else np.nan
+        )
+        total_transmission_success = sum(ue.transmission_success for ue in ue_list)
+        total_transmission_fail = sum(ue.transmission_fail for ue in ue_list)
+        policy_fallback_count = sum(ue.acb_policy_fallback_count for ue in ue_list)
+        acb_selection_count = sum(ue.acb_selection_count for ue in ue_list)
+    channel_failure_rates = total_transmission_fail / (total_transmission_success + total_transmission_fail)
     policy_fallback_rate = policy_fallback_count / acb_selection_count if acb_selection_count > 0 else 0.0
     policy_variation_values = np.array(
         [item["weighted_tv"] for item in ctrl.selection_policy_variation_history],
@@ -1550,8 +2461,25 @@ def main(
     finite_policy_variation = policy_variation_values[np.isfinite(policy_variation_values)]
     selection_policy_variation_mean = float(np.mean(finite_policy_variation)) if len(finite_policy_variation) > 0 else np.nan
     selection_policy_variation_max = float(np.max(finite_policy_variation)) if len(finite_policy_variation) > 0 else np.nan
-    avg_throughput = total_success_packets / (RAO_COUNTS * trao / 1000)  # packets per second
+    avg_throughput = total_success_packets / (completed_raos * trao / 1000)  # packets per second
     plr = 1 - total_success_packets/(total_success_packets+total_lost_packets)
+    steady_state_result = None
+    if STEADY_STATE:
+        # Batch means go to run_history["steady_state"] only; the returned
+        # throughput, PLR and delay stay whole-run averages.
+        steady_state_result = steady_state_estimate()
+        if steady_state_result is None:
+            print("Steady-state estimation: too few RAOs after the warm-up; no estimate.")
+        else:
+            steady_state_result["completed_raos"] = completed_raos
+            print(
+                f"Steady state after {steady_state_result['warmup_raos']} warm-up RAOs "
+                f"({steady_state_result['batch_count']} batches, {steady_state_result['confidence'] * 100:g}% CI): "
+                f"throughput={steady_state_result['throughput']:.2f}±{steady_state_result['throughput_halfwidth']:.2f}, "
+                f"PLR={steady_state_result['plr']:.4f}±{steady_state_result['plr_halfwidth']:.4f}, "
+                f"delay={steady_state_result['average_delay_ms']:.2f}"
+                f"±{steady_state_result['average_delay_ms_halfwidth']:.2f} ms"
+            )
     print(f"----------Simulation Complete.----------")
     print(f"Total Successful Accesses: {total_success_packets}")
     print(f"Total Dropped Packets: {total_lost_packets}")
@@ -1578,7 +2506,7 @@ def main(
         "plr": plr,
         "AverageDelay": avg_delay_ms,
         "average_delay_ms": avg_delay_ms,
-        "average_delay_raos": np.mean(success_delay_raos) if len(success_delay_raos) > 0 else np.nan,
+        "average_delay_raos": average_delay_raos,
         "average_deadline_budget_utilization": avg_deadline_budget_utilization,
         "reward": np.mean(ctrl.history_reward),
         "ps_history": ps_history,
@@ -1594,9 +2522,17 @@ def main(
         "backoff_optimizer_history": ctrl.backoff_optimizer_history,
         "ue_spatial_distribution": UE_SPATIAL_DISTRIBUTION,
         "ue_spatial_beta_b": float(UE_SPATIAL_BETA_B),
+        "steady_state": steady_state_result,
+        "group_change_history": (
+            ue_group_tracker.change_history
+            if ue_group_tracker is not None
+            else []
+        ),
     }
     if COLLECT_COLLISION_DIAGNOSTICS:
         run_history["collision_history"] = collision_history
+    if geometry_precision is not None:
+        run_history["geometry_precision"] = geometry_precision
     reported_pi = ctrl.observe_pi if backoff_mode == 1 else np.array([])
     return avg_throughput, plr, n_history, ctrl.actual, reported_pi, ctrl.history_reward, run_history
 
@@ -7,6 +7,7 @@ from pathlib import Path
 import numpy as np
 from skyfield.api import load, wgs84
 
+from ephemeris_store import ConstellationEphemerisStore
 from main import channel_visibility
 from satellite_preselection import generate_uniform_locations
 from satellite_preselection_top3 import (
@@ -159,6 +160,7 @@ def build_active_pool(
     selected_ids,
     scenario_metadata,
     seconds,
+    ephemeris_store=None,
 ):
     candidate_satellites = [
         satellite
@@ -170,6 +172,13 @@ def build_active_pool(
     midpoint_time = timescale.from_datetime(midpoint)
     service_center = wgs84.latlon(CENTER[0], CENTER[1])
 
+    if ephemeris_store is not None:
+        elevations = ephemeris_store.elevation_deg(service_center, midpoint, candidate_satellites)
+        return [
+            satellite
+            for satellite, elevation in zip(candidate_satellites, elevations)
+            if elevation > MIN_ELEVATION_DEG
+        ]
     active_satellites = []
     for satellite in candidate_satellites:
         visible, elevation_angle, _ = channel_visibility(
@@ -340,17 +349,26 @@ def main():
     if plane_3_member_ids.intersection(plane_4_member_ids):
         raise ValueError("The selected third and fourth orbital planes overlap.")
 
+    # Both nested pools query one whole-constellation propagation.
+    ephemeris_store = ConstellationEphemerisStore.open_or_build(
+        all_satellites,
+        scenario_metadata["tle_file_sha256"],
+        scenario_metadata["start_dt"],
+        template["seconds"],
+    )
     nested_3_satellites = build_active_pool(
         all_satellites,
         set(base_ids).union(plane_3_member_ids),
         scenario_metadata,
         template["seconds"],
+        ephemeris_store=ephemeris_store,
     )
     nested_4_satellites = build_active_pool(
         all_satellites,
         set(base_ids).union(plane_3_member_ids, plane_4_member_ids),
         scenario_metadata,
         template["seconds"],
+        ephemeris_store=ephemeris_store,
     )
     nested_3_ids = {
         int(satellite.model.satnum) for satellite in nested_3_satellites
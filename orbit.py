@@ -3,10 +3,12 @@ from skyfield.api import load, wgs84
 from scenario_time import TLE_FILENAME, TLE_URL, get_tle_scenario_metadata, load_starlink_tles
 
 # 增加 top_n 參數，預設為 4
-def get_relevant_rail_planes(start_time, location_latlon, tle_url=None, top_n=4):
+def get_relevant_rail_planes(start_time, location_latlon, tle_url=None, top_n=4, ephemeris_store=None):
     """
     Finds orbital planes passing over a specific location.
     Simple Logic: If local TLE file exists, use it. If not, download it.
+    With an ephemeris_store.ConstellationEphemerisStore the seed elevations
+    come from the stored positions instead of per-satellite propagation.
     """
     
     # 1. 指定固定的檔名
@@ -50,14 +52,23 @@ def get_relevant_rail_planes(start_time, location_latlon, tle_url=None, top_n=4)
     #print(f"[Step 2] Searching for visible planes at {start_time.utc_strftime('%Y-%m-%d %H:%M:%S')}...")
     
     visible_planes_fingerprint = set() 
+    store_elevations = (
+        ephemeris_store.elevation_deg(location_latlon, start_time, starlinks)
+        if ephemeris_store is not None
+        else None
+    )
 
-    for sat in starlinks:
+    for index, sat in enumerate(starlinks):
         try:
             # Calculate Elevation
-            difference = sat - location_latlon
-            alt, _, _ = difference.at(start_time).altaz()
+            if store_elevations is not None:
+                alt_degrees = store_elevations[index]
+            else:
+                difference = sat - location_latlon
+                alt, _, _ = difference.at(start_time).altaz()
+                alt_degrees = alt.degrees
             
-            if alt.degrees > 10: 
+            if alt_degrees > 10: 
                 inc = sat.model.inclo
                 raan = sat.model.nodeo
                 visible_planes_fingerprint.add((inc, raan, sat.name))
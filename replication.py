@@ -0,0 +1,130 @@
+"""
+Sequential stopping for seed replications.
+
+A point (mode, arrival rate, ...) is rerun with seeds base_seed,
+base_seed + 1, ... until the Student-t confidence interval of every
+tracked metric is narrower than its target, or max_seeds is reached.
+The target half-width of a metric is the larger of relative_halfwidth
+times |mean| and its absolute floor, so points whose PLR sits near zero
+can still stop.
+"""
+import numpy as np
+from scipy.stats import t as student_t
+
+import main
+import result_cache
+from steady_state import DEFAULT_ABSOLUTE_HALFWIDTH
+
+
+DEFAULT_METRICS = ("plr", "throughput", "average_delay_ms")
+
+
+def confidence_halfwidth(values, confidence=0.95):
+    """Student-t half-width of the mean of `values` (inf for fewer than two)."""
+    values = np.asarray(values, dtype=float)
+    if len(values) < 2:
+        return np.inf
+    scale = np.std(values, ddof=1) / np.sqrt(len(values))
+    return float(student_t.ppf(0.5 + confidence / 2.0, len(values) - 1) * scale)
+
+
+def main_metrics(result):
+    """Tracked metrics of one main.main result."""
+    run_history = result[6]
+    return {
+        "plr": float(result[1]),
+        "throughput": float(result[0]),
+        "average_delay_ms": float(run_history.get("average_delay_ms", np.nan)),
+    }
+
+
+def replicate(
+    run_seed,
+    metrics=DEFAULT_METRICS,
+    relative_halfwidth=0.05,
+    absolute_halfwidth=None,
+    confidence=0.95,
+    min_seeds=3,
+    max_seeds=30,
+    base_seed=42,
+):
+    """
+    Call run_seed(seed) -> {metric: value} until every metric converges.
+
+    Returns a report with the seeds used, per-seed values, means,
+    half-widths, targets and whether the targets were met.
+    """
+    if min_seeds < 2 or max_seeds < min_seeds:
+        raise ValueError("Need 2 <= min_seeds <= max_seeds.")
+    floors = dict(DEFAULT_ABSOLUTE_HALFWIDTH)
+    floors.update(absolute_halfwidth or {})
+    seeds = []
+    values = {metric: [] for metric in metrics}
+    while True:
+        seed = base_seed + len(seeds)
+        outcome = run_seed(seed)
+        seeds.append(seed)
+        for metric in metrics:
+            values[metric].append(float(outcome[metric]))
+        means = {metric: float(np.mean(values[metric])) for metric in metrics}
+        halfwidths = {metric: confidence_halfwidth(values[metric], confidence) for metric in metrics}
+        targets = {
+            metric: max(relative_halfwidth * abs(means[metric]), floors.get(metric, 0.0))
+            for metric in metrics
+        }
+        converged = all(halfwidths[metric] <= targets[metric] for metric in metrics)
+        if len(seeds) >= min_seeds and (converged or len(seeds) >= max_seeds):
+            break
+    return {
+        "seeds": seeds,
+        "values": values,
+        "mean": means,
+        "halfwidth": halfwidths,
+        "target_halfwidth": targets,
+        "confidence": confidence,
+        "converged": converged,
+    }
+
+
+def replicate_main_point(
+    rho,
+    seconds,
+    num_ue,
+    mode,
+    imbalance_epsilon,
+    cache=None,
+    runner=main.run_with_shared_scenario,
+    replication_kwargs=None,
+    **main_kwargs,
+):
+    """
+    replicate() over main.main seeds for one (mode, rho) point. Runs go
+    through `cache` (a result_cache.ResultCache) when given, so repeated
+    calls only simulate seeds not seen before.
+    """
+    def run_seed(seed):
+        args = (rho, seconds, num_ue, mode, seed, imbalance_epsilon)
+        if cache is None:
+            return main_metrics(runner(*args, **main_kwargs))
+        return main_metrics(cache.run(*args, runner=runner, **main_kwargs))
+
+    report = replicate(run_seed, **(replication_kwargs or {}))
+    print(format_report(f"mode={mode}, arrival rate={rho:g}", report))
+    return report
+
+
+def format_report(label, report):
+    parts = [
+        f"{metric}={report['mean'][metric]:.4f}±{report['halfwidth'][metric]:.4f}"
+        f" (target ±{report['target_halfwidth'][metric]:.4f})"
+        for metric in report["mean"]
+    ]
+    status = "converged" if report["converged"] else "max seeds reached"
+    return (
+        f"{label}: {len(report['seeds'])} seeds, {status}, "
+        f"{report['confidence'] * 100:g}% CI " + ", ".join(parts)
+    )
+
+
+if __name__ == "__main__":
+    replicate_main_point(1.5, 3, 10000, [6, 1], 0.001, cache=result_cache.ResultCache())
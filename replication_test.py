@@ -0,0 +1,43 @@
+import numpy as np
+
+from replication import confidence_halfwidth, replicate
+
+
+def noisy_point(plr_std, throughput_std):
+    def run_seed(seed):
+        rng = np.random.RandomState(seed)
+        return {
+            "plr": 0.1 + plr_std * rng.normal(),
+            "throughput": 1000.0 + throughput_std * rng.normal(),
+            "average_delay_ms": 200.0,
+        }
+    return run_seed
+
+
+def test_noisy_points_get_more_seeds_than_quiet_ones():
+    quiet = replicate(noisy_point(1e-4, 0.1))
+    noisy = replicate(noisy_point(0.01, 20.0), max_seeds=200)
+    assert quiet["converged"] and len(quiet["seeds"]) == 3
+    assert noisy["converged"] and len(noisy["seeds"]) > 10
+    assert all(noisy["halfwidth"][metric] <= noisy["target_halfwidth"][metric] for metric in noisy["mean"])
+    assert noisy["seeds"][:3] == [42, 43, 44]
+
+
+def test_max_seeds_bounds_the_work_and_is_reported():
+    report = replicate(noisy_point(0.05, 100.0), max_seeds=5)
+    assert len(report["seeds"]) == 5
+    assert not report["converged"]
+
+
+def test_halfwidth_matches_student_t():
+    values = [1.0, 2.0, 3.0, 4.0]
+    # t_{0.975, 3} = 3.182446
+    assert abs(confidence_halfwidth(values) - 3.182446 * np.std(values, ddof=1) / 2.0) < 1e-5
+    assert confidence_halfwidth([1.0]) == np.inf
+
+
+if __name__ == "__main__":
+    test_noisy_points_get_more_seeds_than_quiet_ones()
+    test_max_seeds_bounds_the_work_and_is_reported()
+    test_halfwidth_matches_student_t()
+    print("replication_test passed")
@@ -0,0 +1,168 @@
+"""
+Content-addressed cache of main.main results.
+
+The key is the SHA-256 of every main.main argument (defaults filled in,
+so positional and keyword calls agree), the SHA-256 of the TLE, satellite
+pool and group table files, and a code version hashed from the simulator
+sources. The value is the returned 7-tuple, run_history included, pickled
+and zlib-compressed in one file per key. Runs with SEED=None are not
+reproducible: result_key rejects them and ResultCache.run does not cache them.
+"""
+import hashlib
+import inspect
+import json
+import os
+import pickle
+import tempfile
+import zlib
+from pathlib import Path
+
+import numpy as np
+
+import main
+from scenario_time import TLE_FILENAME
+
+
+DEFAULT_CACHE_DIR = "result_cache"
+# Modules whose source can change a main.main result.
+SIMULATOR_MODULES = (
+    "main.py",
+    "Load_estimator.py",
+    "N_estimate.py",
+    "backoff_control.py",
+    "cohort_engine.py",
+    "crn.py",
+    "ephemeris.py",
+    "event_scheduler.py",
+    "geometry_kernel.py",
+    "geometry_prefetch.py",
+    "group_policy.py",
+    "group_tracker.py",
+    "kernels.py",
+    "orbit.py",
+    "satellite_culling.py",
+    "scenario_time.py",
+    "selection.py",
+    "steady_state.py",
+    "visibility_bits.py",
+)
+# Arguments that only say where inputs come from; the file hashes cover them.
+UNHASHED_ARGUMENTS = ("SCENARIO",)
+
+_file_digests = {}
+
+
+def file_digest(filename):
+    """SHA-256 of a file, memoized per (path, size, mtime)."""
+    stat = os.stat(filename)
+    memo_key = (str(Path(filename).resolve()), stat.st_size, stat.st_mtime_ns)
+    digest = _file_digests.get(memo_key)
+    if digest is None:
+        sha = hashlib.sha256()
+        with open(filename, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                sha.update(chunk)
+        digest = sha.hexdigest()
+        _file_digests[memo_key] = digest
+    return digest
+
+
+def simulator_code_version():
+    sha = hashlib.sha256()
+    source_dir = Path(main.__file__).resolve().parent
+    for name in SIMULATOR_MODULES:
+        sha.update(name.encode("utf-8"))
+        sha.update(file_digest(source_dir / name).encode("ascii"))
+    return sha.hexdigest()
+
+
+def _jsonable(value):
+    if isinstance(value, np.ndarray):
+        return {"ndarray": value.dtype.str, "shape": list(value.shape), "values": value.tolist()}
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, Path):
+        return str(value)
+    raise TypeError(f"Cannot hash main.main argument of type {type(value).__name__}.")
+
+
+def main_arguments(args, kwargs):
+    """Every main.main parameter by name, with defaults applied."""
+    bound = inspect.signature(main.main).bind(*args, **kwargs)
+    bound.apply_defaults()
+    return dict(bound.arguments)
+
+
+def result_key(args, kwargs):
+    arguments = main_arguments(args, kwargs)
+    if arguments["SEED"] is None:
+        raise ValueError("main.main runs with SEED=None are not reproducible and have no result key.")
+    for name in UNHASHED_ARGUMENTS:
+        arguments.pop(name, None)
+    payload = {
+        "arguments": json.dumps(arguments, sort_keys=True, default=_jsonable),
+        "inputs": {
+            "tle": file_digest(TLE_FILENAME),
+            "satellite_pool": file_digest(arguments["SATELLITE_POOL_FILENAME"]),
+            "group_table": file_digest(arguments["GROUP_TABLE_FILENAME"]),
+        },
+        "code_version": simulator_code_version(),
+    }
+    encoded = json.dumps(payload, sort_keys=True)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR):
+        self.cache_dir = Path(cache_dir)
+        self.hits = 0
+        self.misses = 0
+
+    def path(self, key):
+        return self.cache_dir / key[:2] / f"{key}.pkl.z"
+
+    def get(self, key):
+        """The stored result for key, or None."""
+        try:
+            with self.path(key).open("rb") as f:
+                return pickle.loads(zlib.decompress(f.read()))
+        except FileNotFoundError:
+            return None
+
+    def put(self, key, result):
+        path = self.path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        data = zlib.compress(pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL), 6)
+        # Write a temporary file and rename so a concurrent reader never
+        # sees a partial entry.
+        fd, staging = tempfile.mkstemp(prefix=path.name + ".", dir=path.parent)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(staging, path)
+        except BaseException:
+            if os.path.exists(staging):
+                os.unlink(staging)
+            raise
+
+    def run(self, *args, runner=None, **kwargs):
+        """
+        main.main(*args, **kwargs), served from the cache when the key is
+        stored. `runner` replaces main.main on a miss (e.g. to attach a
+        shared Scenario); it must take the same arguments. SEED=None runs
+        always call the runner and are not stored.
+        """
+        runner = main.main if runner is None else runner
+        if main_arguments(args, kwargs)["SEED"] is None:
+            print("Result cache bypassed: SEED=None is not reproducible.")
+            return runner(*args, **kwargs)
+        key = result_key(args, kwargs)
+        result = self.get(key)
+        if result is not None:
+            self.hits += 1
+            print(f"Result cache hit: {key[:16]}")
+            return result
+        self.misses += 1
+        result = runner(*args, **kwargs)
+        self.put(key, result)
+        return result
@@ -0,0 +1,80 @@
+import os
+import tempfile
+
+import numpy as np
+
+from result_cache import ResultCache, result_key
+
+
+def write_inputs(directory):
+    for name, content in (
+        ("starlink_tle.txt", b"tle"),
+        ("fixed_satellite_pool.json", b"[]"),
+        ("group_ps_table.npz", b"table"),
+    ):
+        with open(os.path.join(directory, name), "wb") as f:
+            f.write(content)
+
+
+def test_cache_serves_identical_arguments_and_tracks_input_files():
+    calls = []
+
+    def runner(*args, **kwargs):
+        calls.append((args, kwargs))
+        return 1.0, 0.5, [1, 2], None, None, [], {"p_b_history": [np.arange(3.0)]}
+
+    previous_dir = os.getcwd()
+    with tempfile.TemporaryDirectory() as work_dir:
+        os.chdir(work_dir)
+        try:
+            write_inputs(work_dir)
+            cache = ResultCache(os.path.join(work_dir, "cache"))
+            first = cache.run(1.5, 3, 100, [6, 3], 42, 0.001, runner=runner)
+            # Same configuration, defaults spelled out and passed by keyword.
+            second = cache.run(1.5, 3, 100, [6, 3], 42, IMBALANCE_EPSILON=0.001, USE_REAL_PS=False, runner=runner)
+            assert len(calls) == 1 and (cache.hits, cache.misses) == (1, 1)
+            assert second[:3] == first[:3]
+            assert np.array_equal(second[6]["p_b_history"][0], np.arange(3.0))
+
+            key = result_key((1.5, 3, 100, [6, 3], 42, 0.001), {})
+            assert key != result_key((1.5, 3, 100, [6, 3], 43, 0.001), {})
+            with open("group_ps_table.npz", "wb") as f:
+                f.write(b"regenerated table")
+            assert key != result_key((1.5, 3, 100, [6, 3], 42, 0.001), {})
+        finally:
+            os.chdir(previous_dir)
+
+
+def test_unhashable_arguments_are_rejected():
+    try:
+        result_key((1.5, 3, 100, [6, 3], 42, 0.001), {"QOS_DISTRIBUTION": object()})
+    except TypeError:
+        return
+    raise AssertionError("Expected an argument without a stable encoding to be rejected.")
+
+
+def test_unseeded_runs_bypass_the_cache():
+    calls = []
+
+    def runner(*args, **kwargs):
+        calls.append(args)
+        return 1.0, 0.5, [], None, None, [], {}
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        cache = ResultCache(os.path.join(work_dir, "cache"))
+        cache.run(1.5, 3, 100, [6, 3], None, 0.001, runner=runner)
+        cache.run(1.5, 3, 100, [6, 3], None, 0.001, runner=runner)
+        assert len(calls) == 2 and (cache.hits, cache.misses) == (0, 0)
+        assert not os.path.exists(os.path.join(work_dir, "cache"))
+    try:
+        result_key((1.5, 3, 100, [6, 3], None, 0.001), {})
+    except ValueError:
+        return
+    raise AssertionError("Expected SEED=None to have no result key.")
+
+
+if __name__ == "__main__":
+    test_cache_serves_identical_arguments_and_tracks_input_files()
+    test_unhashable_arguments_are_rejected()
+    test_unseeded_runs_bypass_the_cache()
+    print("result_cache_test passed")
@@ -0,0 +1,43 @@
+import numpy as np
+
+
+CULLED_ELEVATION_DEG = -90.0
+
+
+class ServiceConeCuller:
+    """
+    Per-RAO test of which satellites can be above a minimum elevation for
+    some UE in the service area.
+
+    The service area is the smallest spherical cap (around the mean UE
+    direction) that holds every UE. On a sphere of radius R a satellite at
+    radius r is seen above elevation e from a point at central angle gamma
+    iff gamma <= arccos(R cos(e) / r) - e, so the satellite can be visible
+    from the cap iff its central angle to the cap center is at most that
+    bound plus the cap half-angle. R is the smallest UE radius, and
+    `margin_deg` covers the gap between geodetic and geocentric vertical;
+    both make the test conservative on the WGS84 ellipsoid.
+    """
+
+    def __init__(self, ue_ecef_km, margin_deg=1.0):
+        ue_ecef_km = np.asarray(ue_ecef_km, dtype=float).reshape(-1, 3)
+        if len(ue_ecef_km) == 0:
+            raise ValueError("ServiceConeCuller needs at least one UE position.")
+        radii = np.linalg.norm(ue_ecef_km, axis=1)
+        directions = ue_ecef_km / radii[:, None]
+        center = np.mean(directions, axis=0)
+        self.center = center / np.linalg.norm(center)
+        self.cap_half_angle = float(np.max(np.arccos(np.clip(directions @ self.center, -1.0, 1.0))))
+        self.earth_radius_km = float(np.min(radii))
+        self.margin_deg = float(margin_deg)
+
+    def potentially_visible(self, sat_ecef_km, min_elevation_deg=0.0):
+        """Boolean mask; False only for satellites below min_elevation_deg for every UE."""
+        sat_ecef_km = np.asarray(sat_ecef_km, dtype=float).reshape(-1, 3)
+        sat_radius = np.linalg.norm(sat_ecef_km, axis=1)
+        central_angle = np.arccos(np.clip(sat_ecef_km @ self.center / sat_radius, -1.0, 1.0))
+        elevation = np.radians(max(min_elevation_deg - self.margin_deg, -90.0))
+        coverage = np.arccos(
+            np.clip(self.earth_radius_km * np.cos(elevation) / sat_radius, -1.0, 1.0)
+        ) - elevation
+        return central_angle <= coverage + self.cap_half_angle
@@ -0,0 +1,53 @@
+import numpy as np
+from skyfield.api import wgs84
+
+from satellite_culling import ServiceConeCuller
+
+
+def ue_positions(center, radius_deg, count, rng):
+    latitudes = center[0] + rng.uniform(-radius_deg, radius_deg, count)
+    longitudes = center[1] + rng.uniform(-radius_deg, radius_deg, count)
+    ecef = np.array([wgs84.latlon(lat, lon).itrs_xyz.km for lat, lon in zip(latitudes, longitudes)])
+    lat, lon = np.radians(latitudes), np.radians(longitudes)
+    # Geodetic up vectors, as used for the UE ENU frames.
+    up = np.column_stack((np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)))
+    return ecef, up
+
+
+def random_satellites(count, rng):
+    directions = rng.normal(size=(count, 3))
+    directions /= np.linalg.norm(directions, axis=1)[:, None]
+    return directions * rng.uniform(6378 + 300, 6378 + 1200, count)[:, None]
+
+
+def test_culled_satellites_are_below_the_threshold_for_every_ue():
+    rng = np.random.RandomState(5)
+    for center in [(25.03, 121.56), (0.0, -60.0), (70.0, 10.0)]:
+        ue_ecef, up = ue_positions(center, 2.0, 200, rng)
+        satellites = random_satellites(3000, rng)
+        culler = ServiceConeCuller(ue_ecef)
+        for min_elevation in (0.0, 10.0):
+            mask = culler.potentially_visible(satellites, min_elevation)
+            delta = satellites[None, :, :] - ue_ecef[:, None, :]
+            elevation = np.degrees(np.arcsin(
+                np.einsum("nkd,nd->nk", delta, up) / np.linalg.norm(delta, axis=2)
+            ))
+            visible = np.any(elevation > min_elevation, axis=0)
+            assert not np.any(visible & ~mask)
+            # Random LEO positions: the service cone keeps only a small share.
+            assert np.mean(mask) < 0.25
+
+
+def test_single_ue_cap_has_zero_half_angle():
+    ue_ecef, _ = ue_positions((10.0, 20.0), 0.0, 1, np.random.RandomState(0))
+    culler = ServiceConeCuller(ue_ecef)
+    assert culler.cap_half_angle < 1e-7
+    overhead = ue_ecef[0] / np.linalg.norm(ue_ecef[0]) * 7000.0
+    antipode = -overhead
+    assert culler.potentially_visible(np.vstack((overhead, antipode))).tolist() == [True, False]
+
+
+if __name__ == "__main__":
+    test_culled_satellites_are_below_the_threshold_for_every_ue()
+    test_single_ue_cap_has_zero_half_angle()
+    print("satellite_culling_test passed")
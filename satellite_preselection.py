@@ -5,8 +5,9 @@ from datetime import datetime, timezone, timedelta
 from pathlib import Path
 from skyfield.api import load, wgs84
 import orbit
+from ephemeris_store import ConstellationEphemerisStore
 from main import channel_visibility
-from scenario_time import as_utc_datetime, get_tle_scenario_metadata
+from scenario_time import as_utc_datetime, get_tle_scenario_metadata, load_starlink_tles
 
 
 def save_satellite_pool(real_sats, filename="fixed_satellite_pool_new.json"):
@@ -70,7 +71,8 @@ def select_active_satellite_pool(
     geo,
     start_dt,
     seconds,
-    min_elevation=10
+    min_elevation=10,
+    ephemeris_store=None,
 ):
     """
     Match main.py's initial active satellite filtering before precomputation.
@@ -81,16 +83,24 @@ def select_active_satellite_pool(
     mid_dt = start_dt + timedelta(seconds=seconds / 2)
     mid_t = ts.from_datetime(mid_dt)
 
-    active_sat_pool = []
-    for sat in real_sats:
-        visible, elevation_angle, _ = channel_visibility(
-            geo,
-            sat,
-            min_elevation=min_elevation,
-            t=mid_t
-        )
-        if visible and elevation_angle > min_elevation:
-            active_sat_pool.append(sat)
+    if ephemeris_store is not None:
+        elevations = ephemeris_store.elevation_deg(geo, mid_dt, real_sats)
+        active_sat_pool = [
+            sat
+            for sat, elevation in zip(real_sats, elevations)
+            if elevation > min_elevation
+        ]
+    else:
+        active_sat_pool = []
+        for sat in real_sats:
+            visible, elevation_angle, _ = channel_visibility(
+                geo,
+                sat,
+                min_elevation=min_elevation,
+                t=mid_t
+            )
+            if visible and elevation_angle > min_elevation:
+                active_sat_pool.append(sat)
 
     print(
         f"Active Sat Pool Size: {len(active_sat_pool)} "
@@ -250,10 +260,19 @@ def main(NUM_SAT):
 
     geo = wgs84.latlon(25.03, 121.56)
 
+    starlinks = load_starlink_tles()
+    ephemeris_store = ConstellationEphemerisStore.open_or_build(
+        starlinks,
+        scenario_metadata["tle_file_sha256"],
+        start_dt,
+        200,
+        timescale=ts,
+    )
     real_sats = orbit.get_relevant_rail_planes(
         t_start,
         geo,
-        top_n=NUM_SAT
+        top_n=NUM_SAT,
+        ephemeris_store=ephemeris_store,
     )
 
     # 這裡要有一個初始篩選衛星的過程，挑選會過境的衛星，之前的main是有這個邏輯的。
@@ -263,7 +282,8 @@ def main(NUM_SAT):
         geo=geo,
         start_dt=start_dt,
         seconds=200,
-        min_elevation=10
+        min_elevation=10,
+        ephemeris_store=ephemeris_store,
     )
 
     save_satellite_pool(real_sats, filename=satellite_pool_filename)
@@ -6,6 +6,8 @@ import numpy as np
 from skyfield.api import load
 from skyfield.framelib import itrs
 
+from ephemeris import InterpolatedEphemeris, SGP4Ephemeris, check_backend, check_frame
+from geometry_kernel import check_dtype, elevation_distance, precision_report, top_k_by_elevation
 from main import estimate_channel_success_probability, load_fixed_satellites
 from satellite_preselection import generate_uniform_locations
 from scenario_time import get_tle_scenario_metadata
@@ -79,6 +81,11 @@ def compute_top3_group_ps_table(
     scenario_metadata=None,
     generate_full_table=GENERATE_FULL_TABLE,
     sampled_rao_step=SAMPLED_RAO_STEP,
+    ephemeris_grid_seconds=None,
+    geometry_kernel="delta",
+    geometry_dtype="float64",
+    ephemeris_backend="skyfield",
+    ephemeris_frame="exact",
 ):
     """Generate ordered Top-3 group weights and per-satellite channel success rates."""
     output_path = Path(filename)
@@ -101,34 +108,81 @@ def compute_top3_group_ps_table(
     full_rao_count = seconds * 1000 // trao_ms
     if sampled_rao_step <= 0:
         raise ValueError("sampled_rao_step must be positive.")
+    if check_frame(ephemeris_frame) != "exact" and (
+        ephemeris_backend != "sgp4" or ephemeris_grid_seconds is not None
+    ):
+        raise ValueError("ephemeris_frame='gmst' needs ephemeris_backend='sgp4' without ephemeris_grid_seconds.")
     rao_step = 1 if generate_full_table else sampled_rao_step
     rao_indices = np.arange(0, full_rao_count, rao_step, dtype=int)
     num_sat = len(real_sats)
     num_points = len(sample_locations)
     ue_ecef_km, east, north, up = prepare_ue_geometry(sample_locations)
+    geometry_dtype = check_dtype(geometry_dtype)
+    ue_frames = tuple(
+        array.astype(geometry_dtype, copy=False)
+        for array in (ue_ecef_km, east, north, up)
+    )
+    sat_ephemeris = None
+    if ephemeris_grid_seconds is not None:
+        sat_ephemeris = InterpolatedEphemeris(
+            real_sats,
+            start_dt,
+            full_rao_count * trao_ms / 1000,
+            grid_step_s=ephemeris_grid_seconds,
+            timescale=ts,
+            backend=ephemeris_backend,
+        )
+        print(
+            f"Interpolated ephemeris ({ephemeris_backend}): grid={ephemeris_grid_seconds:g} s, "
+            f"max position error={sat_ephemeris.max_position_error_km() * 1000:.3f} m"
+        )
+    elif check_backend(ephemeris_backend) == "sgp4":
+        sat_ephemeris = SGP4Ephemeris(real_sats, start_dt, timescale=ts, frame=ephemeris_frame)
+        print(
+            "Array SGP4 ephemeris: max difference from Skyfield="
+            f"{sat_ephemeris.max_position_error_km([0.0, full_rao_count * trao_ms / 1000]) * 1000:.3e} m"
+        )
+        if ephemeris_frame != "exact":
+            frame_report = sat_ephemeris.frame_error_report([0.0, full_rao_count * trao_ms / 1000])
+            print(
+                f"Fast {ephemeris_frame} frame: max rotation error={frame_report['max_rotation_error_rad']:.3e} rad, "
+                f"max position error vs exact frame={frame_report['max_position_error_m']:.3e} m"
+            )
 
     group_weight_table = []
     group_ps_table = []
 
     for table_index, n in enumerate(rao_indices):
         n = int(n)
-        current_dt = start_dt + timedelta(milliseconds=n * trao_ms)
-        current_t = ts.from_datetime(current_dt)
-
-        sat_ecef_km = np.stack(
-            [sat.at(current_t).frame_xyz(itrs).km for sat in real_sats],
-            axis=0,
+        if sat_ephemeris is not None:
+            sat_ecef_km = sat_ephemeris.positions_km(n * trao_ms / 1000)
+        else:
+            current_dt = start_dt + timedelta(milliseconds=n * trao_ms)
+            current_t = ts.from_datetime(current_dt)
+            sat_ecef_km = np.stack(
+                [sat.at(current_t).frame_xyz(itrs).km for sat in real_sats],
+                axis=0,
+            )
+        if table_index == 0 and geometry_dtype != np.float64:
+            precision = precision_report(
+                ue_ecef_km, east, north, up, sat_ecef_km,
+                estimate_channel_success_probability,
+                dtype=geometry_dtype, kernel=geometry_kernel, group_size=GROUP_SIZE,
+            )
+            print(
+                f"{precision['dtype']} geometry vs float64 at RAO {n}: "
+                f"max elevation error={precision['max_elevation_error_deg']:.2e} deg, "
+                f"max p_s error={precision['max_channel_probability_error']:.2e}, "
+                f"points with changed Top-{GROUP_SIZE} order="
+                f"{len(precision['group_order_changed_ues'])}"
+            )
+        angles, distances = elevation_distance(
+            *ue_frames,
+            np.asarray(sat_ecef_km, dtype=geometry_dtype),
+            kernel=geometry_kernel,
         )
-        delta = sat_ecef_km[None, :, :] - ue_ecef_km[:, None, :]
-        up_component = np.einsum("nkd,nd->nk", delta, up)
-        east_component = np.einsum("nkd,nd->nk", delta, east)
-        north_component = np.einsum("nkd,nd->nk", delta, north)
-        horizontal_distance = np.hypot(east_component, north_component)
-
-        angles = np.degrees(np.arctan2(up_component, horizontal_distance))
-        distances = np.linalg.norm(delta, axis=2)
         ps_matrix = estimate_channel_success_probability(angles, distances)
-        top3_indices = np.argsort(angles, axis=1)[:, ::-1][:, :GROUP_SIZE]
+        top3_indices = top_k_by_elevation(angles, GROUP_SIZE)
 
         group_count = defaultdict(int)
         group_ps_sum = {}
@@ -180,6 +234,7 @@ def compute_top3_group_ps_table(
         radius_km=RADIUS_KM,
         orbit_plane_count=orbit_plane_count,
         source_reference_table=reference_path.name,
+        geometry_dtype=geometry_dtype.name,
     )
     print(f"Saved Top-3 group p_s table to {output_path}")
 
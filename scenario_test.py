@@ -0,0 +1,143 @@
+import contextlib
+import io
+import json
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+
+import numpy as np
+from sgp4.api import WGS72, Satrec
+from sgp4.exporter import export_tle
+from skyfield.api import load, wgs84
+from skyfield.framelib import itrs
+
+import main
+from scenario_time import get_tle_scenario_metadata
+
+
+POOL_SIZE = 8
+SECONDS = 1
+
+
+def write_scenario_files(directory):
+    """A synthetic 53-degree Walker shell, its 8 highest satellites over Taipei and their group table."""
+    lines = []
+    for plane in range(24):
+        for slot in range(12):
+            sat = Satrec()
+            sat.sgp4init(
+                WGS72, "i", 40000 + plane * 12 + slot, 2461041.5 - 2433281.5, 1e-5, 0.0, 0.0,
+                1e-4, 0.0, np.radians(53.0), np.radians(30.0 * slot + 1.25 * plane),
+                np.sqrt(398600.4418 / (6378.137 + 550.0) ** 3) * 60.0, np.radians(15.0 * plane),
+            )
+            lines += [f"STARLINK-{40000 + plane * 12 + slot}", *export_tle(sat)]
+    with open(os.path.join(directory, "starlink_tle.txt"), "w") as f:
+        f.write("\n".join(lines) + "\n")
+
+    metadata = get_tle_scenario_metadata()
+    ts = load.timescale()
+    starlink_sats = main.load_starlink_tles()
+    start = ts.from_datetime(metadata["start_dt"])
+    taipei = wgs84.latlon(25.03, 121.56)
+    elevation = [(sat - taipei).at(start).altaz()[0].degrees for sat in starlink_sats]
+    pool = [starlink_sats[idx] for idx in np.argsort(elevation)[::-1][:POOL_SIZE]]
+    with open(os.path.join(directory, "fixed_satellite_pool.json"), "w") as f:
+        json.dump([{"name": sat.name, "norad_id": int(sat.model.satnum)} for sat in pool], f)
+
+    rng = np.random.RandomState(0)
+    ues = [
+        main.UE(location=[25.03 + rng.uniform(-1.5, 1.5), 121.56 + rng.uniform(-1.5, 1.5)], id=idx, rho=1.0)
+        for idx in range(100)
+    ]
+    sats = [main.satellite(id=idx, skyfield_sat=sat) for idx, sat in enumerate(pool)]
+    weights, ps, mode3 = [], [], []
+    for n in range(SECONDS * 10):
+        t = ts.from_datetime(metadata["start_dt"] + timedelta(milliseconds=100 * n))
+        sat_ecef_km = np.stack([sat.at(t).frame_xyz(itrs).km for sat in pool])
+        main.update_visibility_batch(ues, sats, t, 5, sat_ecef_km=sat_ecef_km)
+        groups = {}
+        for ue in ues:
+            top2 = np.argsort(ue.angle)[::-1][:2]
+            groups.setdefault((int(top2[0]), int(top2[1])), []).append(ue.channel_success_prob)
+        weights.append({group: len(rows) / len(ues) for group, rows in groups.items()})
+        ps.append({group: np.mean(rows, axis=0) for group, rows in groups.items()})
+        mode3.append(np.mean([ue.channel_success_prob[ue.angle > 10].mean() if np.any(ue.angle > 10) else 0.0 for ue in ues]))
+    np.savez_compressed(
+        os.path.join(directory, "group_ps_table.npz"),
+        group_weight_table=np.array(weights, dtype=object),
+        group_ps_table=np.array(ps, dtype=object),
+        mode3_visible_random_ps_table=np.array(mode3),
+        sat_norad_ids=np.array([int(sat.model.satnum) for sat in pool]),
+        scenario_start_dt_iso=metadata["start_dt_iso"],
+        tle_file_sha256=metadata["tle_file_sha256"],
+        radius_km=200.0,
+    )
+
+
+@contextlib.contextmanager
+def scenario_directory():
+    previous_dir = os.getcwd()
+    with tempfile.TemporaryDirectory() as work_dir:
+        os.chdir(work_dir)
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                write_scenario_files(work_dir)
+            yield work_dir
+        finally:
+            os.chdir(previous_dir)
+
+
+def run(mode, **kwargs):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return main.main(1.5, SECONDS, 300, mode, 42, 0.001, **kwargs)
+
+
+def test_shared_scenario_matches_a_fresh_load_and_is_not_modified_by_runs():
+    with scenario_directory():
+        with contextlib.redirect_stdout(io.StringIO()):
+            scenario = main.shared_scenario()
+        assert main.shared_scenario() is scenario
+        cached_rows = dict(scenario.dense_group_table._rows)
+        cached_tables = dict(scenario._expected_tables)
+        assert len(cached_rows) == SECONDS * 10 and list(cached_tables) == [54]
+
+        for mode in ([6, 3], [3, 3], [5, 3]):
+            fresh = run(mode)
+            shared = run(mode, SCENARIO=scenario)
+            assert shared[:2] == fresh[:2]
+            assert np.array_equal(shared[2], fresh[2])
+            assert len(shared[6]["p_b_history"]) == len(fresh[6]["p_b_history"])
+            for left, right in zip(shared[6]["p_b_history"], fresh[6]["p_b_history"]):
+                assert np.array_equal(left, right)
+        # Runs read the warmed caches without adding to them.
+        for cached, current in ((cached_rows, scenario.dense_group_table._rows), (cached_tables, scenario._expected_tables)):
+            assert current.keys() == cached.keys()
+            assert all(current[key] is value for key, value in cached.items())
+
+
+def test_scenario_rejects_a_different_pool_table_or_radius():
+    with scenario_directory() as work_dir:
+        with contextlib.redirect_stdout(io.StringIO()):
+            scenario = main.Scenario()
+        shutil.copy("fixed_satellite_pool.json", "other_pool.json")
+        shutil.copy("group_ps_table.npz", "other_table.npz")
+        assert scenario.matches(os.path.join(work_dir, "fixed_satellite_pool.json"), "group_ps_table.npz", 200)
+
+        for kwargs in (
+            {"SATELLITE_POOL_FILENAME": "other_pool.json"},
+            {"GROUP_TABLE_FILENAME": "other_table.npz"},
+            {"SERVICE_RADIUS_KM": 150.0},
+        ):
+            try:
+                run([6, 3], SCENARIO=scenario, **kwargs)
+            except ValueError as error:
+                assert "SCENARIO was built for" in str(error)
+            else:
+                raise AssertionError(f"SCENARIO accepted {kwargs}")
+
+
+if __name__ == "__main__":
+    test_shared_scenario_matches_a_fresh_load_and_is_not_modified_by_runs()
+    test_scenario_rejects_a_different_pool_table_or_radius()
+    print("scenario_test passed")
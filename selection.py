@@ -44,6 +44,53 @@ def solve_group_selection_policy(
             f"ps_by_group shape {ps_matrix.shape} does not match "
             f"({len(groups)}, {sat_num})."
         )
+
+    initial_matrix = None
+    if initial_policy is not None:
+        initial_matrix = np.vstack([
+            np.asarray(initial_policy[tuple(group)], dtype=float)
+            for group in groups
+        ])
+
+    a = solve_group_selection_matrix(
+        w,
+        ps_matrix,
+        imbalance_epsilon=imbalance_epsilon,
+        initial_matrix=initial_matrix,
+        maxiter=maxiter,
+        tol=tol,
+    )
+    return {
+        group: a[idx].copy()
+        for idx, group in enumerate(groups)
+    }
+
+
+def solve_group_selection_matrix(
+    w,
+    ps_matrix,
+    imbalance_epsilon=0.0,
+    initial_matrix=None,
+    maxiter=500,
+    tol=1e-9,
+):
+    """
+    Dense form of solve_group_selection_policy.
+
+    w is the (G,) group weight vector and ps_matrix the (G, K) per-group
+    success probabilities; returns the (G, K) policy matrix A.
+    """
+    w = np.asarray(w, dtype=float)
+    ps_matrix = np.asarray(ps_matrix, dtype=float)
+    if ps_matrix.ndim != 2 or ps_matrix.shape[0] != len(w):
+        raise ValueError(
+            f"ps_matrix shape {ps_matrix.shape} does not match {len(w)} groups."
+        )
+    group_count, sat_num = ps_matrix.shape
+    if group_count == 0:
+        return np.zeros((0, sat_num))
+    if sat_num <= 0:
+        raise ValueError("sat_num must be positive.")
     if np.any(w < 0) or not np.all(np.isfinite(w)):
         raise ValueError("weights must be finite and non-negative.")
     if np.sum(w) <= 0:
@@ -53,14 +100,9 @@ def solve_group_selection_policy(
 
     # Normalize weights defensively; generated tables should already sum to 1.
     w = w / np.sum(w)
-    group_count = len(groups)
 
-    initial_matrix = None
-    if initial_policy is not None:
-        x0_matrix = np.vstack([
-            np.asarray(initial_policy[tuple(group)], dtype=float)
-            for group in groups
-        ])
+    if initial_matrix is not None:
+        x0_matrix = np.asarray(initial_matrix, dtype=float)
         if x0_matrix.shape != (group_count, sat_num):
             raise ValueError(
                 f"initial_policy shape {x0_matrix.shape} does not match "
@@ -148,7 +190,5 @@ def solve_group_selection_policy(
             f"{imbalance} > {imbalance_epsilon}"
         )
 
-    return {
-        group: a[idx].copy()
-        for idx, group in enumerate(groups)
-    }
+    # cvxpy hands back Fortran-ordered values; keep A_g rows contiguous.
+    return np.ascontiguousarray(a)
@@ -0,0 +1,129 @@
+"""
+Warm-up detection and batch-means estimation on per-RAO series.
+
+The warm-up is the largest MSER-5 truncation point over the given series:
+each series is averaged in batches of 5 RAOs, and the truncation d minimizes
+the variance of the remaining batch averages divided by their count. After
+the warm-up the RAOs are split into equal contiguous batches; throughput,
+PLR and delay come from the batch values with a Student-t interval. PLR and
+delay are ratios (losses per finished packet, delay per success), so each
+batch contributes its own ratio.
+"""
+import numpy as np
+from scipy.stats import t as student_t
+
+
+MSER_BATCH_SIZE = 5
+DEFAULT_BATCH_COUNT = 10
+# Smallest number of RAOs per batch before an estimate is reported.
+MIN_BATCH_RAOS = 5
+METRICS = ("throughput", "plr", "average_delay_ms")
+# Absolute half-width floors; PLR at low load is ~0, where a relative target never closes.
+DEFAULT_ABSOLUTE_HALFWIDTH = {"plr": 0.002, "throughput": 1.0, "average_delay_ms": 1.0}
+
+
+def mser_truncation(series, batch_size=MSER_BATCH_SIZE, max_fraction=0.5):
+    """MSER-m truncation point, in samples of `series`, searched over the first max_fraction."""
+    series = np.asarray(series, dtype=float)
+    batch_count = len(series) // batch_size
+    if batch_count < 2:
+        return 0
+    # Batches are aligned to the end of the series so the tail is always complete.
+    tail = series[len(series) - batch_count * batch_size:]
+    averages = tail.reshape(batch_count, batch_size).mean(axis=1)
+    best_d, best_statistic = 0, np.inf
+    for d in range(int(batch_count * max_fraction) + 1):
+        remaining = averages[d:]
+        if len(remaining) < 2:
+            break
+        statistic = np.var(remaining) / len(remaining)
+        if statistic < best_statistic:
+            best_d, best_statistic = d, statistic
+    return len(series) - batch_count * batch_size + best_d * batch_size
+
+
+def warmup_length(series_by_name, total_raos):
+    """
+    Largest MSER-5 truncation over per-RAO series; series shorter than
+    total_raos are aligned to the end (e.g. p_b, first recorded at RAO 1).
+    """
+    warmup = 0
+    for series in series_by_name.values():
+        series = np.asarray(series, dtype=float)
+        if series.ndim > 1:
+            series = series.mean(axis=tuple(range(1, series.ndim)))
+        if len(series) == 0 or not np.all(np.isfinite(series)):
+            continue
+        warmup = max(warmup, total_raos - len(series) + mser_truncation(series))
+    return min(warmup, total_raos)
+
+
+def interval(values, confidence=0.95):
+    values = np.asarray(values, dtype=float)
+    values = values[np.isfinite(values)]
+    if len(values) == 0:
+        return np.nan, np.nan
+    if len(values) < 2:
+        return float(values[0]), np.inf
+    halfwidth = student_t.ppf(0.5 + confidence / 2.0, len(values) - 1) * np.std(values, ddof=1) / np.sqrt(len(values))
+    return float(np.mean(values)), float(halfwidth)
+
+
+def batch_sums(values, batch_count):
+    """Sums of batch_count equal contiguous batches; leading remainder samples are dropped."""
+    values = np.asarray(values, dtype=float)
+    size = len(values) // batch_count
+    return values[len(values) - size * batch_count:].reshape(batch_count, size).sum(axis=1)
+
+
+def estimate(
+    successes,
+    losses,
+    delay_sums_raos,
+    trao_ms,
+    warmup_series,
+    batch_count=DEFAULT_BATCH_COUNT,
+    confidence=0.95,
+):
+    """
+    Steady-state estimates from per-RAO counts: successes, dropped packets
+    and the summed delay (in RAOs) of that RAO's successes. Returns None
+    while fewer than batch_count * MIN_BATCH_RAOS RAOs follow the warm-up.
+    """
+    total_raos = len(successes)
+    warmup = warmup_length(warmup_series, total_raos)
+    if total_raos - warmup < batch_count * MIN_BATCH_RAOS:
+        return None
+    batch_successes = batch_sums(successes[warmup:], batch_count)
+    batch_losses = batch_sums(losses[warmup:], batch_count)
+    batch_delays = batch_sums(delay_sums_raos[warmup:], batch_count)
+    batch_raos = (total_raos - warmup) // batch_count
+    finished = batch_successes + batch_losses
+    with np.errstate(divide="ignore", invalid="ignore"):
+        batch_values = {
+            "throughput": batch_successes / (batch_raos * trao_ms / 1000),
+            "plr": np.where(finished > 0, batch_losses / finished, np.nan),
+            "average_delay_ms": np.where(batch_successes > 0, batch_delays / batch_successes * trao_ms, np.nan),
+        }
+    result = {
+        "warmup_raos": int(warmup),
+        "raos_used": int(batch_raos * batch_count),
+        "batch_count": int(batch_count),
+        "confidence": confidence,
+    }
+    for metric in METRICS:
+        result[metric], result[f"{metric}_halfwidth"] = interval(batch_values[metric], confidence)
+    return result
+
+
+def converged(result, relative_halfwidth, absolute_halfwidth=None):
+    """True when every metric's half-width is within max(relative * |mean|, absolute floor)."""
+    if result is None:
+        return False
+    floors = dict(DEFAULT_ABSOLUTE_HALFWIDTH)
+    floors.update(absolute_halfwidth or {})
+    return all(
+        np.isfinite(result[metric])
+        and result[f"{metric}_halfwidth"] <= max(relative_halfwidth * abs(result[metric]), floors.get(metric, 0.0))
+        for metric in METRICS
+    )
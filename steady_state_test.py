@@ -0,0 +1,54 @@
+import numpy as np
+
+from steady_state import converged, estimate, mser_truncation, warmup_length
+
+
+def transient_series(rng, length=600, warmup=120, level=100.0):
+    ramp = level * (1.0 - np.exp(-np.arange(length) / (warmup / 4.0)))
+    return ramp + rng.normal(0.0, 5.0, length)
+
+
+def test_mser5_cuts_the_start_up_transient():
+    rng = np.random.RandomState(0)
+    series = transient_series(rng)
+    truncation = mser_truncation(series)
+    assert 60 <= truncation <= 200
+    assert truncation % 5 == 0
+    assert mser_truncation(100.0 + rng.normal(0.0, 5.0, 600)) <= 100
+
+
+def test_shorter_series_are_aligned_to_the_end():
+    rng = np.random.RandomState(1)
+    series = transient_series(rng)
+    # p_b starts at RAO 1, so its truncation point shifts by one RAO.
+    assert warmup_length({"p_b": series[1:]}, 600) == mser_truncation(series[1:]) + 1
+    assert warmup_length({"p_b": series[1:], "throughput": series}, 600) >= mser_truncation(series)
+
+
+def test_batch_means_cover_the_steady_state_values():
+    rng = np.random.RandomState(2)
+    raos = 600
+    successes = np.round(transient_series(rng, raos, level=140.0)).clip(0)
+    losses = rng.poisson(14.0, raos).astype(float)
+    delay_sums = successes * 5.0
+    result = estimate(successes, losses, delay_sums, 100, {"throughput": successes})
+    assert result["warmup_raos"] > 0 and result["batch_count"] == 10
+    assert abs(result["throughput"] - 1400.0) <= 3 * result["throughput_halfwidth"] + 5.0
+    assert abs(result["plr"] - 14.0 / 154.0) < 0.01
+    assert abs(result["average_delay_ms"] - 500.0) < 1e-9
+    assert converged(result, 0.05)
+    assert not converged(result, 1e-6, {"plr": 0.0, "throughput": 0.0, "average_delay_ms": 0.0})
+
+
+def test_too_short_runs_report_nothing():
+    counts = np.ones(30)
+    assert estimate(counts, counts, counts, 100, {"throughput": counts}) is None
+    assert not converged(None, 0.5)
+
+
+if __name__ == "__main__":
+    test_mser5_cuts_the_start_up_transient()
+    test_shorter_series_are_aligned_to_the_end()
+    test_batch_means_cover_the_steady_state_values()
+    test_too_short_runs_report_nothing()
+    print("steady_state_test passed")
@@ -8,6 +8,7 @@ import numpy as np
 from skyfield.api import load
 from skyfield.framelib import itrs
 
+from geometry_kernel import elevation_distance, top_k_by_elevation
 from main import estimate_channel_success_probability, load_fixed_satellites
 from satellite_preselection import generate_uniform_locations
 from satellite_preselection_top3 import prepare_ue_geometry
@@ -27,21 +28,15 @@ warnings.filterwarnings(
 )
 
 
-def get_ue_channel_data(real_sats, current_time, ue_geometry):
+def get_ue_channel_data(real_sats, current_time, ue_geometry, kernel="delta"):
     ecef, east, north, up = ue_geometry
     sat_ecef = np.stack([
         sat.at(current_time).frame_xyz(itrs).km for sat in real_sats
     ])
-    delta = sat_ecef[None, :, :] - ecef[:, None, :]
-    up_component = np.einsum("nkd,nd->nk", delta, up)
-    east_component = np.einsum("nkd,nd->nk", delta, east)
-    north_component = np.einsum("nkd,nd->nk", delta, north)
-    angles = np.degrees(np.arctan2(
-        up_component, np.hypot(east_component, north_component)
-    ))
-    distances = np.linalg.norm(delta, axis=2)
+    angles, distances = elevation_distance(ecef, east, north, up, sat_ecef, kernel=kernel)
     channel_ps = estimate_channel_success_probability(angles, distances)
-    ranking = np.argsort(angles, axis=1)[:, ::-1]
+    # Policies use at most the Top-3 prefix.
+    ranking = top_k_by_elevation(angles, max(length for _, length in POLICIES))
     return channel_ps, ranking
 
 
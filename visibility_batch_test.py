@@ -0,0 +1,105 @@
+import numpy as np
+
+import visibility_bits
+from main import UE, UEGeometryBuffers, satellite, update_visibility_batch
+from satellite_culling import ServiceConeCuller
+
+
+def make_scenario(ue_count=300, sat_count=24, seed=2):
+    rng = np.random.RandomState(seed)
+    ues = [
+        UE(location=[25.03 + rng.uniform(-1.5, 1.5), 121.56 + rng.uniform(-1.5, 1.5)], id=idx, rho=1.0)
+        for idx in range(ue_count)
+    ]
+    sats = [satellite(id=idx, skyfield_sat=None) for idx in range(sat_count)]
+    # Satellites at 550 km altitude scattered over a cap around the UEs.
+    lat = np.radians(25.03 + rng.uniform(-20.0, 20.0, sat_count))
+    lon = np.radians(121.56 + rng.uniform(-20.0, 20.0, sat_count))
+    radius_km = 6378.137 + 550.0
+    sat_ecef_km = radius_km * np.column_stack((
+        np.cos(lat) * np.cos(lon),
+        np.cos(lat) * np.sin(lon),
+        np.sin(lat),
+    ))
+    return ues, sats, sat_ecef_km
+
+
+def snapshot(ues):
+    return (
+        np.vstack([ue.angle for ue in ues]),
+        np.vstack([ue.distance for ue in ues]),
+        np.vstack([ue.visible_bits for ue in ues]),
+        [ue.group for ue in ues],
+    )
+
+
+def test_ue_rows_update_only_the_subset_in_the_shared_buffer():
+    for mode in (6, 5):
+        ues, sats, sat_ecef_km = make_scenario()
+        subset_rows = np.arange(3, len(ues), 7)
+        subset = [ues[idx] for idx in subset_rows]
+        standalone = update_visibility_batch(subset, sats, None, mode, sat_ecef_km=sat_ecef_km)
+        expected = snapshot(subset)
+        expected_link = np.vstack([ue.channel_success_prob for ue in subset])
+
+        geometry = UEGeometryBuffers(ues)
+        visible = update_visibility_batch(
+            subset, sats, None, mode, sat_ecef_km=sat_ecef_km, geometry=geometry, ue_rows=subset_rows,
+            chunk_size=10,
+        )
+        assert visible == standalone
+        for left, right in zip(snapshot(subset), expected):
+            assert np.array_equal(np.asarray(left), np.asarray(right))
+        assert np.array_equal(np.vstack([ue.channel_success_prob for ue in subset]), expected_link)
+        # Every UE stays bound to its own row of the one shared buffer.
+        assert all(np.shares_memory(ue.angle, geometry.elevation_deg) for ue in ues)
+        assert np.all(geometry.elevation_deg[np.setdiff1d(np.arange(len(ues)), subset_rows)] == 0)
+
+
+def test_culling_keeps_top2_groups_of_ues_with_few_visible_satellites():
+    ues, _, _ = make_scenario(ue_count=200)
+    rng = np.random.RandomState(9)
+    # One satellite over the service area and a global random shell: most
+    # satellites are culled and many UEs see fewer than two above 0 degrees.
+    directions = rng.normal(size=(30, 3))
+    directions[0] = ues[0].ecef_km
+    directions /= np.linalg.norm(directions, axis=1)[:, None]
+    sat_ecef_km = directions * rng.uniform(6378.0 + 500.0, 6378.0 + 600.0, len(directions))[:, None]
+    sats = [satellite(id=idx, skyfield_sat=None) for idx in range(len(sat_ecef_km))]
+    culler = ServiceConeCuller(np.vstack([ue.ecef_km for ue in ues]))
+    assert np.mean(culler.potentially_visible(sat_ecef_km)) < 0.5
+
+    for mode in (6, 3):
+        update_visibility_batch(ues, sats, None, mode, sat_ecef_km=sat_ecef_km)
+        unculled_groups = [ue.group for ue in ues]
+        unculled_best = [ue.highest_elevation_satellite(np.arange(len(sats))).id for ue in ues]
+        visible_counts = [len(visibility_bits.indices(ue.visible_bits)) for ue in ues]
+        update_visibility_batch(ues, sats, None, mode, sat_ecef_km=sat_ecef_km, culler=culler, chunk_size=64)
+
+        assert min(visible_counts) < 2
+        assert [ue.group for ue in ues] == unculled_groups
+        assert [ue.highest_elevation_satellite(np.arange(len(sats))).id for ue in ues] == unculled_best
+        assert [len(visibility_bits.indices(ue.visible_bits)) for ue in ues] == visible_counts
+
+
+def test_geometry_workers_match_a_single_worker():
+    for mode in (6, 5):
+        results = []
+        for workers in (1, 2):
+            ues, sats, sat_ecef_km = make_scenario()
+            visible = update_visibility_batch(
+                ues, sats, None, mode, sat_ecef_km=sat_ecef_km, chunk_size=64, workers=workers,
+            )
+            results.append((visible, snapshot(ues), np.vstack([ue.channel_success_prob for ue in ues])))
+        (visible, single, link), (parallel_visible, parallel, parallel_link) = results
+        assert parallel_visible == visible
+        for left, right in zip(parallel, single):
+            assert np.array_equal(np.asarray(left), np.asarray(right))
+        assert np.array_equal(parallel_link, link)
+
+
+if __name__ == "__main__":
+    test_ue_rows_update_only_the_subset_in_the_shared_buffer()
+    test_culling_keeps_top2_groups_of_ues_with_few_visible_satellites()
+    test_geometry_workers_match_a_single_worker()
+    print("visibility_batch_test passed")
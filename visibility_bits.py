@@ -0,0 +1,66 @@
+import numpy as np
+
+
+WORD_BITS = 64
+
+
+def word_count(sat_count):
+    return max(1, -(-int(sat_count) // WORD_BITS))
+
+
+def pack_rows(mask):
+    """Pack an (N, K) boolean mask into (N, ceil(K / 64)) uint64 words; bit k is satellite k."""
+    mask = np.asarray(mask, dtype=bool)
+    if mask.ndim == 1:
+        return pack_rows(mask[None, :])[0]
+    row_count, sat_count = mask.shape
+    padded = np.zeros((row_count, word_count(sat_count) * WORD_BITS), dtype=bool)
+    padded[:, :sat_count] = mask
+    packed_bytes = np.packbits(padded, axis=1, bitorder="little")
+    return packed_bytes.view("<u8").astype(np.uint64)
+
+
+def unpack_rows(words, sat_count):
+    """Inverse of pack_rows: return an (N, sat_count) boolean mask."""
+    words = np.asarray(words, dtype=np.uint64)
+    if words.ndim == 1:
+        return unpack_rows(words[None, :], sat_count)[0]
+    packed_bytes = np.ascontiguousarray(words.astype("<u8")).view(np.uint8)
+    bits = np.unpackbits(packed_bytes, axis=1, bitorder="little")
+    return bits[:, :sat_count].astype(bool)
+
+
+if hasattr(np, "bitwise_count"):
+    def popcount(words):
+        """Number of set bits per row of uint64 words."""
+        words = np.asarray(words, dtype=np.uint64)
+        return np.sum(np.bitwise_count(words), axis=-1, dtype=np.int64)
+else:
+    def popcount(words):
+        """Number of set bits per row of uint64 words."""
+        words = np.asarray(words, dtype=np.uint64)
+        packed_bytes = np.ascontiguousarray(words.astype("<u8")).view(np.uint8)
+        bits = np.unpackbits(packed_bytes.reshape(words.shape[:-1] + (-1,)), axis=-1)
+        return np.sum(bits, axis=-1, dtype=np.int64)
+
+
+def indices(row_words):
+    """Ascending satellite indices whose bit is set in one UE row."""
+    row_words = np.asarray(row_words, dtype=np.uint64)
+    packed_bytes = np.ascontiguousarray(row_words.astype("<u8")).view(np.uint8)
+    return np.flatnonzero(np.unpackbits(packed_bytes, bitorder="little"))
+
+
+def jaccard(left_words, right_words):
+    """Row-wise Jaccard similarity; NaN where both sets are empty."""
+    left_words = np.asarray(left_words, dtype=np.uint64)
+    right_words = np.asarray(right_words, dtype=np.uint64)
+    union = popcount(left_words | right_words)
+    intersection = popcount(left_words & right_words)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(union > 0, intersection / np.maximum(union, 1), np.nan)
+
+
+def appearance_counts(words, sat_count):
+    """How many UE rows have each satellite bit set."""
+    return np.sum(unpack_rows(words, sat_count), axis=0, dtype=np.int64)
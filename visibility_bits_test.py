@@ -0,0 +1,35 @@
+import numpy as np
+
+import visibility_bits
+
+
+def test_pack_unpack_round_trip_beyond_one_word():
+    rng = np.random.RandomState(3)
+    mask = rng.rand(50, 70) < 0.3
+    words = visibility_bits.pack_rows(mask)
+    assert words.shape == (50, 2)
+    assert words.dtype == np.uint64
+    assert np.array_equal(visibility_bits.unpack_rows(words, 70), mask)
+    assert np.array_equal(visibility_bits.popcount(words), np.sum(mask, axis=1))
+    assert np.array_equal(visibility_bits.indices(words[7]), np.flatnonzero(mask[7]))
+    assert np.array_equal(
+        visibility_bits.appearance_counts(words, 70),
+        np.sum(mask, axis=0),
+    )
+
+
+def test_jaccard_matches_python_sets():
+    left = np.array([[True, True, False, False], [False, False, False, False]])
+    right = np.array([[True, False, True, False], [False, False, False, False]])
+    similarity = visibility_bits.jaccard(
+        visibility_bits.pack_rows(left),
+        visibility_bits.pack_rows(right),
+    )
+    assert np.isclose(similarity[0], 1.0 / 3.0)
+    assert np.isnan(similarity[1])
+
+
+if __name__ == "__main__":
+    test_pack_unpack_round_trip_beyond_one_word()
+    test_jaccard_matches_python_sets()
+    print("visibility_bits_test passed")